@@ -0,0 +1,106 @@
+# api/cache_utils.py
+"""
+Two-tier cache for upstream API responses: an in-process LRU (L1) in front of Redis (L2).
+
+L1 answers repeat lookups without a network hop; L2 shares entries across workers and
+restarts. Values must be JSON-serializable. Redis is optional - main.py's lifespan
+hands over its client via set_redis_client(); without it the cache is L1-only.
+"""
+
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+from redis import asyncio as aioredis
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+_redis: Optional[aioredis.Redis] = None
+
+
+def set_redis_client(client: Optional[aioredis.Redis]) -> None:
+    """Registers (or clears) the shared Redis client used as the L2 tier."""
+    global _redis
+    _redis = client
+
+
+def get_redis_client() -> Optional[aioredis.Redis]:
+    """The shared Redis client, or None when running without Redis."""
+    return _redis
+
+
+def hash_key(*parts: Any) -> str:
+    """Stable digest of the key parts (prompts can be long; Redis keys should not be)."""
+    raw = json.dumps(parts, separators=(",", ":"), default=str, ensure_ascii=False)
+    return hashlib.sha256(raw.encode('utf8')).hexdigest()
+
+
+class TwoTierCache:
+    """LRU + Redis cache for one namespace. Per-call TTLs; metrics under 'cache.<namespace>.*'."""
+
+    _MISSING = object()
+
+    def __init__(self, namespace: str, max_entries: int = 1000):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self._l1: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict() # key -> (expires_at, value)
+
+    def _redis_key(self, key: str) -> str:
+        return f"cache:{self.namespace}:{key}"
+
+    def _l1_get(self, key: str) -> Any:
+        item = self._l1.get(key)
+        if item is None:
+            return self._MISSING
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._l1[key]
+            return self._MISSING
+        self._l1.move_to_end(key)
+        return value
+
+    def _l1_set(self, key: str, value: Any, ttl: float) -> None:
+        self._l1[key] = (time.monotonic() + ttl, value)
+        self._l1.move_to_end(key)
+        while len(self._l1) > self.max_entries:
+            self._l1.popitem(last=False)
+
+    async def get(self, key: str, site: Optional[str] = None) -> Tuple[bool, Any]:
+        """Returns (hit, value). `site` only labels metrics (e.g. the calling workflow stage)."""
+        label = f"cache.{self.namespace}" + (f".{site}" if site else "")
+        value = self._l1_get(key)
+        if value is not self._MISSING:
+            metrics.increment(f"{label}.l1_hit")
+            return True, value
+        if _redis is not None:
+            try:
+                raw = await _redis.get(self._redis_key(key))
+                if raw is not None:
+                    ttl = await _redis.ttl(self._redis_key(key))
+                    value = json.loads(raw)
+                    self._l1_set(key, value, ttl if ttl and ttl > 0 else 60) # Never outlive the L2 entry
+                    metrics.increment(f"{label}.l2_hit")
+                    return True, value
+            except Exception as e:
+                metrics.increment(f"{label}.l2_error")
+                logger.warning(f"Redis cache read failed ({self.namespace}): {e}")
+        metrics.increment(f"{label}.miss")
+        return False, None
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        if ttl <= 0:
+            return
+        self._l1_set(key, value, ttl)
+        if _redis is not None:
+            try:
+                await _redis.set(self._redis_key(key), json.dumps(value), ex=int(ttl))
+            except Exception as e:
+                logger.warning(f"Redis cache write failed ({self.namespace}): {e}")
+
+    def clear_local(self) -> None:
+        self._l1.clear()
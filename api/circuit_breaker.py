@@ -0,0 +1,147 @@
+# api/circuit_breaker.py
+"""
+Per-upstream circuit breakers (Groq, Cohere, VirusTotal, IPQS, URLScan, search API).
+
+closed     -> calls pass; `failure_threshold` consecutive failures open the breaker.
+open       -> calls fail immediately with CircuitOpenException (an ApiException, so the
+              existing fallback paths handle it) until `recovery_timeout_seconds` pass.
+half_open  -> one probe call is let through; success closes the breaker, failure re-opens it.
+
+Only upstream failures count: ApiExceptions flagged upstream_failure (timeouts, transport
+errors, 5xx). 4xx responses (bad or oversized input, auth), missing configuration and
+RateLimitException (the upstream is up but throttling us) never trip a breaker.
+"""
+
+import logging
+import time
+from functools import wraps
+from typing import Any, Dict, Optional
+
+from . import metrics
+from .utils import get_config, ApiException, RateLimitException
+
+logger = logging.getLogger(__name__)
+CONFIG = get_config()
+BREAKER_CONFIG = CONFIG.get('circuit_breakers', {})
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+_breakers: Dict[str, "CircuitBreaker"] = {}
+
+
+class CircuitOpenException(ApiException):
+    """Raised instead of calling an upstream whose breaker is open."""
+    pass
+
+
+def is_upstream_failure(exc: BaseException) -> bool:
+    return (isinstance(exc, ApiException) and getattr(exc, "upstream_failure", False)
+            and not isinstance(exc, (RateLimitException, CircuitOpenException)))
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker for one upstream. Event-loop only (no locking)."""
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 30.0, half_open_max_calls: int = 1):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probes_in_flight = 0
+
+    def allow_request(self) -> bool:
+        """Whether a call may go out now (moves open -> half_open once the recovery timeout has passed)."""
+        if self.state == OPEN:
+            if time.monotonic() - self.opened_at < self.recovery_timeout:
+                metrics.increment(f"breaker.{self.name}.rejected")
+                return False
+            self._transition(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            if self._probes_in_flight >= self.half_open_max_calls:
+                metrics.increment(f"breaker.{self.name}.rejected")
+                return False
+            self._probes_in_flight += 1
+        return True
+
+    def check(self) -> None:
+        """Raises CircuitOpenException unless a call may go out now."""
+        if not self.allow_request():
+            raise CircuitOpenException(f"{self.name} is unavailable (circuit open after {self.consecutive_failures} consecutive failures); skipping call.")
+
+    def record_success(self) -> None:
+        if self.state == HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+            self._transition(CLOSED)
+        self.consecutive_failures = 0
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        if self.state == HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+            self._transition(OPEN) # Probe failed: wait a full recovery timeout again
+        elif self.state == CLOSED and self.consecutive_failures >= self.failure_threshold:
+            self._transition(OPEN)
+
+    def record_neutral(self) -> None:
+        """A call that neither proved nor disproved health (e.g. rate limited): just frees a probe slot."""
+        if self.state == HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+
+    def _transition(self, state: str) -> None:
+        if state == self.state:
+            return
+        previous, self.state = self.state, state
+        if state == OPEN:
+            self.opened_at = time.monotonic()
+            logger.error(f"Circuit breaker '{self.name}' OPEN after {self.consecutive_failures} consecutive failures; failing fast for {self.recovery_timeout:.0f}s.")
+        elif state == CLOSED:
+            logger.info(f"Circuit breaker '{self.name}' closed (upstream recovered).")
+        else:
+            logger.info(f"Circuit breaker '{self.name}' half-open: probing upstream.")
+        metrics.increment(f"breaker.{self.name}.{previous}_to_{state}")
+
+    def snapshot(self) -> Dict[str, Any]:
+        retry_in = max(0.0, self.recovery_timeout - (time.monotonic() - self.opened_at)) if self.state == OPEN else 0.0
+        return {"state": self.state, "consecutive_failures": self.consecutive_failures, "retry_in_seconds": round(retry_in, 1)}
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Breaker for an upstream, created on first use from circuit_breakers.<name> (falling back to 'default')."""
+    breaker = _breakers.get(name)
+    if breaker is None:
+        settings = {**BREAKER_CONFIG.get('default', {}), **BREAKER_CONFIG.get(name, {})}
+        breaker = _breakers[name] = CircuitBreaker(
+            name,
+            failure_threshold=settings.get('failure_threshold', 5),
+            recovery_timeout=settings.get('recovery_timeout_seconds', 30),
+            half_open_max_calls=settings.get('half_open_max_calls', 1))
+    return breaker
+
+
+def circuit_breaker(name: str):
+    """Decorator guarding an async upstream call with the named breaker."""
+    breaker = get_breaker(name)
+
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            breaker.check()
+            try:
+                result = await func(*args, **kwargs)
+            except BaseException as e:
+                if is_upstream_failure(e): breaker.record_failure()
+                else: breaker.record_neutral()
+                raise
+            breaker.record_success()
+            return result
+        wrapper.breaker = breaker
+        return wrapper
+    return decorator
+
+
+def get_breaker_states() -> Dict[str, Dict[str, Any]]:
+    """State of every breaker created so far (for /status)."""
+    return {name: breaker.snapshot() for name, breaker in sorted(_breakers.items())}
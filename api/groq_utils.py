@@ -7,7 +7,9 @@ import json
 import asyncio
 import time # Keep for logging duration
 import re
-from typing import Optional, Dict, Any # Added Optional, Dict, Any
+import random
+from typing import Optional, Dict, Any, AsyncIterator, Awaitable, Callable, TypeVar # Added Optional, Dict, Any
+from contextvars import ContextVar
 from functools import wraps # Keep wraps for decorator
 
 from dotenv import load_dotenv
@@ -16,6 +18,13 @@ from dotenv import load_dotenv
 # Make sure utils.py defines these exceptions
 try:
     from .utils import get_config, RateLimitException, ApiException
+    from .cache_utils import TwoTierCache, hash_key
+    from .singleflight import singleflight
+    from .rate_limiter import ModelRateLimiter
+    from . import metrics
+    from .streaming import JsonFieldStreamer
+    from .circuit_breaker import circuit_breaker, get_breaker, is_upstream_failure, CircuitOpenException
+    from .http_clients import register_client
 except ImportError:
     # Fallback if run standalone for testing, though ideally it relies on the package structure
     print("Warning: Running groq_utils possibly standalone. Trying relative path for utils.")
@@ -61,6 +70,7 @@ def setup_groq_client():
             timeout=REQUEST_TIMEOUT + 10, # Client timeout slightly higher than request timeout
             limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
         )
+        register_client("groq", _groq_client) # Pool stats on /metrics; lifecycle stays here
         logger.info("Shared Groq HTTP client initialized.")
     except Exception as e:
         logger.error(f"Failed to initialize shared Groq HTTP client: {e}", exc_info=True)
@@ -78,21 +88,194 @@ async def close_groq_client():
         finally:
              _groq_client = None # Ensure it's marked as closed/None
 
+# --- Client-side Rate Limiting ---
+# Per-model RPM/TPM buckets so bursts queue briefly instead of turning into 429 storms.
+RATE_LIMITS = GROQ_CONFIG.get('rate_limits', {})
+RATE_LIMIT_MAX_WAIT = GROQ_CONFIG.get('rate_limit_max_wait_seconds', 20) # Queue at most this long, then RateLimitException
+RATE_LIMIT_MAX_REQUEUES = GROQ_CONFIG.get('rate_limit_max_requeues', 2) # Re-queues after a 429 (within the wait budget)
+_rate_limiters: Dict[str, ModelRateLimiter] = {}
+
+def get_rate_limiter(model: str) -> ModelRateLimiter:
+    """Limiter for a model, created on first use from groq.rate_limits (falling back to 'default')."""
+    limiter = _rate_limiters.get(model)
+    if limiter is None:
+        limits = RATE_LIMITS.get(model) or RATE_LIMITS.get('default', {})
+        limiter = _rate_limiters[model] = ModelRateLimiter(
+            model, rpm=limits.get('rpm', 30), tpm=limits.get('tpm', 6000), max_concurrency=limits.get('max_concurrency', 4),
+            completion_estimate=limits.get('completion_token_estimate', 512))
+    return limiter
+
+# --- Retries & Hedging ---
+RETRY_CONFIG = GROQ_CONFIG.get('retry', {})
+RETRY_MAX_ATTEMPTS = RETRY_CONFIG.get('max_retries', 2)
+RETRY_BASE_DELAY = RETRY_CONFIG.get('base_delay_seconds', 0.5)
+RETRY_MAX_DELAY = RETRY_CONFIG.get('max_delay_seconds', 4.0)
+RETRYABLE_STATUSES = set(RETRY_CONFIG.get('retryable_statuses', [500, 502, 503, 504]))
+HEDGE_CONFIG = GROQ_CONFIG.get('hedging', {})
+HEDGE_ENABLED = HEDGE_CONFIG.get('enabled', True)
+HEDGE_MIN_DELAY = HEDGE_CONFIG.get('min_delay_seconds', 1.0) # Never hedge sooner than this, whatever the p95
+HEDGE_MAX_RATIO = HEDGE_CONFIG.get('max_hedge_ratio', 0.05) # At most 5% extra calls
+HEDGE_MIN_SAMPLES = HEDGE_CONFIG.get('min_samples', 50) # Latency samples needed before the p95 is trusted
+
+# --- LLM Response Cache ---
+# Near-deterministic calls (low temperature) are cached per call site, keyed by
+# (model, temperature, max_tokens, prompt hash). See llm_cache in config.yaml.
+LLM_CACHE_CONFIG = CONFIG.get('llm_cache', {})
+LLM_CACHE_ENABLED = LLM_CACHE_CONFIG.get('enabled', True)
+LLM_CACHE_MAX_TEMPERATURE = LLM_CACHE_CONFIG.get('max_temperature', 0.2) # Hotter sampling is not worth caching
+LLM_CACHE_TTLS = LLM_CACHE_CONFIG.get('ttl_seconds', {}) # Call site -> TTL
+_llm_cache = TwoTierCache("llm", max_entries=LLM_CACHE_CONFIG.get('local_max_entries', 2000))
+
+def _llm_cache_ttl(cache_site: Optional[str], temperature: float) -> int:
+    """TTL for a call site, or 0 when the call must not be cached."""
+    if not LLM_CACHE_ENABLED or not cache_site or temperature > LLM_CACHE_MAX_TEMPERATURE:
+        return 0
+    return int(LLM_CACHE_TTLS.get(cache_site, LLM_CACHE_TTLS.get('default', 0)))
+
+# --- Token Streaming ---
+# Set per request by the streaming endpoint; query_groq calls from STREAM_SITES then use
+# Groq's stream mode and forward readable text to the sink as (site, text) while generating.
+STREAMING_CONFIG = GROQ_CONFIG.get('streaming', {})
+STREAM_SITES = set(STREAMING_CONFIG.get('sites', ['misinfo', 'factual', 'rag', 'synthesis']))
+STREAM_JSON_FIELDS = STREAMING_CONFIG.get('json_fields', ['explanation', 'synthesized_explanation', 'answer'])
+_token_sink: ContextVar[Optional[Callable[[str, str], None]]] = ContextVar("groq_token_sink", default=None)
+
+def stream_tokens_to(sink: Optional[Callable[[str, str], None]]):
+    """Routes streamed LLM text of the current task (and tasks it spawns) to sink(site, text). Returns a reset token."""
+    return _token_sink.set(sink)
+
+def _resolve_model_params(model: Optional[str], temperature: Optional[float]):
+    """Applies config defaults for model and temperature."""
+    model_to_use = model or GROQ_CONFIG.get('model')
+    temp_to_use = temperature if temperature is not None else GROQ_CONFIG.get('temperature')
+
+    if not model_to_use:
+         logger.error("Groq model name is not specified in call or config.")
+         raise ValueError("Missing Groq model configuration.")
+    if temp_to_use is None: # Should have a default in config, but double check
+        logger.warning("Groq temperature not specified, using default 0.1")
+        temp_to_use = 0.1
+    return model_to_use, temp_to_use
+
 # --- Main Groq Query Function ---
 async def query_groq(
     prompt: str,
     model: str = None, # Use default from config if None
     temperature: float = None, # Use default from config if None
-    max_tokens: int = 2048 # Default max_tokens, adjust if needed
+    max_tokens: int = 2048, # Default max_tokens, adjust if needed
+    cache_site: Optional[str] = None # e.g. "misinfo"; enables the response cache with that site's TTL
     ) -> Optional[str]:
     """
     Sends a query to the Groq API using the shared client and returns the content.
+    With `cache_site`, identical low-temperature calls are answered from the LLM cache.
 
     Raises:
         RateLimitException: If Groq API returns 429.
         GroqApiException: For other 4xx/5xx errors from Groq or network issues.
         ValueError: If essential configuration (model, client) is missing.
     """
+    model_to_use, temp_to_use = _resolve_model_params(model, temperature)
+    # A streaming request (see stream_tokens_to) receives this call's output as it is generated
+    sink = _token_sink.get()
+    streaming = sink is not None and cache_site in STREAM_SITES
+
+    cache_ttl = _llm_cache_ttl(cache_site, temp_to_use)
+    if cache_ttl:
+        cache_key = hash_key(model_to_use, temp_to_use, max_tokens, prompt)
+        hit, cached = await _llm_cache.get(cache_key, site=cache_site)
+        if hit:
+            logger.debug(f"LLM cache hit ({cache_site}) for model {model_to_use}.")
+            if streaming and cached:
+                text = JsonFieldStreamer(STREAM_JSON_FIELDS).feed(cached)
+                if text: sink(cache_site, text)
+            return cached
+
+    if streaming:
+        content = await _stream_to_sink(prompt, model_to_use, temp_to_use, max_tokens, cache_site, sink)
+    else:
+        content = await _query_groq_uncached(prompt, model_to_use, temp_to_use, max_tokens)
+    if cache_ttl and content: # Never cache empty/failed responses
+        await _llm_cache.set(cache_key, content, cache_ttl)
+    return content
+
+async def _post_once(payload: Dict[str, Any], limiter: ModelRateLimiter, estimated_tokens: int, deadline: float) -> httpx.Response:
+    """One limiter-admitted POST. 429s are re-queued through the limiter; other statuses are returned."""
+    model = payload["model"]
+    attempt = 0
+    while True:
+        await limiter.acquire(estimated_tokens, deadline) # Raises RateLimitException if no capacity in time
+        request_start_time = time.monotonic()
+        response = None
+        try:
+            response = await _groq_client.post(
+                "/chat/completions",
+                json=payload,
+                timeout=REQUEST_TIMEOUT # Per-request timeout from config
+            )
+        finally:
+            limiter.release(response.status_code if response is not None else None,
+                            response.headers if response is not None else None)
+
+        request_duration = time.monotonic() - request_start_time
+        logger.debug(f"Groq response received in {request_duration:.3f}s. Status: {response.status_code}")
+        if response.status_code < 400:
+            metrics.observe(f"groq.latency.{model}", request_duration) # Feeds the hedge delay
+
+        if response.status_code == 429:
+            if attempt < RATE_LIMIT_MAX_REQUEUES and limiter.can_admit_by(deadline):
+                attempt += 1
+                logger.info(f"Groq 429 for {model}; re-queueing call (attempt {attempt}/{RATE_LIMIT_MAX_REQUEUES}).")
+                continue
+            logger.warning(f"Groq API rate limit hit (Status 429) for {model}.")
+            raise RateLimitException("Groq API rate limit exceeded.")
+        return response
+
+def _hedge_delay(model: str) -> Optional[float]:
+    """Seconds to wait before hedging a call, or None when hedging is off/unwarranted for this call."""
+    if not HEDGE_ENABLED or metrics.sample_count(f"groq.latency.{model}") < HEDGE_MIN_SAMPLES:
+        return None
+    # Cap the hedge rate: hedges may be at most HEDGE_MAX_RATIO of all calls
+    if metrics.get_counter("groq.hedge.fired") >= HEDGE_MAX_RATIO * max(1, metrics.get_counter("groq.calls")):
+        metrics.increment("groq.hedge.suppressed")
+        return None
+    return max(HEDGE_MIN_DELAY, metrics.percentile(f"groq.latency.{model}", 95) or 0.0)
+
+def _usable(task: asyncio.Task) -> bool:
+    return not task.cancelled() and task.exception() is None and task.result().status_code < 400
+
+async def _post_hedged(payload: Dict[str, Any], limiter: ModelRateLimiter, estimated_tokens: int, deadline: float) -> httpx.Response:
+    """Sends the call; if it runs past the model's p95 latency, races a duplicate and keeps the first good response."""
+    metrics.increment("groq.calls")
+    delay = _hedge_delay(payload["model"])
+    primary = asyncio.ensure_future(_post_once(payload, limiter, estimated_tokens, deadline))
+    if delay is None:
+        return await primary
+    done, _ = await asyncio.wait({primary}, timeout=delay)
+    # Re-check the cap (other calls may have hedged meanwhile); never hedge into a saturated limiter
+    if done or _hedge_delay(payload["model"]) is None or not limiter.has_headroom(estimated_tokens):
+        return await primary
+
+    metrics.increment("groq.hedge.fired")
+    logger.debug(f"Hedging Groq call to {payload['model']} after {delay:.2f}s.")
+    hedge = asyncio.ensure_future(_post_once(payload, limiter, estimated_tokens, deadline))
+    pending = {primary, hedge}
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if _usable(task):
+                    if task is hedge: metrics.increment("groq.hedge.won")
+                    return task.result()
+        # Neither attempt produced a usable response: surface the primary's outcome
+        return primary.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+@singleflight("groq") # Identical concurrent prompts (viral claims) share one completion
+@circuit_breaker("groq") # Fails fast while Groq is down (counted after retries)
+async def _query_groq_uncached(prompt: str, model_to_use: str, temp_to_use: float, max_tokens: int) -> Optional[str]:
+    """Performs the actual chat completion request (see query_groq), with retries and hedging."""
     global _groq_client
     if _groq_client is None:
          # It should be initialized by the lifespan manager before this is called
@@ -100,17 +283,6 @@ async def query_groq(
          # Raise an exception because the application state is wrong
          raise GroqApiException("Groq client has not been initialized. Check application startup.")
 
-    # Use defaults from config if arguments are None
-    model_to_use = model or GROQ_CONFIG.get('model')
-    temp_to_use = temperature if temperature is not None else GROQ_CONFIG.get('temperature')
-
-    if not model_to_use:
-         logger.error("Groq model name is not specified in call or config.")
-         raise ValueError("Missing Groq model configuration.")
-    if temp_to_use is None: # Should have a default in config, but double check
-        logger.warning("Groq temperature not specified, using default 0.1")
-        temp_to_use = 0.1
-
     payload = {
         "model": model_to_use,
         "messages": [{"role": "user", "content": prompt}],
@@ -118,23 +290,30 @@ async def query_groq(
         "max_tokens": max_tokens,
     }
 
+    limiter = get_rate_limiter(model_to_use)
+    estimated_tokens = limiter.estimate_call_tokens(prompt, max_tokens) # Typical completion, not the full budget; reconciled below
+
     try:
-        request_start_time = time.monotonic()
         logger.debug(f"Sending request to Groq model {model_to_use}. Prompt: '{prompt[:100]}...'")
-
-        response = await _groq_client.post(
-            "/chat/completions",
-            json=payload,
-            timeout=REQUEST_TIMEOUT # Per-request timeout from config
-        )
-
-        request_duration = time.monotonic() - request_start_time
-        logger.debug(f"Groq response received in {request_duration:.3f}s. Status: {response.status_code}")
-
-        # --- Specific Error Handling ---
-        if response.status_code == 429:
-            logger.warning(f"Groq API rate limit hit (Status 429). Prompt: '{prompt[:50]}...'")
-            raise RateLimitException("Groq API rate limit exceeded.")
+        for attempt in range(RETRY_MAX_ATTEMPTS + 1):
+            retry_reason = None
+            # Each attempt gets its own admission window: a timed-out attempt must not use up the retries' queueing time
+            deadline = time.monotonic() + RATE_LIMIT_MAX_WAIT
+            try:
+                response = await _post_hedged(payload, limiter, estimated_tokens, deadline)
+                if response.status_code in RETRYABLE_STATUSES:
+                    retry_reason = str(response.status_code)
+            except (httpx.TimeoutException, httpx.TransportError) as e:
+                if attempt >= RETRY_MAX_ATTEMPTS:
+                    raise
+                retry_reason = type(e).__name__
+            if retry_reason is None or attempt >= RETRY_MAX_ATTEMPTS:
+                break
+            # Full jitter: uniform over [0, base * 2^attempt], capped - spreads out synchronized retries
+            backoff = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * (2 ** attempt)))
+            metrics.increment(f"groq.retry.{retry_reason}")
+            logger.warning(f"Groq call to {model_to_use} failed ({retry_reason}); retry {attempt + 1}/{RETRY_MAX_ATTEMPTS} in {backoff:.2f}s.")
+            await asyncio.sleep(backoff)
 
         # Handle other client/server errors
         if response.status_code >= 400:
@@ -146,11 +325,12 @@ async def query_groq(
             except json.JSONDecodeError:
                 error_message += f": {response.text}"
                 logger.error(f"Groq API Error Response (non-JSON): {response.text}")
-            raise GroqApiException(error_message)
+            raise GroqApiException(error_message, status_code=response.status_code) # Only 5xx count against the breaker
         # --- End Specific Error Handling ---
 
         # If success (2xx)
         data = response.json()
+        limiter.reconcile(estimated_tokens, data.get("usage"))
         choices = data.get("choices")
         if choices and isinstance(choices, list) and len(choices) > 0:
             message = choices[0].get("message")
@@ -167,11 +347,11 @@ async def query_groq(
     # Handle client-side or network errors
     except httpx.TimeoutException:
         logger.warning(f"Groq request timed out after {REQUEST_TIMEOUT}s. Prompt: '{prompt[:50]}...'")
-        raise GroqApiException(f"Groq API request timed out ({REQUEST_TIMEOUT}s).")
+        raise GroqApiException(f"Groq API request timed out ({REQUEST_TIMEOUT}s).", upstream_failure=True)
     except httpx.RequestError as req_err:
         # E.g., DNS resolution error, connection refused, etc.
         logger.error(f"Network error connecting to Groq: {req_err}")
-        raise GroqApiException(f"Network error contacting Groq: {req_err}")
+        raise GroqApiException(f"Network error contacting Groq: {req_err}", upstream_failure=True)
     # Re-raise specific custom exceptions if they somehow occurred before this block
     except (RateLimitException, GroqApiException) as api_exc:
          raise api_exc
@@ -181,6 +361,101 @@ async def query_groq(
         raise GroqApiException(f"Unexpected error during Groq communication: {e}")
 
 
+# --- Streaming Groq Query ---
+async def query_groq_stream(
+    prompt: str,
+    model: str = None,
+    temperature: float = None,
+    max_tokens: int = 2048
+    ) -> AsyncIterator[str]:
+    """
+    Streams a completion (Groq `stream: true`), yielding content deltas as they arrive.
+    Rate limited like query_groq, but never retried or hedged: callers may already have used the output.
+
+    Raises:
+        RateLimitException: If no capacity is available in time or Groq returns 429.
+        GroqApiException: For other API errors, timeouts or network issues.
+    """
+    model_to_use, temp_to_use = _resolve_model_params(model, temperature)
+    if _groq_client is None:
+         raise GroqApiException("Groq client has not been initialized. Check application startup.")
+
+    payload = {
+        "model": model_to_use,
+        "messages": [{"role": "user", "content": prompt}],
+        "temperature": temp_to_use,
+        "max_tokens": max_tokens,
+        "stream": True,
+    }
+    breaker = get_breaker("groq")
+    breaker.check() # Raises CircuitOpenException while Groq is down
+    limiter = get_rate_limiter(model_to_use)
+    estimated_tokens = limiter.estimate_call_tokens(prompt, max_tokens)
+    try:
+        await limiter.acquire(estimated_tokens, time.monotonic() + RATE_LIMIT_MAX_WAIT)
+    except BaseException:
+        breaker.record_neutral(); raise
+
+    status_code, headers, usage = None, None, None
+    request_start_time = time.monotonic()
+    try:
+        async with _groq_client.stream("POST", "/chat/completions", json=payload, timeout=REQUEST_TIMEOUT) as response:
+            status_code, headers = response.status_code, response.headers
+            if status_code == 429:
+                raise RateLimitException("Groq API rate limit exceeded.")
+            if status_code >= 400:
+                body = (await response.aread()).decode('utf8', errors='replace')
+                logger.error(f"Groq API Error Response (stream): {body[:500]}")
+                raise GroqApiException(f"Groq API error {status_code}: {body[:500]}", status_code=status_code)
+
+            first_token = True
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                try: chunk = json.loads(data)
+                except json.JSONDecodeError: continue
+                usage = (chunk.get("x_groq") or {}).get("usage") or usage # Sent on the final chunk
+                choices = chunk.get("choices") or []
+                delta = (choices[0].get("delta") or {}).get("content") if choices else None
+                if delta:
+                    if first_token:
+                        metrics.observe(f"groq.ttft.{model_to_use}", time.monotonic() - request_start_time)
+                        first_token = False
+                    yield delta
+    except httpx.TimeoutException:
+        breaker.record_failure()
+        logger.warning(f"Groq stream timed out after {REQUEST_TIMEOUT}s. Prompt: '{prompt[:50]}...'")
+        raise GroqApiException(f"Groq API request timed out ({REQUEST_TIMEOUT}s).", upstream_failure=True)
+    except httpx.RequestError as req_err:
+        breaker.record_failure()
+        logger.error(f"Network error streaming from Groq: {req_err}")
+        raise GroqApiException(f"Network error contacting Groq: {req_err}", upstream_failure=True)
+    except BaseException as e:
+        if is_upstream_failure(e): breaker.record_failure()
+        else: breaker.record_neutral()
+        raise
+    else:
+        breaker.record_success()
+    finally:
+        limiter.release(status_code, headers)
+        limiter.reconcile(estimated_tokens, usage)
+
+async def _stream_to_sink(prompt: str, model: str, temperature: float, max_tokens: int,
+                          site: str, sink: Callable[[str, str], None]) -> Optional[str]:
+    """Streams a completion into the sink and returns the full text (like query_groq would)."""
+    streamer = JsonFieldStreamer(STREAM_JSON_FIELDS)
+    parts = []
+    async for delta in query_groq_stream(prompt, model=model, temperature=temperature, max_tokens=max_tokens):
+        parts.append(delta)
+        text = streamer.feed(delta)
+        if text: sink(site, text)
+    content = "".join(parts).strip()
+    return content or None
+
+
 # --- Higher-Level Groq Functions ---
 # (analyze_misinformation_groq, ask_groq_factual, extract_intent_groq)
 # These functions remain structurally similar, but now they call the updated
@@ -188,8 +463,55 @@ async def query_groq(
 # We need to ensure their `try...except` blocks correctly handle the
 # `RateLimitException` and `GroqApiException` that `query_groq` might raise.
 
+# --- Model Cascade ---
+# Cheapest tier first; a result is escalated to the next tier only when it is unconfident,
+# unresolved or failed. Served/escalated counters and latencies per tier go to /metrics.
+CASCADE_CONFIG = GROQ_CONFIG.get('cascade', {})
+CASCADE_ENABLED = CASCADE_CONFIG.get('enabled', True)
+CASCADE_TIERS = CASCADE_CONFIG.get('tiers', ['llama3-8b-8192', 'llama3-70b-8192'])
+CASCADE_MIN_CONFIDENCE = CASCADE_CONFIG.get('min_confidence', 0.7) # Below this, escalate
+CASCADE_ESCALATE_CATEGORIES = set(CASCADE_CONFIG.get('escalate_categories', ['needs_verification', 'contradictory', 'error']))
+FACTUAL_CONFIDENCE_LEVELS = {"high": 0.9, "medium": 0.6, "low": 0.2, "error": 0.0} # ask_groq_factual levels as numbers
+T = TypeVar("T")
+
+async def run_cascade(task: str, attempt: Callable[[Optional[str]], Awaitable[T]], needs_escalation: Callable[[T], bool]) -> T:
+    """
+    Runs attempt(model) tier by tier until a result does not need escalation (the last tier always serves).
+    With the cascade disabled, runs once with model=None (the caller's default model).
+    """
+    tiers = CASCADE_TIERS if CASCADE_ENABLED and CASCADE_TIERS else [None]
+    for tier, model in enumerate(tiers):
+        tier_name = model or "default"
+        start_time = time.monotonic()
+        result = await attempt(model)
+        metrics.observe(f"cascade.{task}.{tier_name}.latency", time.monotonic() - start_time)
+        if tier == len(tiers) - 1 or not needs_escalation(result):
+            metrics.increment(f"cascade.{task}.{tier_name}.served")
+            return result
+        metrics.increment(f"cascade.{task}.{tier_name}.escalated")
+        logger.info(f"Cascade '{task}': {tier_name} result not confident enough, escalating to {tiers[tier + 1]}.")
+        sink = _token_sink.get()
+        if sink is not None: # Streaming clients: text after this marker supersedes the earlier tier's
+            sink("cascade", f"escalating to {tiers[tier + 1]}")
+
+def _as_confidence(value: Any) -> float:
+    try: return float(value)
+    except (TypeError, ValueError): return 0.0
+
+def _misinfo_needs_escalation(result: Dict[str, Any]) -> bool:
+    return result.get("category") in CASCADE_ESCALATE_CATEGORIES or _as_confidence(result.get("confidence")) < CASCADE_MIN_CONFIDENCE
+
+def _factual_needs_escalation(result: Dict[str, Any]) -> bool:
+    return FACTUAL_CONFIDENCE_LEVELS.get(result.get("confidence_level"), 0.0) < CASCADE_MIN_CONFIDENCE
+
 async def analyze_misinformation_groq(text: str, model: str = None) -> Dict[str, Any]:
-    """Analyze text for misinformation using Groq ONLY."""
+    """Analyze text for misinformation using Groq ONLY (model cascade unless a model is given)."""
+    if model:
+        return await _analyze_misinformation_once(text, model)
+    return await run_cascade("misinfo", lambda tier_model: _analyze_misinformation_once(text, tier_model), _misinfo_needs_escalation)
+
+async def _analyze_misinformation_once(text: str, model: Optional[str]) -> Dict[str, Any]:
+    """Single-model misinformation analysis (see analyze_misinformation_groq)."""
     logger.debug(f"Initiating Groq-only misinformation analysis for: '{text[:100]}...'")
     try:
         # Prompt assumes the detailed instructions from previous versions
@@ -210,7 +532,7 @@ async def analyze_misinformation_groq(text: str, model: str = None) -> Dict[str,
         """
 
         # No temperature override here, rely on default low temp for analysis
-        raw_response_content = await query_groq(prompt, model=model) # Error handling within query_groq
+        raw_response_content = await query_groq(prompt, model=model, cache_site="misinfo") # Error handling within query_groq
 
         if not raw_response_content:
             raise GroqApiException("Groq returned empty content for misinformation analysis.")
@@ -260,7 +582,7 @@ async def analyze_misinformation_groq(text: str, model: str = None) -> Dict[str,
                 "raw_response": raw_response_content # Include raw response for debugging
             }
 
-    except (RateLimitException, GroqApiException) as api_err:
+    except (RateLimitException, GroqApiException, CircuitOpenException) as api_err:
          logger.error(f"Groq API error during misinfo analysis: {api_err}")
          return {
              "category": "error", "confidence": 0.0,
@@ -276,14 +598,20 @@ async def analyze_misinformation_groq(text: str, model: str = None) -> Dict[str,
          }
 
 async def ask_groq_factual(question: str, model: str = None) -> Dict[str, Any]:
-    """Handle factual QA using Groq ONLY."""
+    """Handle factual QA using Groq ONLY (model cascade unless a model is given)."""
+    if model:
+        return await _ask_groq_factual_once(question, model)
+    return await run_cascade("factual", lambda tier_model: _ask_groq_factual_once(question, tier_model), _factual_needs_escalation)
+
+async def _ask_groq_factual_once(question: str, model: Optional[str]) -> Dict[str, Any]:
+    """Single-model factual QA (see ask_groq_factual)."""
     logger.debug(f"Initiating Groq-only factual QA for: '{question[:100]}...'")
     try:
         # Simple, direct factual prompt
         prompt = f"Please answer the following question factually and concisely. If you don't know the answer or it requires knowledge beyond your cutoff date, please state that clearly.\n\nQuestion: \"{question}\"\n\nAnswer:"
 
         # Use low temperature for factual consistency
-        answer_content = await query_groq(prompt, model=model, temperature=0.05)
+        answer_content = await query_groq(prompt, model=model, temperature=0.05, cache_site="factual")
 
         if not answer_content:
              raise GroqApiException("Groq returned empty content for factual question.")
@@ -307,7 +635,7 @@ async def ask_groq_factual(question: str, model: str = None) -> Dict[str, Any]:
         logger.info(f"Groq Factual question answered. Confidence: {confidence}")
         return result
 
-    except (RateLimitException, GroqApiException) as api_err:
+    except (RateLimitException, GroqApiException, CircuitOpenException) as api_err:
         logger.error(f"Groq API error during factual QA: {api_err}")
         return {
             "question": question, "answer": f"Failed to get answer due to API error: {api_err}",
@@ -330,7 +658,7 @@ async def extract_intent_groq(query: str, model: str = None) -> str:
         # Keep the prompt simple for classification
         prompt = f"""Classify the user's primary intent from the following query into one of these categories: 'misinfo_check', 'url_analysis', 'factual_question', 'other'. Query: "{query}" Intent: """
         # Use a cheaper/faster model maybe? e.g. llama3-8b
-        intent_response = await query_groq(prompt, model=(model or "llama3-8b-8192"), temperature=0.0)
+        intent_response = await query_groq(prompt, model=(model or "llama3-8b-8192"), temperature=0.0, cache_site="intent")
 
         if not intent_response:
             logger.warning("Groq intent classification returned empty content.")
@@ -0,0 +1,127 @@
+# api/http_clients.py
+"""
+Shared, long-lived HTTP clients for the scanner and search utilities.
+
+One httpx.AsyncClient (connection pool) per upstream, created by main.py's lifespan via
+start_http_clients() and closed by close_http_clients(). Reusing pooled keep-alive
+connections saves a TCP+TLS handshake per call. Limits come from http_clients.<name>
+in config (falling back to http_clients.default).
+
+Call sites use `async with shared_client("virustotal") as client:` - it yields the shared
+client (never closes it) and tracks in-flight requests for the pool metrics.
+Per-call settings (API-key headers, timeouts) are passed on each request.
+"""
+
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional
+
+import httpx
+
+from . import metrics
+from .utils import get_config
+
+logger = logging.getLogger(__name__)
+CONFIG = get_config()
+CLIENT_CONFIG = CONFIG.get('http_clients', {})
+UPSTREAMS = ("virustotal", "ipqs", "urlscan", "search")
+
+try:
+    import h2 # noqa: F401 - only needed for HTTP/2
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+_clients: Dict[str, httpx.AsyncClient] = {}
+_in_flight: Dict[str, int] = {}
+
+
+def _settings(name: str) -> Dict[str, Any]:
+    return {**CLIENT_CONFIG.get('default', {}), **CLIENT_CONFIG.get(name, {})}
+
+
+def _create_client(name: str) -> httpx.AsyncClient:
+    settings = _settings(name)
+    http2 = bool(settings.get('http2', False))
+    if http2 and not HTTP2_AVAILABLE:
+        logger.warning(f"HTTP/2 requested for '{name}' but the 'h2' package is not installed; using HTTP/1.1.")
+        http2 = False
+    limits = httpx.Limits(
+        max_connections=settings.get('max_connections', 20),
+        max_keepalive_connections=settings.get('max_keepalive_connections', 10),
+        keepalive_expiry=settings.get('keepalive_expiry_seconds', 30),
+    )
+    timeout = httpx.Timeout(settings.get('timeout_seconds', 30), connect=settings.get('connect_timeout_seconds', 5))
+    client = httpx.AsyncClient(limits=limits, timeout=timeout, http2=http2)
+    logger.info(f"Shared HTTP client '{name}' created (max connections: {limits.max_connections}, keep-alive: {limits.max_keepalive_connections}, http2: {http2}).")
+    return client
+
+
+def register_client(name: str, client: httpx.AsyncClient) -> None:
+    """Adds a client managed elsewhere (e.g. Groq's) to the pool metrics. It is not closed here."""
+    _clients[name] = client
+    _in_flight.setdefault(name, 0)
+
+
+def get_client(name: str) -> httpx.AsyncClient:
+    """Shared client for an upstream; created on first use if the lifespan has not started it (e.g. scripts)."""
+    client = _clients.get(name)
+    if client is None or client.is_closed:
+        client = _clients[name] = _create_client(name)
+        _in_flight.setdefault(name, 0)
+    return client
+
+
+@asynccontextmanager
+async def shared_client(name: str):
+    """Yields the shared client for `name` without closing it, counting the request as in flight."""
+    client = get_client(name)
+    _in_flight[name] = _in_flight.get(name, 0) + 1
+    metrics.increment(f"http.{name}.requests")
+    try:
+        yield client
+    finally:
+        _in_flight[name] -= 1
+
+
+def start_http_clients() -> None:
+    """Creates the pools for all scanner/search upstreams (called from lifespan)."""
+    for name in UPSTREAMS:
+        get_client(name)
+
+
+async def close_http_clients() -> None:
+    """Closes the pools created here (registered external clients are left to their owners)."""
+    for name in UPSTREAMS:
+        client = _clients.pop(name, None)
+        if client is not None and not client.is_closed:
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.error(f"Error closing shared HTTP client '{name}': {e}")
+    logger.info("Shared HTTP clients closed.")
+
+
+def _pool_connections(client: httpx.AsyncClient) -> Optional[list]:
+    """httpcore's connection list (not public httpx API, so read defensively)."""
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    connections = getattr(pool, "connections", None)
+    return list(connections) if connections is not None else None
+
+
+def get_pool_stats() -> Dict[str, Dict[str, Any]]:
+    """Per-upstream pool utilization: open/idle connections, in-flight requests, configured limit."""
+    stats = {}
+    for name, client in sorted(_clients.items()):
+        entry: Dict[str, Any] = {"in_flight": _in_flight.get(name, 0), "closed": client.is_closed}
+        limits = getattr(getattr(getattr(client, "_transport", None), "_pool", None), "_max_connections", None)
+        if limits is not None:
+            entry["max_connections"] = limits
+        connections = _pool_connections(client)
+        if connections is not None:
+            idle = sum(1 for c in connections if c.is_idle())
+            entry.update({"connections": len(connections), "idle": idle, "active": len(connections) - idle})
+            if limits:
+                entry["utilization"] = round((len(connections) - idle) / limits, 3)
+        stats[name] = entry
+    return stats
@@ -10,6 +10,10 @@ import json        # <-- Ensure imported for JSONDecodeError
 # --- Custom Exception Imports ---
 try:
     from .utils import get_config, RateLimitException, ApiException
+    from .singleflight import singleflight
+    from .circuit_breaker import circuit_breaker
+    from .http_clients import shared_client
+    from .scanner_quota import acquire_scan_quota, drain_scan_quota
 except ImportError:
     print("Warning: Running ipqs_utils possibly standalone.")
     from utils import get_config, RateLimitException, ApiException # type: ignore
@@ -24,13 +28,15 @@ API_BASE_URL = IPQS_CONFIG.get('url_check_api_url', "https://ipqualityscore.com/
 TIMEOUT = IPQS_CONFIG.get('request_timeout', 20)
 logger = logging.getLogger(__name__)
 
+@singleflight("ipqs")
+@circuit_breaker("ipqs")
 async def check_ipqs(url: str) -> Optional[Dict[str, Any]]:
     """
     Checks a URL's reputation using the IPQualityScore API.
 
-    Returns: Raw JSON response dict on success, None on 404, timeout, network error,
-             or parsing failure.
-    Raises: RateLimitException, ApiException for relevant API errors.
+    Returns: Raw JSON response dict on success, None on 404 or parsing failure.
+    Raises: RateLimitException, ApiException for relevant API errors, timeouts and network errors
+            (CircuitOpenException while IPQS is known to be down).
     """
     if not API_KEY:
         logger.error("IPQualityScore API key not found in env variables.")
@@ -57,12 +63,14 @@ async def check_ipqs(url: str) -> Optional[Dict[str, Any]]:
 
         logger.debug(f"Sending request to IPQS: URL={ipqs_request_url}, Params={ipqs_params}")
 
-        async with httpx.AsyncClient(timeout=TIMEOUT + 5) as client:
-            response = await client.get(ipqs_request_url, params=ipqs_params)
+        await acquire_scan_quota("ipqs") # Shared per-minute/day quota; raises RateLimitException instead of sending
+        async with shared_client("ipqs") as client:
+            response = await client.get(ipqs_request_url, params=ipqs_params, timeout=TIMEOUT + 5)
 
             # --- Specific Error Checks ---
             if response.status_code == 429:
                 logger.warning(f"IPQS rate limit (429) for {url}.")
+                await drain_scan_quota("ipqs")
                 raise RateLimitException("IPQS rate limit reached.")
             if response.status_code == 401:
                  logger.error(f"IPQS unauthorized (401) for {url}. Check API Key.")
@@ -75,7 +83,7 @@ async def check_ipqs(url: str) -> Optional[Dict[str, Any]]:
                  try: details = response.json(); error_msg += f": {details}"
                  except json.JSONDecodeError: error_msg += f": {details}" # Keep text if not JSON
                  logger.error(f"{error_msg} for URL: {url}")
-                 raise ApiException(error_msg)
+                 raise ApiException(error_msg, status_code=response.status_code)
             # --- End Checks ---
 
             # --- Attempt JSON parsing only on success ---
@@ -99,12 +107,13 @@ async def check_ipqs(url: str) -> Optional[Dict[str, Any]]:
             return response_json # Return the parsed JSON dict
 
     # --- Handle Transport / Unexpected Errors ---
+    # Transport failures raise (like vt_utils) so the circuit breaker sees the upstream is unreachable
     except httpx.TimeoutException:
         logger.warning(f"IPQS request timed out for {url}.")
-        return None
+        raise ApiException(f"IPQS request timed out ({TIMEOUT}s).", upstream_failure=True)
     except httpx.RequestError as req_err:
         logger.error(f"Network error contacting IPQS for {url}: {req_err}")
-        return None
+        raise ApiException(f"Network error contacting IPQS: {req_err}", upstream_failure=True)
     except (RateLimitException, ApiException) as e: # Re-raise handled exceptions
         raise e
     except Exception as e: # Catch any other unexpected error
@@ -0,0 +1,524 @@
+# api/kg_compact.py
+"""
+Compact, integer-indexed storage engine for the Knowledge Graph.
+
+The KG is bipartite: claims mention entities. Instead of a networkx DiGraph
+(one attribute dict per node plus duplicated 'mentions'/'mentioned_in' edges),
+this stores:
+  * interned string IDs -> dense integer indexes (separately for entities and claims)
+  * columnar attributes in typed arrays (counters, timestamps, assessment codes)
+  * claim -> entities adjacency in CSR form (claims are append-only)
+  * entity -> claims adjacency as one typed array per entity
+  * entity <-> entity co-occurrence counts (claims shared), kept incrementally
+  * a MinHash signature per claim plus LSH band buckets for near-duplicate lookup
+Each link is stored once per direction as a 4-byte integer.
+"""
+
+import heapq
+import sys
+import time
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .kg_dedup import NUM_PERM, band_keys, estimate_similarity, minhash_signature
+
+# Claim attribute names stored in dedicated columns; anything else goes to a sparse 'extra' dict
+_CLAIM_COLUMNS = {"type", "text", "assessment", "url", "created_at"}
+# Structures that shrink when claims are evicted (what the retention memory budget measures)
+_CLAIM_SIDE_FIELDS = ("_claim_index", "_claim_ids", "_claim_text", "_claim_url", "_claim_assessment", "_claim_created",
+                      "_claim_offsets", "_claim_targets", "_claim_extra", "_claim_signatures", "_lsh_buckets", "_entity_claims")
+# Strongest co-mentions kept pre-sorted per entity, so traversal never sorts a hot entity's full co-occurrence dict
+TOP_CO_MENTIONS = 32
+
+
+class CompactKnowledgeGraph:
+    """Array-backed claim/entity graph with the narrow API kg_utils needs."""
+
+    def __init__(self):
+        self.graph: Dict[str, Any] = {} # Graph-level attributes (same name as networkx)
+
+        # Interning tables
+        self._labels: List[str] = [] # Entity NER labels (PERSON, ORG, ...)
+        self._label_index: Dict[str, int] = {}
+        self._assessments: List[str] = [] # Normalized assessment strings
+        self._assessment_index: Dict[str, int] = {}
+
+        # --- Entity columns (indexed by entity index) ---
+        self._entity_index: Dict[str, int] = {}
+        self._entity_ids: List[str] = []
+        self._entity_names: List[str] = []
+        self._entity_label = array('H')
+        self._mention_count = array('I')
+        self._claim_count = array('I')
+        self._last_seen = array('d') # 0.0 = never
+        self._entity_assessment_counts: List[array] = [] # One column per assessment code
+        self._entity_claims: List[array] = [] # Entity -> claim indexes
+        self._cooccurrence: List[Dict[int, int]] = [] # Entity -> {co-mentioned entity index: shared claims}
+        self._top_co: List[List[int]] = [] # Entity -> up to TOP_CO_MENTIONS indexes, most shared claims first
+        self._entity_extra: Dict[int, Dict[str, Any]] = {}
+
+        # --- Claim columns (indexed by claim index) ---
+        self._claim_index: Dict[str, int] = {}
+        self._claim_ids: List[str] = []
+        self._claim_text: List[str] = []
+        self._claim_url: List[str] = []
+        self._claim_assessment = array('B')
+        self._claim_created = array('d')
+        self._claim_offsets = array('Q', [0]) # CSR: entities of claim i are targets[offsets[i]:offsets[i+1]]
+        self._claim_targets = array('I')
+        self._claim_extra: Dict[int, Dict[str, Any]] = {}
+
+        # --- Near-duplicate index ---
+        self._claim_signatures = array('I') # NUM_PERM values per claim (all zero = no text)
+        self._lsh_buckets: Dict[int, int] = {} # LSH band key -> first claim index that landed in it
+
+    # --- Interning ---
+
+    def _intern_label(self, label: Optional[str]) -> int:
+        label = label or ""
+        code = self._label_index.get(label)
+        if code is None:
+            code = self._label_index[label] = len(self._labels)
+            self._labels.append(label)
+        return code
+
+    def _intern_assessment(self, assessment: Optional[str]) -> int:
+        assessment = assessment or "unknown"
+        code = self._assessment_index.get(assessment)
+        if code is None:
+            code = self._assessment_index[assessment] = len(self._assessments)
+            self._assessments.append(assessment)
+            self._entity_assessment_counts.append(array('I', [0]) * len(self._entity_ids))
+        return code
+
+    # --- Node lookups ---
+
+    def has_node(self, node_id: str) -> bool:
+        return node_id in self._entity_index or node_id in self._claim_index
+
+    def is_claim(self, node_id: str) -> bool:
+        return node_id in self._claim_index
+
+    def is_entity(self, node_id: str) -> bool:
+        return node_id in self._entity_index
+
+    def number_of_entities(self) -> int:
+        return len(self._entity_ids)
+
+    def number_of_claims(self) -> int:
+        return len(self._claim_ids)
+
+    def number_of_nodes(self) -> int:
+        return len(self._entity_ids) + len(self._claim_ids)
+
+    def number_of_edges(self) -> int:
+        """Number of claim-mentions-entity links (each link is one logical edge)."""
+        return len(self._claim_targets)
+
+    def iter_entity_ids(self) -> Iterator[str]:
+        return iter(self._entity_ids)
+
+    def iter_entity_names(self) -> Iterator[tuple]:
+        """Yields (name, label, claim_count, aliases) per entity, for building name matchers."""
+        for idx, name in enumerate(self._entity_names):
+            aliases = self._entity_extra.get(idx, {}).get("aliases") or ()
+            yield name, self._labels[self._entity_label[idx]], self._claim_count[idx], aliases
+
+    def entity_claim_ids(self, entity_id: str) -> List[str]:
+        idx = self._entity_index.get(entity_id)
+        if idx is None:
+            return []
+        return [self._claim_ids[c] for c in self._entity_claims[idx]]
+
+    def claim_entity_ids(self, claim_id: str) -> List[str]:
+        idx = self._claim_index.get(claim_id)
+        if idx is None:
+            return []
+        return [self._entity_ids[e] for e in self._claim_targets[self._claim_offsets[idx]:self._claim_offsets[idx + 1]]]
+
+    # --- Mutations ---
+
+    def add_entity(self, entity_id: str, **attrs) -> int:
+        """Adds an entity node (or updates its attributes if it exists). Returns its index."""
+        idx = self._entity_index.get(entity_id)
+        if idx is not None:
+            if attrs: self.set_attrs(entity_id, **attrs)
+            return idx
+        idx = self._entity_index[entity_id] = len(self._entity_ids)
+        self._entity_ids.append(entity_id)
+        self._entity_names.append(attrs.get("name") or "")
+        self._entity_label.append(self._intern_label(attrs.get("type")))
+        self._mention_count.append(0); self._claim_count.append(0); self._last_seen.append(0.0)
+        for column in self._entity_assessment_counts: column.append(0)
+        self._entity_claims.append(array('I'))
+        self._cooccurrence.append({})
+        self._top_co.append([])
+        extra = {k: v for k, v in attrs.items() if k not in ("name", "type")}
+        if extra: self.set_attrs(entity_id, **extra)
+        return idx
+
+    def add_claim(self, claim_id: str, entities: Iterable[str] = (), **attrs) -> int:
+        """Adds a claim node linked to `entities` (created bare if missing). Returns its index."""
+        idx = self._claim_index.get(claim_id)
+        if idx is not None:
+            if attrs: self.set_attrs(claim_id, **attrs)
+            return idx
+        idx = self._claim_index[claim_id] = len(self._claim_ids)
+        self._claim_ids.append(claim_id)
+        self._claim_text.append(attrs.get("text") or "")
+        self._claim_url.append(attrs.get("url") or "")
+        self._claim_assessment.append(self._intern_assessment(attrs.get("assessment")))
+        self._claim_created.append(float(attrs.get("created_at") or 0.0))
+        extra = {k: v for k, v in attrs.items() if k not in _CLAIM_COLUMNS}
+        if extra: self._claim_extra[idx] = extra
+        self._claim_offsets.append(self._claim_offsets[-1])
+        self._index_claim_text(idx)
+        for entity_id in dict.fromkeys(entities): # Dedupe, keep order
+            self.link(claim_id, entity_id)
+        return idx
+
+    def link(self, claim_id: str, entity_id: str) -> None:
+        """Links a claim to an entity. CSR adjacency only allows extending the most recent claim."""
+        claim_idx = self._claim_index.get(claim_id)
+        if claim_idx is None:
+            raise KeyError(f"Unknown claim '{claim_id}'")
+        if claim_idx != len(self._claim_ids) - 1:
+            raise ValueError(f"Cannot link '{claim_id}': only the most recently added claim can gain links.")
+        entity_idx = self._entity_index.get(entity_id)
+        if entity_idx is None:
+            entity_idx = self.add_entity(entity_id)
+        start = self._claim_offsets[claim_idx]
+        co_mentioned = self._claim_targets[start:]
+        if entity_idx in co_mentioned:
+            return
+        # Every entity already on this claim now shares one more claim with the new one
+        for other_idx in co_mentioned:
+            self._bump_cooccurrence(entity_idx, other_idx)
+            self._bump_cooccurrence(other_idx, entity_idx)
+        self._claim_targets.append(entity_idx)
+        self._claim_offsets[claim_idx + 1] += 1
+        self._entity_claims[entity_idx].append(claim_idx)
+
+    def set_attrs(self, node_id: str, **attrs) -> None:
+        """Updates node attributes; known names go to columns, the rest to a sparse dict."""
+        idx = self._entity_index.get(node_id)
+        if idx is not None:
+            for key, value in attrs.items():
+                if key == "name": self._entity_names[idx] = value or ""
+                elif key == "type": self._entity_label[idx] = self._intern_label(value)
+                elif key == "mention_count": self._mention_count[idx] = int(value or 0)
+                elif key == "claim_count": self._claim_count[idx] = int(value or 0)
+                elif key == "last_seen": self._last_seen[idx] = float(value or 0.0)
+                elif key == "assessment_counts":
+                    for column in self._entity_assessment_counts: column[idx] = 0
+                    for assessment, count in (value or {}).items():
+                        self._entity_assessment_counts[self._intern_assessment(assessment)][idx] = int(count)
+                else: self._entity_extra.setdefault(idx, {})[key] = value
+            return
+        idx = self._claim_index.get(node_id)
+        if idx is not None:
+            for key, value in attrs.items():
+                if key == "text": self._claim_text[idx] = value or ""
+                elif key == "url": self._claim_url[idx] = value or ""
+                elif key == "assessment": self._claim_assessment[idx] = self._intern_assessment(value)
+                elif key == "created_at": self._claim_created[idx] = float(value or 0.0)
+                elif key == "type": continue # Always 'claim'
+                else: self._claim_extra.setdefault(idx, {})[key] = value
+
+    # --- Co-occurrence / traversal ---
+
+    def _bump_cooccurrence(self, a: int, b: int) -> None:
+        """Increments a's shared-claim count with b and keeps a's top list sorted (counts only grow, so this stays exact)."""
+        counts = self._cooccurrence[a]
+        count = counts[b] = counts.get(b, 0) + 1
+        top = self._top_co[a]
+        if b in top:
+            top.remove(b)
+        elif len(top) >= TOP_CO_MENTIONS:
+            if count <= counts[top[-1]]:
+                return
+            top.pop()
+        pos = len(top) # Insert after all entries with a count >= ours (top lists are tiny)
+        while pos and counts[top[pos - 1]] < count:
+            pos -= 1
+        top.insert(pos, b)
+
+    def _strongest_co_mentions(self, idx: int, n: int, skip: Optional[set] = None) -> List[tuple]:
+        """Up to n (index, count) pairs, most shared claims first, excluding `skip`."""
+        counts = self._cooccurrence[idx]
+        picked = [(other, counts[other]) for other in self._top_co[idx] if not skip or other not in skip][:n]
+        if len(picked) < n and n > TOP_CO_MENTIONS and len(counts) > len(self._top_co[idx]):
+            # Rare: the caller wants more than the presorted list can ever hold
+            rest = ((o, c) for o, c in counts.items() if (not skip or o not in skip) and o not in self._top_co[idx])
+            picked.extend(heapq.nlargest(n - len(picked), rest, key=lambda item: item[1]))
+        return picked
+
+    def co_mentions(self, entity_id: str, top_n: int = 10) -> List[tuple]:
+        """Top-N entities sharing claims with `entity_id`, as [(entity_id, shared_claims)], most shared first."""
+        idx = self._entity_index.get(entity_id)
+        if idx is None:
+            return []
+        return [(self._entity_ids[other], count) for other, count in self._strongest_co_mentions(idx, top_n)]
+
+    def related_entities(self, entity_id: str, max_hops: int, fanout: int, deadline: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Bounded breadth-first walk over the co-occurrence index. Each visited entity expands at most
+        `fanout` neighbors (its strongest co-mentions); the walk stops at `max_hops` or once
+        time.perf_counter() passes `deadline`. Returns [{entity_id, hops, via, shared_claims}] in visit order.
+        """
+        start_idx = self._entity_index.get(entity_id)
+        if start_idx is None or max_hops < 1:
+            return []
+        visited = {start_idx}
+        frontier = [start_idx]
+        related: List[Dict[str, Any]] = []
+        for hop in range(1, max_hops + 1):
+            next_frontier = []
+            for parent in frontier:
+                if deadline is not None and time.perf_counter() > deadline:
+                    return related # Budget spent - return what we have
+                for other, count in self._strongest_co_mentions(parent, fanout, skip=visited):
+                    visited.add(other)
+                    next_frontier.append(other)
+                    related.append({"entity_id": self._entity_ids[other], "hops": hop,
+                                    "via": self._entity_ids[parent], "shared_claims": count})
+            frontier = next_frontier
+            if not frontier:
+                break
+        return related
+
+    # --- Near-duplicate lookup ---
+
+    def _index_claim_text(self, idx: int) -> None:
+        signature = minhash_signature(self._claim_text[idx])
+        self._claim_signatures.extend(signature or (0,) * NUM_PERM)
+        if signature:
+            for key in band_keys(signature):
+                self._lsh_buckets.setdefault(key, idx) # Keep the earliest claim as the bucket's representative
+
+    def _claim_signature(self, idx: int) -> Tuple[int, ...]:
+        return tuple(self._claim_signatures[idx * NUM_PERM:(idx + 1) * NUM_PERM])
+
+    def find_similar_claim(self, text: str, min_similarity: float) -> Optional[Tuple[str, float]]:
+        """Best existing claim whose estimated Jaccard similarity to `text` is >= min_similarity, as (claim_id, similarity)."""
+        signature = minhash_signature(text)
+        if not signature:
+            return None
+        best: Optional[Tuple[str, float]] = None
+        for candidate in {self._lsh_buckets[key] for key in band_keys(signature) if key in self._lsh_buckets}:
+            similarity = estimate_similarity(signature, self._claim_signature(candidate))
+            if similarity >= min_similarity and (best is None or similarity > best[1]):
+                best = (self._claim_ids[candidate], similarity)
+        return best
+
+    # --- Attribute reads ---
+
+    def entity_assessment_counts(self, entity_id: str) -> Dict[str, int]:
+        idx = self._entity_index.get(entity_id)
+        if idx is None:
+            return {}
+        return {self._assessments[code]: column[idx] for code, column in enumerate(self._entity_assessment_counts) if column[idx]}
+
+    def get_attrs(self, node_id: str) -> Optional[Dict[str, Any]]:
+        """Returns a fresh attribute dict for a node (networkx-style keys), or None."""
+        idx = self._entity_index.get(node_id)
+        if idx is not None:
+            attrs = {
+                "type": self._labels[self._entity_label[idx]], "name": self._entity_names[idx],
+                "mention_count": self._mention_count[idx], "claim_count": self._claim_count[idx],
+                "assessment_counts": self.entity_assessment_counts(node_id),
+                "last_seen": self._last_seen[idx] or None,
+            }
+            attrs.update(self._entity_extra.get(idx, {}))
+            return attrs
+        idx = self._claim_index.get(node_id)
+        if idx is not None:
+            attrs = {
+                "type": "claim", "text": self._claim_text[idx], "url": self._claim_url[idx],
+                "assessment": self._assessments[self._claim_assessment[idx]],
+                "created_at": self._claim_created[idx] or None,
+            }
+            attrs.update(self._claim_extra.get(idx, {}))
+            return attrs
+        return None
+
+    # --- Retention ---
+
+    def claim_last_active(self, idx: int) -> float:
+        """Most recent time a claim was recorded or re-seen (repeats refresh 'last_seen_at')."""
+        extra = self._claim_extra.get(idx)
+        return max(self._claim_created[idx], float((extra or {}).get("last_seen_at") or 0.0))
+
+    def evict_claims(self, created_before: Optional[float] = None, max_per_entity: Optional[int] = None) -> int:
+        """
+        Drops claims last active before `created_before`, and each entity's oldest claims beyond
+        `max_per_entity`. Entity counters (claim_count, assessment_counts, last_seen) and co-occurrence
+        counts are aggregates and are left untouched, so evicted claims stay folded into them.
+        Claim columns are rebuilt in one O(claims) pass. Returns the number of claims evicted.
+        """
+        return self.apply_eviction(self.plan_eviction(created_before, max_per_entity))
+
+    def plan_eviction(self, created_before: Optional[float] = None, max_per_entity: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        The O(claims) half of evict_claims: builds the rebuilt claim columns without touching the
+        graph (so it can run in a thread while the graph is not mutated). None = nothing to evict.
+        """
+        dead = set()
+        if created_before is not None:
+            dead.update(c for c in range(len(self._claim_ids)) if self.claim_last_active(c) < created_before)
+        if max_per_entity is not None:
+            for claims in self._entity_claims:
+                live = [c for c in claims if c not in dead]
+                if len(live) > max_per_entity:
+                    dead.update(live[:len(live) - max_per_entity]) # Entity lists are in insertion (time) order
+        if not dead:
+            return None
+
+        remap = array('i', [-1]) * len(self._claim_ids) # Old claim index -> new index (-1 = evicted)
+        new_ids: List[str] = []; new_text: List[str] = []; new_url: List[str] = []
+        new_assessment = array('B'); new_created = array('d'); new_signatures = array('I')
+        new_offsets = array('Q', [0]); new_targets = array('I'); new_extra: Dict[int, Dict[str, Any]] = {}
+        for old in range(len(self._claim_ids)):
+            if old in dead:
+                continue
+            new = remap[old] = len(new_ids)
+            new_ids.append(self._claim_ids[old]); new_text.append(self._claim_text[old]); new_url.append(self._claim_url[old])
+            new_assessment.append(self._claim_assessment[old]); new_created.append(self._claim_created[old])
+            new_signatures.extend(self._claim_signatures[old * NUM_PERM:(old + 1) * NUM_PERM])
+            new_targets.extend(self._claim_targets[self._claim_offsets[old]:self._claim_offsets[old + 1]])
+            new_offsets.append(len(new_targets))
+            if old in self._claim_extra: new_extra[new] = self._claim_extra[old]
+
+        new_buckets: Dict[int, int] = {}
+        for idx in range(len(new_ids)):
+            signature = tuple(new_signatures[idx * NUM_PERM:(idx + 1) * NUM_PERM])
+            if any(signature):
+                for key in band_keys(signature): new_buckets.setdefault(key, idx)
+        return {
+            "_claim_ids": new_ids, "_claim_text": new_text, "_claim_url": new_url,
+            "_claim_assessment": new_assessment, "_claim_created": new_created, "_claim_signatures": new_signatures,
+            "_claim_offsets": new_offsets, "_claim_targets": new_targets, "_claim_extra": new_extra,
+            "_claim_index": {claim_id: idx for idx, claim_id in enumerate(new_ids)},
+            "_entity_claims": [array('I', (remap[c] for c in claims if remap[c] >= 0)) for claims in self._entity_claims],
+            "_lsh_buckets": new_buckets, "evicted": len(dead),
+        }
+
+    def apply_eviction(self, plan: Optional[Dict[str, Any]]) -> int:
+        """Swaps in the columns from plan_eviction() (attribute assignments only). Returns the number of claims evicted."""
+        if not plan:
+            return 0
+        plan = dict(plan)
+        evicted = plan.pop("evicted")
+        self.__dict__.update(plan)
+        self.graph["evicted_claim_count"] = self.graph.get("evicted_claim_count", 0) + evicted
+        return evicted
+
+    def age_cutoff_for(self, evict_count: int) -> Optional[float]:
+        """Creation-time cutoff that evicts roughly the `evict_count` oldest claims (claims are appended in time order)."""
+        if evict_count <= 0 or not self._claim_ids:
+            return None
+        return self._claim_created[min(evict_count, len(self._claim_ids) - 1)]
+
+    # --- Copying, pickling, sizing ---
+
+    def copy(self) -> "CompactKnowledgeGraph":
+        """Independent copy (typed arrays copy as contiguous buffers)."""
+        clone = CompactKnowledgeGraph.__new__(CompactKnowledgeGraph)
+        clone.__setstate__(self.__getstate__())
+        return clone
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        # Flatten entity adjacency to CSR so pickling writes a handful of buffers, not one per entity
+        offsets = array('Q', [0]); targets = array('I')
+        for claims in self._entity_claims:
+            targets.extend(claims); offsets.append(len(targets))
+        state["_entity_claims"] = (offsets, targets)
+        state["_entity_assessment_counts"] = [array('I', column) for column in self._entity_assessment_counts]
+        state["_cooccurrence"] = [dict(counts) for counts in self._cooccurrence]
+        state["_top_co"] = [list(top) for top in self._top_co]
+        for name in ("_entity_label", "_mention_count", "_claim_count", "_last_seen", "_claim_assessment",
+                     "_claim_created", "_claim_offsets", "_claim_targets", "_claim_signatures"):
+            state[name] = array(state[name].typecode, state[name])
+        for name in ("_entity_ids", "_entity_names", "_claim_ids", "_claim_text", "_claim_url", "_labels", "_assessments"):
+            state[name] = list(state[name])
+        for name in ("_entity_index", "_claim_index", "_label_index", "_assessment_index", "_lsh_buckets", "graph"):
+            state[name] = dict(state[name])
+        state["_entity_extra"] = {k: dict(v) for k, v in self._entity_extra.items()}
+        state["_claim_extra"] = {k: dict(v) for k, v in self._claim_extra.items()}
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        offsets, targets = state["_entity_claims"]
+        state["_entity_claims"] = [targets[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+        self.__dict__.update(state)
+        if "_cooccurrence" not in state: # Snapshot written before the co-occurrence index existed
+            self._rebuild_cooccurrence()
+        if "_claim_signatures" not in state: # ...or before the near-duplicate index
+            self._claim_signatures = array('I'); self._lsh_buckets = {}
+            for idx in range(len(self._claim_ids)): self._index_claim_text(idx)
+
+    def memory_usage_bytes(self, claims_only: bool = False) -> int:
+        """
+        Approximate in-memory footprint (containers, arrays and the strings they hold).
+        claims_only: just the structures that evicting claims shrinks (entities and co-occurrence counts stay).
+        """
+        total = 0
+        for name, value in self.__dict__.items():
+            if claims_only and name not in _CLAIM_SIDE_FIELDS:
+                continue
+            total += sys.getsizeof(value)
+            if isinstance(value, list):
+                total += sum(sys.getsizeof(item) for item in value)
+            elif isinstance(value, dict):
+                total += sum(sys.getsizeof(v) for v in value.values())
+        return total
+
+    # --- Migration ---
+
+    @classmethod
+    def from_networkx(cls, nx_graph) -> "CompactKnowledgeGraph":
+        """Converts a legacy networkx DiGraph KG (claim -[mentions]-> entity edges) and recomputes aggregates."""
+        compact = cls()
+        compact.graph.update(getattr(nx_graph, "graph", {}))
+        claim_nodes = []
+        for node_id, attrs in nx_graph.nodes(data=True):
+            if attrs.get("type") == "claim":
+                claim_nodes.append((node_id, attrs))
+            else:
+                compact.add_entity(node_id, **{k: v for k, v in attrs.items() if k not in ("claim_count", "assessment_counts")})
+        claim_nodes.sort(key=lambda item: item[1].get("created_at") or 0.0)
+
+        for node_id, attrs in claim_nodes:
+            entity_ids = [n for n in nx_graph.successors(node_id) if compact.is_entity(n)]
+            compact.add_claim(node_id, entities=entity_ids, **attrs)
+        compact.recompute_aggregates()
+        return compact
+
+    def _rebuild_cooccurrence(self) -> None:
+        self._cooccurrence = [{} for _ in self._entity_ids]
+        for c in range(len(self._claim_ids)):
+            members = self._claim_targets[self._claim_offsets[c]:self._claim_offsets[c + 1]]
+            for a in members:
+                counts = self._cooccurrence[a]
+                for b in members:
+                    if a != b: counts[b] = counts.get(b, 0) + 1
+        self._top_co = [heapq.nlargest(TOP_CO_MENTIONS, counts, key=counts.__getitem__) for counts in self._cooccurrence]
+
+    def recompute_aggregates(self) -> None:
+        """
+        Rebuilds entity counters and graph totals from the claim links (O(graph), migrations only).
+        Only live claims are counted, so this must not run on a graph that has evicted claims.
+        """
+        for column in (self._claim_count, self._last_seen, *self._entity_assessment_counts):
+            for i in range(len(column)): column[i] = 0
+        total_counts: Dict[str, int] = {}
+        for c in range(len(self._claim_ids)):
+            code = self._claim_assessment[c]; created = self._claim_created[c]
+            total_counts[self._assessments[code]] = total_counts.get(self._assessments[code], 0) + 1
+            for e in self._claim_targets[self._claim_offsets[c]:self._claim_offsets[c + 1]]:
+                self._claim_count[e] += 1
+                self._entity_assessment_counts[code][e] += 1
+                if created > self._last_seen[e]: self._last_seen[e] = created
+        self.graph.update(claim_count=len(self._claim_ids), assessment_counts=total_counts)
+        self._rebuild_cooccurrence()
@@ -0,0 +1,76 @@
+# api/kg_dedup.py
+"""
+Claim identity for the Knowledge Graph.
+
+* stable_claim_id(): content hash of the normalized claim text (blake2b), identical
+  across workers and restarts - unlike the built-in hash(), which is salted per process.
+* MinHash signatures + LSH banding for near-duplicate detection: claims whose word
+  shingles overlap strongly land in the same band bucket and can be clustered.
+
+Everything here is deterministic (fixed seeds, no process-salted hashing), so
+signatures can be recomputed from stored claim text on any worker.
+"""
+
+import hashlib
+import random
+import re
+from functools import lru_cache
+from typing import List, Sequence, Tuple
+
+# --- MinHash / LSH parameters ---
+# 32 permutations in 4 bands of 8 rows: claims with Jaccard similarity ~0.85 collide in at
+# least one band with high probability, while pairs below ~0.5 almost never do.
+NUM_PERM = 32
+LSH_BANDS = 4
+LSH_ROWS = NUM_PERM // LSH_BANDS
+SHINGLE_WORDS = 3
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1 # Signatures are stored as uint32
+_perm_rng = random.Random(0x6B67) # Fixed seed: permutations must match across processes
+_PERMUTATIONS = [(_perm_rng.randrange(1, _MERSENNE_PRIME), _perm_rng.randrange(0, _MERSENNE_PRIME)) for _ in range(NUM_PERM)]
+
+_NON_WORD_RE = re.compile(r"[^\w\s]+")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_claim_text(text: str) -> str:
+    """Lowercases, strips punctuation and collapses whitespace."""
+    text = _NON_WORD_RE.sub(" ", (text or "").lower())
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+def stable_claim_id(text: str) -> str:
+    """Process-independent claim node ID derived from the normalized text."""
+    digest = hashlib.blake2b(normalize_claim_text(text).encode('utf8'), digest_size=8).hexdigest()
+    return f"claim:{digest}"
+
+
+def _shingle_hashes(normalized: str) -> List[int]:
+    words = normalized.split()
+    if len(words) <= SHINGLE_WORDS:
+        grams = [" ".join(words)] if words else []
+    else:
+        grams = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+    return [int.from_bytes(hashlib.blake2b(g.encode('utf8'), digest_size=8).digest(), 'little') for g in grams]
+
+
+@lru_cache(maxsize=512) # The same text is usually looked up and then inserted within one request
+def minhash_signature(text: str) -> Tuple[int, ...]:
+    """NUM_PERM-value MinHash signature of the text's word shingles (empty tuple for empty text)."""
+    hashes = _shingle_hashes(normalize_claim_text(text))
+    if not hashes:
+        return ()
+    return tuple(min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes) for a, b in _PERMUTATIONS)
+
+
+def band_keys(signature: Sequence[int]) -> List[int]:
+    """One bucket key per LSH band. Tuple hashing of ints is not salted, so keys are stable."""
+    return [hash((band, *signature[band * LSH_ROWS:(band + 1) * LSH_ROWS])) for band in range(LSH_BANDS)]
+
+
+def estimate_similarity(sig_a: Sequence[int], sig_b: Sequence[int]) -> float:
+    """Estimated Jaccard similarity: the fraction of matching signature slots."""
+    if not sig_a or not sig_b:
+        return 0.0
+    return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / NUM_PERM
@@ -0,0 +1,101 @@
+# api/kg_store.py
+"""
+Persistence primitives for the Knowledge Graph: an append-only JSON-lines
+mutation log plus compacted pickle snapshots.
+
+Every record in the log carries a monotonically increasing sequence number
+('seq'). A snapshot stores the graph together with the seq of the last
+mutation it contains, so startup = load snapshot + replay the log tail.
+"""
+
+import json
+import logging
+import os
+import pickle
+import tempfile
+from typing import Any, Dict, Iterator, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT_VERSION = 2 # Version 1 was a bare pickled graph (no seq)
+
+
+def _atomic_write(path: str, write_fn) -> None:
+    """Runs write_fn(file) against a temp file next to `path`, then renames it into place."""
+    target_dir = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=target_dir, prefix=".kg_", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write_fn(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path) # Atomic on POSIX and Windows
+    except BaseException:
+        # Never leave half-written temp files behind
+        try: os.remove(tmp_path)
+        except OSError: pass
+        raise
+
+
+def write_snapshot(path: str, graph_obj: Any, seq: int) -> None:
+    """Atomically writes a compacted snapshot covering all mutations up to `seq`."""
+    payload = {"format": SNAPSHOT_FORMAT_VERSION, "seq": seq, "graph": graph_obj}
+    _atomic_write(path, lambda f: pickle.dump(payload, f, pickle.HIGHEST_PROTOCOL))
+
+
+def read_snapshot(path: str) -> Tuple[Any, int]:
+    """
+    Loads a snapshot. Returns (graph_obj, seq).
+    Legacy snapshots (a bare pickled graph) are returned with seq 0.
+    """
+    with open(path, 'rb') as f:
+        payload = pickle.load(f)
+    if isinstance(payload, dict) and payload.get("format") == SNAPSHOT_FORMAT_VERSION:
+        return payload.get("graph"), int(payload.get("seq", 0))
+    logger.info(f"Snapshot at {path} uses the legacy format (no sequence number).")
+    return payload, 0
+
+
+class KGMutationLog:
+    """Append-only JSON-lines log of graph mutations."""
+
+    def __init__(self, log_path: str):
+        self.log_path = log_path
+
+    def append(self, records: List[Dict[str, Any]]) -> None:
+        """Appends records and fsyncs. Cost is proportional to the number of new records."""
+        if not records:
+            return
+        lines = "".join(json.dumps(rec, separators=(",", ":"), default=str) + "\n" for rec in records)
+        with open(self.log_path, 'a', encoding='utf8') as f:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def read_since(self, seq: int) -> Iterator[Dict[str, Any]]:
+        """Yields records with a sequence number greater than `seq`, in log order."""
+        if not os.path.exists(self.log_path):
+            return
+        with open(self.log_path, 'r', encoding='utf8') as f:
+            for line_no, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # Most likely a torn write at the tail after a crash - skip it
+                    logger.warning(f"Skipping unreadable KG log record at {self.log_path}:{line_no}")
+                    continue
+                if record.get("seq", 0) > seq:
+                    yield record
+
+    def truncate_through(self, seq: int) -> None:
+        """Drops records already covered by a snapshot at `seq` (atomic rewrite)."""
+        remaining = list(self.read_since(seq))
+        lines = "".join(json.dumps(rec, separators=(",", ":"), default=str) + "\n" for rec in remaining)
+        _atomic_write(self.log_path, lambda f: f.write(lines.encode('utf8')))
+
+    def size_bytes(self) -> int:
+        try: return os.path.getsize(self.log_path)
+        except OSError: return 0
@@ -1,33 +1,92 @@
 import logging
-import pickle
 import os
-from typing import List, Dict, Any, Set, Optional, Tuple
+import asyncio
+import time
+from typing import List, Dict, Any, Set, Optional, Tuple, Callable
 
-import networkx as nx
+import networkx as nx # Only needed to migrate snapshots written before the compact store
 import spacy
 from spacy.language import Language
 
 from .utils import get_config
+from .kg_store import KGMutationLog, read_snapshot, write_snapshot
+from .kg_compact import CompactKnowledgeGraph
+from .kg_dedup import normalize_claim_text, stable_claim_id
+from .ner_utils import BatchedNER
+from .gazetteer import Gazetteer
 
 logger = logging.getLogger(__name__)
 CONFIG = get_config()
 KG_CONFIG = CONFIG.get('knowledge_graph', {})
 KG_STORAGE_PATH = KG_CONFIG.get('storage_path', 'data/kg_store/knowledge_graph.gpickle')
+KG_LOG_PATH = KG_CONFIG.get('log_path', KG_STORAGE_PATH + '.log')
 ENTITY_TYPES = set(KG_CONFIG.get('entity_types', ["PERSON", "ORG", "GPE"])) # Default focus
-QUERY_DEPTH = KG_CONFIG.get('query_depth', 1)
+# Gazetteer fast path: match known KG entity names before paying for spaCy
+NER_SETTINGS = CONFIG.get('ner', {})
+GAZETTEER_ENABLED = NER_SETTINGS.get('gazetteer_enabled', True)
+GAZETTEER_MIN_COVERAGE = NER_SETTINGS.get('gazetteer_min_coverage', 0.8) # Below this, spaCy runs instead
+GAZETTEER_MIN_NAME_LENGTH = NER_SETTINGS.get('gazetteer_min_name_length', 3)
+QUERY_DEPTH = KG_CONFIG.get('query_depth', 1) # 1 = the entity's own claims, 2 = + co-mentioned entities, ...
+QUERY_FANOUT = KG_CONFIG.get('query_fanout', 5) # Strongest co-mentions expanded per entity per hop
+QUERY_TIME_BUDGET_MS = KG_CONFIG.get('query_time_budget_ms', 5) # Traversal stops (partial result) after this
+# Claim clustering: repeats (exact or near-duplicate text) attach to the existing claim node
+DEDUP_ENABLED = KG_CONFIG.get('dedup_enabled', True)
+DEDUP_SIMILARITY_THRESHOLD = KG_CONFIG.get('dedup_similarity_threshold', 0.8) # Estimated Jaccard of word shingles
+DEDUP_MIN_WORDS = KG_CONFIG.get('dedup_min_words', 6) # Shorter texts have too few shingles to compare; they only match exactly
+PRIOR_VERDICT_MIN_SIMILARITY = KG_CONFIG.get('prior_verdict_min_similarity', 0.9) # Near-duplicates reported as context (only exact repeats are reused)
+PRIOR_VERDICT_MAX_AGE_DAYS = KG_CONFIG.get('prior_verdict_max_age_days', 30) # Older verdicts are re-analyzed, not served
+# Write-behind persistence: new mutations are appended to the log on a timer or once enough pile up
+FLUSH_INTERVAL_SECONDS = KG_CONFIG.get('flush_interval_seconds', 2)
+FLUSH_AFTER_MUTATIONS = KG_CONFIG.get('flush_after_mutations', 20)
+# Compaction: the log is folded into a fresh snapshot after this many records or this much time
+SNAPSHOT_AFTER_MUTATIONS = KG_CONFIG.get('snapshot_after_mutations', 5000)
+SNAPSHOT_INTERVAL_SECONDS = KG_CONFIG.get('snapshot_interval_seconds', 3600)
+# Single writer: mutations are queued and applied in batches; readers see a copy refreshed this often
+WRITE_BATCH_SIZE = KG_CONFIG.get('write_batch_size', 100)
+WRITE_QUEUE_SIZE = KG_CONFIG.get('write_queue_size', 10000)
+READ_VIEW_REFRESH_SECONDS = KG_CONFIG.get('read_view_refresh_seconds', 1)
+# The copy is O(graph) and holds the GIL, so large graphs refresh less often: at most this share of wall time goes to copying
+READ_VIEW_MAX_COPY_SHARE = KG_CONFIG.get('read_view_max_copy_share', 0.05)
+# Retention: evicted claims stay counted in entity aggregates; None/0 disables a rule
+RETENTION_MAX_CLAIM_AGE_DAYS = KG_CONFIG.get('retention_max_claim_age_days')
+RETENTION_MAX_CLAIMS_PER_ENTITY = KG_CONFIG.get('retention_max_claims_per_entity')
+RETENTION_MEMORY_BUDGET_MB = KG_CONFIG.get('retention_memory_budget_mb') # Claim-side memory only (what eviction can free)
+RETENTION_MAX_EVICT_FRACTION = KG_CONFIG.get('retention_max_evict_fraction', 0.25) # Memory rule: most claims one sweep may drop
+RETENTION_SWEEP_INTERVAL_SECONDS = KG_CONFIG.get('retention_sweep_interval_seconds', 300)
 
 # Global variables for graph and NLP model (loaded once)
-graph: Optional[nx.DiGraph] = None
+graph: Optional[CompactKnowledgeGraph] = None
 nlp: Optional[Language] = None
+ner_service: Optional[BatchedNER] = None # Batched + cached front end for `nlp`
+gazetteer: Optional[Gazetteer] = None # Known entity names, kept in step with the live graph
+_extraction_counts = {"gazetteer": 0, "spacy": 0}
+
+# Mutation log state
+mutation_log = KGMutationLog(KG_LOG_PATH)
+_last_seq = 0 # Seq of the most recent mutation applied to the in-memory graph
+_snapshot_seq = 0 # Seq covered by the snapshot currently on disk
+_last_snapshot_time = time.monotonic()
+_pending_records: List[Dict[str, Any]] = [] # Mutations not yet appended to the log
+
+# Single-writer state (task is started/stopped by main.py's lifespan)
+_write_queue: Optional[asyncio.Queue] = None
+_writer_task: Optional[asyncio.Task] = None
+_STOP_WRITER = object() # Queue sentinel: drain and exit
+_read_view: Optional[CompactKnowledgeGraph] = None # Immutable copy served to readers
+_read_view_seq = 0 # Mutation seq the read view reflects
+_last_view_time = time.monotonic()
+_view_refresh_interval = READ_VIEW_REFRESH_SECONDS # Grows with the measured copy time (see _publish_read_view)
+_last_sweep_time = time.monotonic() # Last retention sweep (see _run_retention_sweep)
 
 def load_spacy_model(model_name="en_core_web_sm") -> Optional[Language]:
     """Loads the spaCy model for NER."""
-    global nlp
+    global nlp, ner_service
     if nlp:
         return nlp
     try:
         # Consider disabling components not needed for NER for speed
         nlp = spacy.load(model_name, disable=["parser", "lemmatizer", "attribute_ruler", "tagger"])
+        ner_service = BatchedNER(nlp, ENTITY_TYPES)
         logger.info(f"SpaCy NER model '{model_name}' loaded successfully.")
         return nlp
     except ImportError:
@@ -38,10 +97,119 @@ def load_spacy_model(model_name="en_core_web_sm") -> Optional[Language]:
         logger.error(f"Error loading spaCy model: {e}", exc_info=True)
     return None
 
-def load_graph() -> nx.DiGraph:
-    """Loads the knowledge graph from storage or creates a new one."""
-    global graph
-    if graph:
+# --- Graph Mutations (all changes go through here so they are logged) ---
+
+def _apply_mutation(target: CompactKnowledgeGraph, record: Dict[str, Any]):
+    """Applies a single mutation record to a graph. Used both live and during log replay."""
+    op = record.get("op")
+    if op == "add_entity":
+        target.add_entity(record["id"], **record.get("attrs", {}))
+    elif op == "add_claim":
+        target.add_claim(record["id"], entities=record.get("entities", []), **record.get("attrs", {}))
+    elif op == "set_node_attrs":
+        target.set_attrs(record["id"], **record.get("attrs", {}))
+    elif op == "set_graph_attrs":
+        target.graph.update(record.get("attrs", {}))
+    elif op == "evict_claims": # Parameters are resolved before logging, so replay evicts the same claims
+        target.evict_claims(created_before=record.get("created_before"), max_per_entity=record.get("max_per_entity"))
+    # Legacy networkx-era ops (logs written before the compact store)
+    elif op == "add_node":
+        attrs = record.get("attrs", {})
+        if attrs.get("type") == "claim": target.add_claim(record["id"], **attrs)
+        else: target.add_entity(record["id"], **attrs)
+    elif op == "add_edge":
+        if record.get("attrs", {}).get("relationship") == "mentions":
+            target.link(record["u"], record["v"]) # 'mentioned_in' is the implicit reverse direction
+    else:
+        logger.warning(f"Ignoring unknown KG mutation op '{op}' (seq {record.get('seq')}).")
+
+def _mutate(op: str, **fields):
+    """Applies a mutation to the live graph and queues it for the mutation log."""
+    global _last_seq
+    _last_seq += 1
+    record = {"seq": _last_seq, "op": op, **fields}
+    _apply_mutation(graph, record)
+    _pending_records.append(record)
+
+def _add_entity(entity_id: str, **attrs):
+    _mutate("add_entity", id=entity_id, attrs=attrs)
+    if gazetteer is not None: # New entities become matchable immediately
+        gazetteer.add(attrs.get('name'), attrs.get('type'))
+        for alias in attrs.get('aliases') or (): gazetteer.add(alias, attrs.get('type'))
+
+def _add_claim(claim_id: str, entities: List[str], **attrs):
+    _mutate("add_claim", id=claim_id, entities=entities, attrs=attrs)
+
+def _set_node_attrs(node_id: str, **attrs):
+    _mutate("set_node_attrs", id=node_id, attrs=attrs)
+
+def _set_graph_attrs(**attrs):
+    _mutate("set_graph_attrs", attrs=attrs)
+
+def entity_node_id(entity_text: str, entity_type: str) -> str:
+    """Normalized KG node ID for an entity, e.g. ('Joe Biden', 'PERSON') -> 'person:joe_biden'."""
+    return f"{entity_type.lower()}:{entity_text.lower().replace(' ', '_')}"
+
+# --- Entity Aggregates ---
+# Entity nodes carry incremental counters so lookups never scan their claims:
+#   claim_count, assessment_counts ({assessment: n}), last_seen (epoch seconds)
+# Graph-level totals live in graph.graph under the same keys.
+
+def get_entity_stats(entity_id: str) -> Optional[Dict[str, Any]]:
+    """Returns the precomputed counters for an entity node (O(1)), or None if unknown."""
+    view = get_read_view()
+    if view is None or not view.is_entity(entity_id):
+        return None
+    attrs = view.get_attrs(entity_id)
+    return {
+        "entity_id": entity_id, "name": attrs.get('name'), "entity_type": attrs.get('type'),
+        "claim_count": attrs.get('claim_count', 0), "assessment_counts": attrs.get('assessment_counts', {}),
+        "last_seen": attrs.get('last_seen'),
+    }
+
+def get_kg_stats() -> Dict[str, Any]:
+    """Lightweight graph-wide statistics (no traversal), as of the current read view."""
+    view = get_read_view()
+    if view is None:
+        return {"loaded": False}
+    return {
+        "loaded": True,
+        "node_count": view.number_of_nodes(), "edge_count": view.number_of_edges(),
+        "claim_count": view.number_of_claims(), "entity_count": view.number_of_entities(),
+        "assessment_counts": dict(view.graph.get('assessment_counts', {})),
+        "duplicate_count": view.graph.get('duplicate_count', 0),
+        "evicted_claim_count": view.graph.get('evicted_claim_count', 0),
+        "last_seq": _last_seq, "snapshot_seq": _snapshot_seq,
+        "read_view_seq": _read_view_seq if _read_view is not None else _last_seq,
+        "read_view_refresh_seconds": round(_view_refresh_interval, 2),
+        "write_queue_depth": _write_queue.qsize() if _write_queue is not None else 0,
+        "pending_log_records": len(_pending_records), "log_size_bytes": mutation_log.size_bytes(),
+    }
+
+def get_related_entities(entity_id: str, depth: Optional[int] = None, fanout: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Entities reachable through shared claims within `depth` (default QUERY_DEPTH), each with its verdict
+    counters. Bounded by QUERY_FANOUT per hop and QUERY_TIME_BUDGET_MS overall, using the precomputed
+    co-occurrence index - no claim scans.
+    """
+    view = get_read_view()
+    if view is None:
+        return []
+    depth = QUERY_DEPTH if depth is None else depth
+    deadline = time.perf_counter() + QUERY_TIME_BUDGET_MS / 1000.0
+    related = view.related_entities(entity_id, max_hops=depth - 1, fanout=fanout or QUERY_FANOUT, deadline=deadline)
+    for item in related:
+        attrs = view.get_attrs(item["entity_id"])
+        item.update(name=attrs.get('name'), entity_type=attrs.get('type'),
+                    claim_count=attrs.get('claim_count', 0), assessment_counts=attrs.get('assessment_counts', {}))
+    return related
+
+# --- Loading & Persistence ---
+
+def load_graph() -> CompactKnowledgeGraph:
+    """Loads the knowledge graph (latest snapshot + mutation log tail) or creates a new one."""
+    global graph, _last_seq, _snapshot_seq
+    if graph is not None:
         return graph
 
     graph_dir = os.path.dirname(KG_STORAGE_PATH)
@@ -49,120 +217,477 @@ def load_graph() -> nx.DiGraph:
         os.makedirs(graph_dir)
         logger.info(f"Created directory for Knowledge Graph: {graph_dir}")
 
+    snapshot_seq = 0
     if os.path.exists(KG_STORAGE_PATH):
         try:
-            with open(KG_STORAGE_PATH, 'rb') as f:
-                graph = pickle.load(f)
-            logger.info(f"Knowledge Graph loaded from {KG_STORAGE_PATH} with {graph.number_of_nodes()} nodes and {graph.number_of_edges()} edges.")
+            graph, snapshot_seq = read_snapshot(KG_STORAGE_PATH)
+            logger.info(f"Knowledge Graph snapshot (seq {snapshot_seq}) loaded from {KG_STORAGE_PATH}.")
         except Exception as e:
             logger.error(f"Error loading knowledge graph from {KG_STORAGE_PATH}: {e}. Creating a new graph.")
-            graph = nx.DiGraph()
+            graph = CompactKnowledgeGraph()
     else:
         logger.info(f"No existing knowledge graph found at {KG_STORAGE_PATH}. Creating a new graph.")
-        graph = nx.DiGraph()
+        graph = CompactKnowledgeGraph()
 
-    if not isinstance(graph, nx.DiGraph): # Handle case where loading failed somehow
-        logger.warning("Loaded object is not a DiGraph, creating a new one.")
-        graph = nx.DiGraph()
+    if isinstance(graph, nx.DiGraph): # Snapshot from before the compact store - migrate in memory
+        logger.info(f"Migrating networkx Knowledge Graph ({graph.number_of_nodes()} nodes) to the compact store...")
+        graph = CompactKnowledgeGraph.from_networkx(graph)
+    elif not isinstance(graph, CompactKnowledgeGraph): # Handle case where loading failed somehow
+        logger.warning("Loaded object is not a Knowledge Graph, creating a new one.")
+        graph = CompactKnowledgeGraph()
+
+    # Replay mutations recorded after the snapshot
+    _snapshot_seq = _last_seq = snapshot_seq
+    replayed = 0; legacy_ops = False
+    try:
+        for record in mutation_log.read_since(snapshot_seq):
+            _apply_mutation(graph, record)
+            _last_seq = max(_last_seq, record.get("seq", 0))
+            legacy_ops = legacy_ops or record.get("op") in ("add_node", "add_edge")
+            replayed += 1
+    except Exception as e:
+        logger.error(f"Error replaying KG mutation log {KG_LOG_PATH}: {e}", exc_info=True)
+    if legacy_ops: # Old logs may predate the aggregate counters
+        if graph.graph.get('evicted_claim_count'): # Recounting live claims would drop the evicted ones from the aggregates
+            logger.warning("KG log has legacy records but claims were evicted; keeping the stored aggregates instead of recomputing them.")
+        else:
+            graph.recompute_aggregates()
 
+    logger.info(f"Knowledge Graph ready with {graph.number_of_entities()} entities and {graph.number_of_claims()} claims ({replayed} log records replayed).")
+    rebuild_gazetteer()
     return graph
 
+def rebuild_gazetteer():
+    """Compiles the gazetteer from the graph's entity names and aliases (most-mentioned entity wins a shared name)."""
+    global gazetteer
+    if not GAZETTEER_ENABLED or graph is None:
+        return
+    names = sorted(graph.iter_entity_names(), key=lambda item: item[2], reverse=True)
+    new_gazetteer = Gazetteer(min_name_length=GAZETTEER_MIN_NAME_LENGTH)
+    for name, label, _, aliases in names:
+        if label not in ENTITY_TYPES:
+            continue
+        new_gazetteer.add(name, label)
+        for alias in aliases: new_gazetteer.add(alias, label)
+    gazetteer = new_gazetteer
+    logger.info(f"Entity gazetteer compiled with {gazetteer.size} names.")
+
+def _write_snapshot_and_compact(graph_to_save: CompactKnowledgeGraph, seq: int):
+    """Writes a snapshot covering `seq` and drops the log records it now contains."""
+    write_snapshot(KG_STORAGE_PATH, graph_to_save, seq)
+    mutation_log.truncate_through(seq)
+
 def save_graph():
-    """Saves the current knowledge graph to storage."""
-    global graph
+    """Saves a full snapshot of the current knowledge graph (synchronously) and compacts the log."""
+    global _snapshot_seq, _last_snapshot_time
     if graph is None:
         logger.warning("Graph not loaded, cannot save.")
         return
     try:
-        with open(KG_STORAGE_PATH, 'wb') as f:
-            pickle.dump(graph, f, pickle.HIGHEST_PROTOCOL)
+        _pending_records.clear() # The snapshot covers them
+        _write_snapshot_and_compact(graph, _last_seq)
+        _snapshot_seq = _last_seq; _last_snapshot_time = time.monotonic()
         logger.debug(f"Knowledge Graph saved to {KG_STORAGE_PATH}")
     except Exception as e:
         logger.error(f"Error saving knowledge graph to {KG_STORAGE_PATH}: {e}", exc_info=True)
 
+def _snapshot_due() -> bool:
+    if _last_seq - _snapshot_seq >= SNAPSHOT_AFTER_MUTATIONS:
+        return True
+    return _last_seq > _snapshot_seq and time.monotonic() - _last_snapshot_time >= SNAPSHOT_INTERVAL_SECONDS
+
+# --- Single-Writer Actor ---
+# Every graph mutation runs on one asyncio task (_writer_loop) fed by _write_queue. Request
+# handlers enqueue work and move on; readers use _read_view, an immutable copy of the graph
+# that the writer republishes between batches. Nothing ever iterates a graph that is changing.
+
+def get_read_view() -> Optional[CompactKnowledgeGraph]:
+    """Latest published read-only graph (the live graph if the writer is not running, e.g. in scripts)."""
+    return _read_view if _read_view is not None else graph
+
+async def _publish_read_view() -> CompactKnowledgeGraph:
+    """
+    Copies the live graph off the loop and swaps it in as the read view. Writer task only.
+    The copy time sets the next refresh interval, so copying never takes more than
+    READ_VIEW_MAX_COPY_SHARE of the writer's time however large the graph grows.
+    """
+    global _read_view, _read_view_seq, _last_view_time, _view_refresh_interval
+    if _read_view is None or _read_view_seq != _last_seq:
+        seq = _last_seq
+        copy_start = time.perf_counter()
+        view = await asyncio.to_thread(graph.copy) # Safe: the only mutator (this task) is awaiting the copy
+        _read_view, _read_view_seq = view, seq # A single reference swap - readers never block
+        copy_seconds = time.perf_counter() - copy_start
+        _view_refresh_interval = max(READ_VIEW_REFRESH_SECONDS, copy_seconds / READ_VIEW_MAX_COPY_SHARE if READ_VIEW_MAX_COPY_SHARE else 0.0)
+        if _view_refresh_interval > READ_VIEW_REFRESH_SECONDS:
+            logger.debug(f"KG read view copy took {copy_seconds:.3f}s; next refresh in {_view_refresh_interval:.1f}s")
+    _last_view_time = time.monotonic()
+    return _read_view
+
+async def flush_graph(force_snapshot: bool = False):
+    """
+    Appends pending mutations to the log (cost proportional to new claims) and, when due,
+    writes a compacted snapshot. File I/O runs off the event loop.
+    Called by the writer task (or after it stopped), so the graph cannot change underneath it.
+    """
+    global _pending_records, _snapshot_seq, _last_snapshot_time
+    if graph is None:
+        return
+    records, _pending_records = _pending_records, []
+    flush_start = time.perf_counter()
+    try:
+        await asyncio.to_thread(mutation_log.append, records)
+    except Exception as e:
+        _pending_records = records + _pending_records # Keep them so the next cycle retries
+        logger.error(f"Error appending to KG mutation log {KG_LOG_PATH}: {e}", exc_info=True)
+        return
+    if records:
+        logger.debug(f"KG mutation log: appended {len(records)} records in {time.perf_counter() - flush_start:.3f}s")
+
+    if (force_snapshot or _snapshot_due()) and _last_seq > _snapshot_seq:
+        snapshot_start = time.perf_counter()
+        try:
+            # The read view is immutable, so it is pickled as-is; its seq matches the log just appended
+            snapshot = await _publish_read_view()
+            await asyncio.to_thread(_write_snapshot_and_compact, snapshot, _read_view_seq)
+            _snapshot_seq = _read_view_seq; _last_snapshot_time = time.monotonic()
+            logger.info(f"KG snapshot written at seq {_snapshot_seq} in {time.perf_counter() - snapshot_start:.3f}s")
+        except Exception as e:
+            logger.error(f"Error writing KG snapshot to {KG_STORAGE_PATH}: {e}", exc_info=True)
+
+async def _writer_loop():
+    """
+    Applies queued write jobs in batches of up to WRITE_BATCH_SIZE, republishes the read view at most
+    every READ_VIEW_REFRESH_SECONDS (longer for large graphs), runs the retention sweep every RETENTION_SWEEP_INTERVAL_SECONDS,
+    and flushes the log every FLUSH_INTERVAL_SECONDS or after FLUSH_AFTER_MUTATIONS pending records.
+    """
+    global _last_sweep_time
+    last_flush = time.monotonic()
+    idle_timeout = min(FLUSH_INTERVAL_SECONDS, READ_VIEW_REFRESH_SECONDS)
+    while True:
+        try:
+            job = await asyncio.wait_for(_write_queue.get(), timeout=idle_timeout)
+        except asyncio.TimeoutError:
+            job = None
+        batch = [job] if job is not None else []
+        while batch and len(batch) < WRITE_BATCH_SIZE and not _write_queue.empty():
+            batch.append(_write_queue.get_nowait())
+
+        stopping = False
+        for item in batch:
+            if item is _STOP_WRITER:
+                stopping = True; continue
+            func, args, kwargs = item
+            try: func(*args, **kwargs)
+            except Exception as e: logger.error(f"KG write job {func.__name__} failed: {e}", exc_info=True)
+        for _ in batch:
+            _write_queue.task_done()
+
+        try:
+            now = time.monotonic()
+            if not stopping and now - _last_sweep_time >= RETENTION_SWEEP_INTERVAL_SECONDS:
+                _last_sweep_time = now
+                await _run_retention_sweep()
+            if _read_view_seq != _last_seq and (stopping or now - _last_view_time >= _view_refresh_interval):
+                await _publish_read_view()
+            if stopping:
+                return
+            if len(_pending_records) >= FLUSH_AFTER_MUTATIONS or now - last_flush >= FLUSH_INTERVAL_SECONDS:
+                await flush_graph(); last_flush = time.monotonic()
+        except Exception as e:
+            logger.error(f"KG writer maintenance step failed: {e}", exc_info=True) # Keep the writer alive
+
+# --- Retention ---
+
+def _plan_retention_sweep() -> Optional[Dict[str, Any]]:
+    """Resolves the configured retention rules into concrete evict_claims parameters (None = nothing to do)."""
+    created_before: Optional[float] = None
+    if RETENTION_MAX_CLAIM_AGE_DAYS:
+        created_before = time.time() - float(RETENTION_MAX_CLAIM_AGE_DAYS) * 86400
+    if RETENTION_MEMORY_BUDGET_MB:
+        budget = float(RETENTION_MEMORY_BUDGET_MB) * 2**20
+        usage = graph.memory_usage_bytes(claims_only=True) # Entity and co-occurrence structures do not shrink with eviction
+        if usage > budget:
+            # Evict the oldest claims in proportion to the overshoot, aiming 10% under budget; capped so later sweeps re-measure
+            overshoot = min((usage - budget * 0.9) / usage, RETENTION_MAX_EVICT_FRACTION)
+            cutoff = graph.age_cutoff_for(int(graph.number_of_claims() * overshoot) + 1)
+            logger.warning(f"KG claim memory {usage / 2**20:.1f} MiB exceeds budget {RETENTION_MEMORY_BUDGET_MB} MiB; evicting ~{overshoot:.0%} oldest claims.")
+            if cutoff is not None:
+                created_before = max(created_before or cutoff, cutoff)
+    if created_before is None and not RETENTION_MAX_CLAIMS_PER_ENTITY:
+        return None
+    return {"created_before": created_before, "max_per_entity": RETENTION_MAX_CLAIMS_PER_ENTITY or None}
+
+async def _run_retention_sweep():
+    """
+    Evicts claims per the retention rules. Writer task only: the O(claims) planning and column
+    rebuild run in a thread while nothing mutates the graph (the writer is awaiting them);
+    the new columns are swapped in on the event loop.
+    """
+    global _last_seq
+    plan = await asyncio.to_thread(_plan_retention_sweep) # memory_usage_bytes() walks every column
+    if plan is None:
+        return
+    sweep_start = time.perf_counter()
+    eviction = await asyncio.to_thread(graph.plan_eviction, plan["created_before"], plan["max_per_entity"]) # Read-only
+    if eviction is None:
+        return
+    _last_seq += 1
+    _pending_records.append({"seq": _last_seq, "op": "evict_claims", **plan}) # Replay recomputes the same eviction
+    evicted = graph.apply_eviction(eviction)
+    if evicted:
+        logger.info(f"KG retention sweep evicted {evicted} claims in {time.perf_counter() - sweep_start:.3f}s ({graph.number_of_claims()} remain).")
+
+async def submit_write(func: Callable[..., Any], *args, **kwargs):
+    """Queues a graph mutation for the writer task. Runs it inline when the writer is not running (scripts)."""
+    if _writer_task is None or _writer_task.done():
+        func(*args, **kwargs)
+        return
+    await _write_queue.put((func, args, kwargs)) # Waits only if the queue is full (backpressure)
+
+async def submit_claim(claim_text: str, assessment: str, source_url: str, entities: List[Tuple[str, str]], confidence: Optional[float] = None):
+    """Request-path entry point: queues add_claim_to_graph for the writer task."""
+    await submit_write(add_claim_to_graph, claim_text, assessment, source_url, entities, confidence=confidence)
+
+def start_graph_writer():
+    """Publishes the initial read view and starts the writer task on the running event loop (idempotent)."""
+    global _write_queue, _writer_task, _read_view, _read_view_seq, _last_view_time
+    if _writer_task is not None and not _writer_task.done():
+        return
+    if graph is None:
+        load_graph()
+    _read_view, _read_view_seq, _last_view_time = graph.copy(), _last_seq, time.monotonic()
+    _write_queue = asyncio.Queue(maxsize=WRITE_QUEUE_SIZE)
+    _writer_task = asyncio.create_task(_writer_loop(), name="kg-writer")
+    logger.info(f"KG writer started (batch: {WRITE_BATCH_SIZE}, read view refresh: {READ_VIEW_REFRESH_SECONDS}s, log flush: {FLUSH_INTERVAL_SECONDS}s / {FLUSH_AFTER_MUTATIONS} mutations).")
+
+async def stop_graph_writer():
+    """Drains queued writes, stops the writer task and compacts everything into a snapshot."""
+    global _writer_task
+    if _writer_task is not None:
+        if not _writer_task.done():
+            await _write_queue.put(_STOP_WRITER) # FIFO: everything queued before it is applied first
+            try: await _writer_task
+            except Exception as e: logger.error(f"KG writer exited with an error: {e}", exc_info=True)
+        _writer_task = None
+    await flush_graph(force_snapshot=True) # Keeps the next startup's log replay short
+    logger.info("KG writer stopped.")
+
 def extract_entities(text: str) -> List[Tuple[str, str]]:
-    """Extracts named entities relevant to the configured types from text."""
-    global nlp
-    if not text or not nlp:
+    """Extracts named entities relevant to the configured types from text (synchronous, cached)."""
+    if not text or ner_service is None:
+        return []
+    try:
+        return ner_service.extract_many([text], batch_size=1, n_process=1)[0]
+    except Exception as e:
+        logger.error(f"Error during entity extraction: {e}", exc_info=True)
         return []
 
+async def extract_entities_async(text: str) -> List[Tuple[str, str]]:
+    """
+    Request-path entity extraction. Known KG entities are matched by the gazetteer in linear time;
+    spaCy (cached, batched, off the event loop) runs only when that finds nothing or explains too
+    few of the text's proper-noun-looking tokens.
+    """
+    if not text:
+        return []
+    if gazetteer is not None:
+        entities, coverage = gazetteer.match(text)
+        if entities and (coverage >= GAZETTEER_MIN_COVERAGE or ner_service is None):
+            _extraction_counts["gazetteer"] += 1
+            return entities
+    if ner_service is None:
+        return []
     try:
-        doc = nlp(text[:nlp.max_length]) # Process text respecting model limits
-        entities = []
-        for ent in doc.ents:
-            if ent.label_ in ENTITY_TYPES:
-                entities.append((ent.text.strip(), ent.label_))
-        # Simple deduplication by text
-        return list(dict.fromkeys(entities))
+        _extraction_counts["spacy"] += 1
+        return await ner_service.extract(text)
     except Exception as e:
         logger.error(f"Error during entity extraction: {e}", exc_info=True)
         return []
 
+def get_entity_extraction_stats() -> Dict[str, Any]:
+    """Gazetteer vs. spaCy usage plus NER batch/cache counters."""
+    stats: Dict[str, Any] = {"gazetteer_names": gazetteer.size if gazetteer is not None else 0,
+                             "served_by_gazetteer": _extraction_counts["gazetteer"], "served_by_spacy": _extraction_counts["spacy"]}
+    if ner_service is not None:
+        stats.update(ner_service.stats())
+    return stats
+
+def start_entity_extractor():
+    """Starts the NER batching task (call from the running event loop after load_spacy_model)."""
+    if ner_service is not None:
+        ner_service.start()
+
+async def stop_entity_extractor():
+    if ner_service is not None:
+        await ner_service.stop()
+
+def backfill_entities(texts: List[str]) -> int:
+    """
+    Bulk mode for ingested corpora: extracts entities with nlp.pipe (see ner.bulk_* config) and adds
+    any new ones to the KG as entity nodes (no claims). Returns the number of entities added.
+    Mutates the live graph: for scripts, not for use while the API's writer task is running.
+    """
+    if ner_service is None:
+        logger.error("SpaCy model not loaded, cannot back-fill entities.")
+        return 0
+    if graph is None:
+        load_graph()
+    added = 0
+    for entities in ner_service.extract_many(texts):
+        for entity_text, entity_type in entities:
+            entity_id = entity_node_id(entity_text, entity_type)
+            if not graph.is_entity(entity_id):
+                _add_entity(entity_id, type=entity_type, name=entity_text)
+                added += 1
+    logger.info(f"Entity back-fill: {added} new entities from {len(texts)} texts.")
+    return added
+
+
+def _match_existing_claim(target: CompactKnowledgeGraph, claim_text: str, min_similarity: float) -> Optional[Tuple[str, float]]:
+    """Exact (stable id) or near-duplicate (MinHash/LSH) match for a claim, as (claim_id, similarity)."""
+    claim_id = stable_claim_id(claim_text)
+    if target.is_claim(claim_id):
+        return claim_id, 1.0
+    if not DEDUP_ENABLED or len(normalize_claim_text(claim_text).split()) < DEDUP_MIN_WORDS:
+        return None
+    return target.find_similar_claim(claim_text[:200], min_similarity) # Same text prefix the claim node stores
+
+def find_prior_verdict(claim_text: str) -> Optional[Dict[str, Any]]:
+    """
+    Returns the recorded verdict for a repeat of `claim_text`, or None if it has not been seen or is too old to reuse.
+    'exact' is True only when the normalized text is identical; near-duplicates can differ by a negation,
+    number or date, so their verdict is context for a new analysis, not an answer.
+    """
+    view = get_read_view()
+    if view is None or not claim_text:
+        return None
+    match = _match_existing_claim(view, claim_text, PRIOR_VERDICT_MIN_SIMILARITY)
+    if match is None:
+        return None
+    claim_id, similarity = match
+    attrs = view.get_attrs(claim_id)
+    assessed_at = attrs.get('assessed_at') or attrs.get('created_at') or 0.0 # Claims from before 'assessed_at' fall back to creation time
+    if PRIOR_VERDICT_MAX_AGE_DAYS and time.time() - assessed_at > float(PRIOR_VERDICT_MAX_AGE_DAYS) * 86400:
+        return None
+    return {
+        "claim_id": claim_id, "similarity": similarity, "exact": claim_id == stable_claim_id(claim_text), "assessment": attrs.get('assessment'),
+        "confidence": attrs.get('confidence'), "seen_count": attrs.get('seen_count', 1),
+        "last_seen_at": attrs.get('last_seen_at') or attrs.get('created_at'), "assessed_at": assessed_at,
+    }
+
+def _record_repeat_claim(claim_id: str, assessment_norm: str, source_url: str, confidence: Optional[float], now: float):
+    """A repeat of an existing claim that was analyzed again: bump its cluster counters; the latest verdict replaces the old one."""
+    claim_attrs = graph.get_attrs(claim_id)
+    previous = claim_attrs.get('assessment')
+    for entity_id in graph.claim_entity_ids(claim_id):
+        entity_updates: Dict[str, Any] = {'last_seen': now}
+        if previous != assessment_norm: # Move the claim's vote in the entity counters
+            counts = graph.entity_assessment_counts(entity_id)
+            counts[previous] = max(counts.get(previous, 0) - 1, 0)
+            counts[assessment_norm] = counts.get(assessment_norm, 0) + 1
+            entity_updates['assessment_counts'] = {k: v for k, v in counts.items() if v}
+        _set_node_attrs(entity_id, **entity_updates)
 
-def add_claim_to_graph(claim_text: str, assessment: str, source_url: str, entities: List[Tuple[str, str]]):
-    """Adds a claim and its entities to the knowledge graph."""
+    # Confidence always follows the latest verdict (None = unknown), so a stale score is never reused
+    claim_updates: Dict[str, Any] = {'seen_count': claim_attrs.get('seen_count', 1) + 1, 'last_seen_at': now, 'assessed_at': now, 'last_url': source_url, 'confidence': confidence}
+    if previous != assessment_norm:
+        claim_updates['assessment'] = assessment_norm
+    _set_node_attrs(claim_id, **claim_updates)
+
+    graph_updates: Dict[str, Any] = {'duplicate_count': graph.graph.get('duplicate_count', 0) + 1}
+    if previous != assessment_norm:
+        total_counts = dict(graph.graph.get('assessment_counts', {}))
+        total_counts[previous] = max(total_counts.get(previous, 0) - 1, 0)
+        total_counts[assessment_norm] = total_counts.get(assessment_norm, 0) + 1
+        graph_updates['assessment_counts'] = {k: v for k, v in total_counts.items() if v}
+    _set_graph_attrs(**graph_updates)
+
+def add_claim_to_graph(claim_text: str, assessment: str, source_url: str, entities: List[Tuple[str, str]], confidence: Optional[float] = None) -> Optional[str]:
+    """
+    Adds a claim and its entities to the knowledge graph, updating entity aggregates.
+    Repeats of a known claim (same or near-duplicate text) update that claim's cluster instead
+    of creating a new node. Returns the claim node ID.
+    Mutates the live graph: call it from the writer task (see submit_claim) or single-threaded scripts.
+    """
     global graph
-    if not graph:
+    if graph is None:
         load_graph() # Ensure graph is loaded
-        if not graph :
-             logger.error("Cannot add claim, KG failed to load."); return
+        if graph is None:
+             logger.error("Cannot add claim, KG failed to load."); return None
 
     # Normalize assessment for graph property
     assessment_norm = assessment.lower().replace(" ", "_")
+    now = time.time()
 
-    # Create a unique node for the claim itself
-    claim_id = f"claim:{hash(claim_text)}_{source_url[:50]}" # Simple unique ID
-    graph.add_node(claim_id, type='claim', text=claim_text[:200], assessment=assessment_norm, url=source_url)
+    match = _match_existing_claim(graph, claim_text, DEDUP_SIMILARITY_THRESHOLD)
+    if match is not None:
+        claim_id, similarity = match
+        _record_repeat_claim(claim_id, assessment_norm, source_url, confidence, now)
+        logger.info(f"Updated KG: claim matches existing '{claim_id}' (similarity {similarity:.2f}), cluster updated.")
+        return claim_id
 
-    entity_nodes = set()
+    # Content-hashed ID: identical across workers and restarts
+    claim_id = stable_claim_id(claim_text)
+
+    entity_nodes: List[str] = []
     for entity_text, entity_type in entities:
-        entity_id = f"{entity_type.lower()}:{entity_text.lower().replace(' ', '_')}" # Normalize node ID
-        if not graph.has_node(entity_id):
-            graph.add_node(entity_id, type=entity_type, name=entity_text)
+        entity_id = entity_node_id(entity_text, entity_type) # Normalize node ID
+        if entity_id in entity_nodes:
+            continue # Same entity under a different surface form - count the claim once
+        entity_updates: Dict[str, Any] = {}
+        if not graph.is_entity(entity_id):
+            _add_entity(entity_id, type=entity_type, name=entity_text)
             logger.debug(f"Added new entity node to KG: {entity_id} ({entity_text})")
+            entity_attrs = graph.get_attrs(entity_id)
         else: # Increment mention count or update properties if needed
-            mention_count = graph.nodes[entity_id].get('mention_count', 0)
-            graph.nodes[entity_id]['mention_count'] = mention_count + 1
+            entity_attrs = graph.get_attrs(entity_id)
+            entity_updates['mention_count'] = entity_attrs.get('mention_count', 0) + 1
+
+        # Incremental aggregates: O(1) per entity instead of scanning its claims at query time
+        counts = entity_attrs.get('assessment_counts', {})
+        counts[assessment_norm] = counts.get(assessment_norm, 0) + 1
+        entity_updates.update(claim_count=entity_attrs.get('claim_count', 0) + 1, assessment_counts=counts, last_seen=now)
+        _set_node_attrs(entity_id, **entity_updates)
+        entity_nodes.append(entity_id)
 
-        # Link the claim to the entity (claim mentions entity)
-        graph.add_edge(claim_id, entity_id, relationship='mentions')
-        # Link the entity to the claim (entity mentioned_in claim) - easier querying?
-        graph.add_edge(entity_id, claim_id, relationship='mentioned_in')
-        entity_nodes.add(entity_id)
+    # The claim links to its entities in both directions (claim mentions entity / entity mentioned_in claim)
+    claim_attrs: Dict[str, Any] = dict(text=claim_text[:200], assessment=assessment_norm, url=source_url, created_at=now, assessed_at=now, seen_count=1)
+    if confidence is not None:
+        claim_attrs['confidence'] = confidence
+    _add_claim(claim_id, entity_nodes, **claim_attrs)
+
+    # Graph-wide totals
+    total_counts = dict(graph.graph.get('assessment_counts', {}))
+    total_counts[assessment_norm] = total_counts.get(assessment_norm, 0) + 1
+    _set_graph_attrs(claim_count=graph.graph.get('claim_count', 0) + 1, assessment_counts=total_counts)
 
     logger.info(f"Updated KG: Added claim '{claim_id}' linked to {len(entity_nodes)} entities.")
-    save_graph()
+    return claim_id # Persisted by the writer task's log flush, not on the request path
 
 
 def query_kg_for_entities(entities: List[Tuple[str, str]]) -> str:
-    """Queries the KG for context about given entities."""
-    global graph
-    if not graph or not entities:
+    """Queries the KG for context about given entities (up to QUERY_DEPTH hops), from the read view."""
+    if get_read_view() is None or not entities:
         return "No relevant entity information found in Knowledge Graph."
 
     insights = []
+    queried_ids = {entity_node_id(text, label) for text, label in entities}
     for entity_text, entity_type in entities:
-        entity_id = f"{entity_type.lower()}:{entity_text.lower().replace(' ', '_')}"
-        if graph.has_node(entity_id):
-            entity_insights = []
-            # Find claims linked TO this entity
-            neighbors = list(nx.neighbors(graph, entity_id)) # Nodes this entity points to
-            claims_mentioned_in = [n for n in neighbors if graph.nodes[n].get('type') == 'claim']
-
-            if claims_mentioned_in:
-                assessments = [graph.nodes[claim_id].get('assessment', 'unknown') for claim_id in claims_mentioned_in]
-                assessment_counts = {ass: assessments.count(ass) for ass in set(assessments)}
-                insight_str = f"Entity '{entity_text}' is mentioned in {len(claims_mentioned_in)} previous claims with assessments: {assessment_counts}."
-                entity_insights.append(insight_str)
-
-            # Add more complex queries if needed (e.g., relations between entities)
-
-            if entity_insights:
-                insights.extend(entity_insights)
+        entity_id = entity_node_id(entity_text, entity_type)
+        stats = get_entity_stats(entity_id)
+        # Precomputed counters - no neighbor scan, regardless of how many claims mention the entity
+        if stats and stats["claim_count"]:
+            insights.append(f"Entity '{entity_text}' is mentioned in {stats['claim_count']} previous claims with assessments: {stats['assessment_counts']}.")
+            # Co-mentioned entities (depth >= 2), skipping ones the caller asked about directly
+            related = [r for r in get_related_entities(entity_id) if r["entity_id"] not in queried_ids]
+            if related:
+                related_str = "; ".join(f"'{r['name'] or r['entity_id']}' ({r['shared_claims']} shared claims, assessments: {r['assessment_counts']})" for r in related[:QUERY_FANOUT])
+                insights.append(f"Often mentioned with: {related_str}.")
 
     if not insights:
         return "Entities found in text, but no prior claims recorded in Knowledge Graph."
 
     # Limit the length of the insights string
     final_insight_str = "Knowledge Graph Context: " + " ".join(insights)
-    return final_insight_str[:500] # Limit output length
+    return final_insight_str[:1000] # Limit output length (room for co-mentioned entities)
@@ -14,12 +14,15 @@ import cohere
 
 from .utils import get_config
 from .groq_utils import query_groq
+from .prompt_builder import EvidenceChunk, build_context, context_budget
+from .circuit_breaker import get_breaker
 
 # Load config globally
 CONFIG = get_config()
 RAG_CONFIG = CONFIG['rag']
 COHERE_CONFIG = CONFIG.get('cohere', {})
 GROQ_CONFIG = CONFIG['groq']
+GROQ_RAG_MAX_TOKENS = 2048 # Completion budget of the RAG answer call (query_groq's default)
 
 # Initialize Cohere client if calling API directly
 COHERE_API_KEY = os.getenv("COHERE_API_KEY")
@@ -192,13 +195,27 @@ class RealTimeDataProcessor:
 
     async def rerank_documents(self, query: str, documents: List[Document]) -> List[Document]:
          """Re-ranks documents using Cohere API."""
+         return [doc for doc, _ in await self.rerank_with_scores(query, documents)]
+
+    @staticmethod
+    def _positional_scores(documents: List[Document]) -> List[Tuple[Document, float]]:
+         """Scores by rank for documents that were not re-ranked (retrieval order is already by similarity)."""
+         return [(doc, 1.0 - i / (len(documents) or 1)) for i, doc in enumerate(documents)]
+
+    async def rerank_with_scores(self, query: str, documents: List[Document]) -> List[Tuple[Document, float]]:
+         """Re-ranks documents using Cohere API, returning (document, relevance score) pairs."""
          if not co or not COHERE_API_KEY or not documents:
               logger.warning("Cohere client not available or no documents to rerank. Returning original order.")
-              return documents[:self.final_top_k] # Return top N originals if no rerank
+              return self._positional_scores(documents[:self.final_top_k]) # Return top N originals if no rerank
 
          if not COHERE_CONFIG.get('rerank_model'):
              logger.warning("Cohere rerank model not configured. Returning original order.")
-             return documents[:self.final_top_k]
+             return self._positional_scores(documents[:self.final_top_k])
+
+         cohere_breaker = get_breaker("cohere")
+         if not cohere_breaker.allow_request():
+             logger.warning("Cohere circuit open; skipping rerank and using retrieval order.")
+             return self._positional_scores(documents[:self.final_top_k])
 
          logger.debug(f"Reranking {len(documents)} documents for query: '{query}' using Cohere '{COHERE_CONFIG['rerank_model']}'")
          doc_texts = [doc.page_content for doc in documents]
@@ -216,7 +233,7 @@ class RealTimeDataProcessor:
              # result format {index: int, relevance_score: float}
              for result in rerank_response.results:
                  if result.relevance_score > 0.1: # Optional threshold
-                      reranked_docs.append(documents[result.index])
+                      reranked_docs.append((documents[result.index], result.relevance_score))
                  else:
                      logger.debug(f"Dropping reranked doc index {result.index} due to low score ({result.relevance_score:.3f})")
 
@@ -225,12 +242,16 @@ class RealTimeDataProcessor:
              # reranked_docs = reranker_instance.compress_documents(documents=documents, query=query)
 
              logger.info(f"Cohere reranked {len(documents)} -> {len(reranked_docs)} documents.")
+             cohere_breaker.record_success()
              return reranked_docs
 
          except Exception as e:
+             status_code = getattr(e, "status_code", None) # Cohere SDK API errors carry the HTTP status
+             if status_code is not None and status_code < 500: cohere_breaker.record_neutral() # Our request, not an outage
+             else: cohere_breaker.record_failure()
              logger.error(f"Error during Cohere reranking: {e}", exc_info=True)
              # Fallback to original top N documents if reranking fails
-             return documents[:self.final_top_k]
+             return self._positional_scores(documents[:self.final_top_k])
 
 
     async def query_rag(self, user_query: str, use_for: str = "misinfo_check") -> Tuple[Optional[str], Optional[List[Dict]]]:
@@ -255,15 +276,18 @@ class RealTimeDataProcessor:
             return None, None # Signal no context found
 
         # 2. Re-rank documents
-        reranked_documents = await self.rerank_documents(user_query, initial_documents)
-        if not reranked_documents:
+        reranked = await self.rerank_with_scores(user_query, initial_documents)
+        if not reranked:
             logger.warning(f"RAG: No documents remaining after re-ranking for query: {user_query}")
             return None, None
 
-        context_str = "\n\n---\n\n".join([doc.page_content for doc in reranked_documents])
-        sources = [{"source": doc.metadata.get('source', 'Unknown'),
-                    "snippet": doc.page_content[:150] + "..."} # Short snippet for context
-                   for doc in reranked_documents]
+        # Best-first, overlap-free context within the answering model's token budget
+        context_str, used_chunks = build_context(
+            [EvidenceChunk(doc.page_content, score, str(doc.metadata.get('source', 'Unknown'))) for doc, score in reranked],
+            context_budget(GROQ_CONFIG.get('model'), GROQ_RAG_MAX_TOKENS), overlapping=True)
+        sources = [{"source": chunk.source,
+                    "snippet": chunk.text[:150] + "..."} # Short snippet for context
+                   for chunk in used_chunks]
 
 
         # 3. Check if RAG context is sufficient (Using Groq for evaluation)
@@ -273,7 +297,7 @@ class RealTimeDataProcessor:
         sufficiency_check_start_time = asyncio.get_event_loop().time()
         try:
             # Use a fast, small model for this check if possible/configured
-            sufficiency_response = await query_groq(sufficiency_prompt, temperature=0.0, model="llama3-8b-8192") # Example fast model
+            sufficiency_response = await query_groq(sufficiency_prompt, temperature=0.0, model="llama3-8b-8192", cache_site="sufficiency") # Example fast model
             logger.debug(f"RAG Sufficiency check took {asyncio.get_event_loop().time() - sufficiency_check_start_time:.2f}s")
 
             if sufficiency_response:
@@ -317,7 +341,7 @@ Answer:"""
              prompt = f"""Based on the following context, respond to the query: "{user_query}" \nContext:\n{context_str}\nResponse:"""
 
         logger.debug(f"Querying Groq with RAG context for: {user_query}")
-        llm_response = await query_groq(prompt, temperature=self.config['groq']['temperature'], model=self.config['groq']['model'])
+        llm_response = await query_groq(prompt, temperature=self.config['groq']['temperature'], model=self.config['groq']['model'], max_tokens=GROQ_RAG_MAX_TOKENS, cache_site="rag")
 
         return llm_response, sources
 
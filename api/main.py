@@ -8,13 +8,12 @@ import os
 import re
 import json # Required for synthesis parsing
 from contextlib import asynccontextmanager
-from typing import Dict, Optional, List, Literal, Any, Union, Tuple
+from typing import Dict, Optional, List, Literal, Any, Set, Union, Tuple
 
 import httpx # Keep httpx for potential use
-# Need NetworkX for the graph check in status endpoint
-import networkx as nx
-from fastapi import FastAPI, HTTPException, Depends, Request, Header, Security
+from fastapi import FastAPI, HTTPException, Depends, Request, Header, Security, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from fastapi.security.api_key import APIKeyHeader
 from fastapi_cache import FastAPICache
 from fastapi_cache.backends.redis import RedisBackend
@@ -27,20 +26,32 @@ try:
     from .models import (
         AnalyzeRequest, BaseAnalysisResponse, FactualAnalysisResponse, MisinformationAnalysisResponse,
         UrlAnalysisResponse, StatusResponse, ErrorResponse, TextContextAssessment, ScanResultDetail,
-        UrlScanResults, EvidenceItem # Ensure EvidenceItem is imported
+        UrlScanResults, UrlVerdict, EvidenceItem, # Ensure EvidenceItem is imported
+        KGStatsResponse, KGEntityStatsResponse, KGRelatedEntitiesResponse, ScanJobResponse
     )
     from .classifier import classify_intent, load_classifier
     from .groq_utils import (
-        query_groq, setup_groq_client, close_groq_client, GroqApiException,
-        ask_groq_factual, analyze_misinformation_groq # Ensure specific utils are imported
+        query_groq, setup_groq_client, close_groq_client, GroqApiException, stream_tokens_to,
+        ask_groq_factual, analyze_misinformation_groq, # Ensure specific utils are imported
+        run_cascade, CASCADE_MIN_CONFIDENCE
     )
     from .langchain_utils import RealTimeDataProcessor # Handles RAG + Cohere
-    from .utils import get_config, setup_logging, is_valid_url, RateLimitException, ApiException, sanitize_url_for_scan
+    from .utils import get_config, setup_logging, is_valid_url, RateLimitException, ApiException, sanitize_url_for_scan, extract_urls
     from .vt_utils import check_virustotal, parse_vt_result
     from .ipqs_utils import check_ipqs, parse_ipqs_result
     from .urlscan_utils import check_urlscan_existing_results, parse_urlscan_result
     from .search_api_utils import perform_search # Required for web search fallback
-    from .kg_utils import load_graph, save_graph, load_spacy_model, extract_entities, add_claim_to_graph, query_kg_for_entities, graph as kg_global_graph # Import global graph for status check
+    from .kg_utils import load_graph, start_graph_writer, stop_graph_writer, load_spacy_model, extract_entities_async, start_entity_extractor, stop_entity_extractor, submit_claim, query_kg_for_entities, get_kg_stats, get_entity_stats, get_related_entities, find_prior_verdict, get_entity_extraction_stats, QUERY_DEPTH
+    from .cache_utils import set_redis_client
+    from .singleflight import get_singleflight_stats, SingleFlight
+    from .streaming import format_sse
+    from .prompt_builder import EvidenceChunk, build_context, context_budget
+    from .circuit_breaker import CircuitOpenException, get_breaker_states, OPEN
+    from .http_clients import start_http_clients, close_http_clients, get_pool_stats
+    from .scan_cache import cached_scan, scanner_cache_key
+    from .reputation_filter import check_url_reputation, record_verdict, reload_filters as reload_reputation_filters, ReputationMatch
+    from .scan_jobs import start_scan_jobs, stop_scan_jobs, enqueue_scan_job, get_job, store_job_result, COMPLETED as JOB_COMPLETED
+    from . import metrics
 except ImportError as e:
      print(f"ERROR: Failed to import necessary modules: {e}")
      print("Ensure all util files exist and Python can find the 'api' package.")
@@ -56,7 +67,17 @@ CONFIG = get_config()
 # --- Configuration Constants ---
 ANALYSIS_CONFIG = CONFIG.get('analysis', {})
 WEB_FALLBACK_THRESHOLD = ANALYSIS_CONFIG.get('web_fallback_threshold', 0.70)
+KG_SETTINGS = CONFIG.get('knowledge_graph', {})
+SERVE_PRIOR_VERDICTS = KG_SETTINGS.get('serve_prior_verdicts', True)
+PRIOR_VERDICT_MIN_CONFIDENCE = KG_SETTINGS.get('prior_verdict_min_confidence', 0.7)
+SYNTHESIS_MAX_TOKENS = 1536 # Completion budget for web synthesis (narrative output)
+SNIPPET_HEADER_TOKENS = 30 # Per-snippet 'Source URL / Title' lines around the snippet text
 CACHE_TIMEOUT = CONFIG.get('cache', {}).get('default_ttl_seconds', 300)
+URL_SCAN_CONFIG = CONFIG.get('url_scans', {})
+URL_SCAN_BUDGET = URL_SCAN_CONFIG.get('budget_seconds', 12) # Per-request wall time for all scanners together
+URL_SCAN_EARLY_STOP_SIGNALS = URL_SCAN_CONFIG.get('early_stop_min_signals', 2) # 0 disables early termination
+URL_MAX_PER_REQUEST = URL_SCAN_CONFIG.get('max_urls_per_request', 5) # Extra URLs in one input are ignored
+URL_FANOUT_CONCURRENCY = URL_SCAN_CONFIG.get('fanout_concurrency', 8) # Per-URL analyses in flight at once (all requests)
 API_KEY_ENABLED = CONFIG.get("security", {}).get("enable_api_key_auth", False)
 INTERNAL_API_KEY = os.getenv("INTERNAL_API_KEY")
 API_KEY_NAME = "X-API-Key"
@@ -93,8 +114,9 @@ async def lifespan(app: FastAPI):
     global rag_processor, redis_client
     logger.info("Application startup initiated...")
 
-    # 1. Setup HTTP client for Groq utils
+    # 1. Setup HTTP client for Groq utils, and pooled clients for the scanners/search API
     setup_groq_client()
+    start_http_clients()
 
     # 2. Initialize Cache
     redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
@@ -103,6 +125,7 @@ async def lifespan(app: FastAPI):
         redis_client = aioredis.from_url(redis_url, encoding="utf8", decode_responses=True)
         await redis_client.ping()
         FastAPICache.init(RedisBackend(redis_client), prefix="fastapi-cache")
+        set_redis_client(redis_client) # Shared L2 tier for the LLM response cache
         logger.info("Redis connection successful. FastAPI Cache initialized.")
     except Exception as e:
         logger.error(f"Failed to connect to Redis or initialize cache: {e}. Cache will be disabled.", exc_info=True)
@@ -132,15 +155,21 @@ async def lifespan(app: FastAPI):
 
     # 5. Load Knowledge Graph & SpaCy
     logger.info("Loading Knowledge Graph...")
-    try: load_graph()
+    try: load_graph(); start_graph_writer()
     except Exception as e: logger.error(f"Failed to load knowledge graph: {e}", exc_info=True) # Non-fatal
 
     logger.info("Loading SpaCy model for KG NER...")
     try:
         if not load_spacy_model(): logger.warning("Failed to load SpaCy model. KG entity extraction disabled.") # Non-fatal
+        else: start_entity_extractor()
     except Exception as e: logger.error(f"Error loading SpaCy model: {e}", exc_info=True)
 
 
+    # 6. Local domain reputation filters (memory-mapped; remapped when rebuilt) and background scanner submissions (needs the running loop; uses Redis for job records when available)
+    try: reload_reputation_filters()
+    except Exception as e: logger.error(f"Failed to load reputation filters: {e}", exc_info=True) # Non-fatal: scanners still run
+    start_scan_jobs()
+
     logger.info("Application startup complete.")
     yield  # API is now running
 
@@ -149,12 +178,18 @@ async def lifespan(app: FastAPI):
     shutdown_event.set()
 
     # Graceful shutdown tasks
-    try: save_graph()
+    try: await stop_scan_jobs()
+    except Exception as e: logger.error(f"Error stopping scan job workers: {e}")
+    try: await stop_entity_extractor()
+    except Exception as e: logger.error(f"Error stopping NER batcher: {e}")
+    try: await stop_graph_writer() # Applies queued writes and flushes pending KG changes
     except Exception as e: logger.error(f"Error saving graph on shutdown: {e}")
 
     await close_groq_client() # Close shared client
+    await close_http_clients()
 
     if redis_client:
+        set_redis_client(None)
         try:
             await redis_client.close()
             await redis_client.connection_pool.disconnect() # Ensure pool is disconnected too
@@ -212,8 +247,85 @@ def _analyze_text_context(request_id: str, context_text: str) -> TextContextAsse
 
     return TextContextAssessment(suspicion_level=suspicion, key_indicators=indicators)
 
+def _scan_result_detail(request_id: str, scanner_name: str, result_or_exc: Any, sanitized_url: str,
+                        parser_map: Dict[str, Any]) -> ScanResultDetail:
+    """Turns one scanner's raw result (or exception) into its ScanResultDetail."""
+    status = "error"; details = {"message": "Unknown processing error"}
+
+    if isinstance(result_or_exc, CircuitOpenException): # Scanner known to be down - skipped without waiting
+        status = "error"; details = {"message": str(result_or_exc)}
+        logger.warning(f"[ReqID: {request_id}] Scanner '{scanner_name}' skipped (circuit open) for URL: {sanitized_url}")
+    elif isinstance(result_or_exc, RateLimitException):
+        status = "rate_limited"; details = {"message": str(result_or_exc)}
+        logger.warning(f"[ReqID: {request_id}] Scanner '{scanner_name}' hit rate limit for URL: {sanitized_url}")
+    elif isinstance(result_or_exc, ApiException):
+        status = "error"; details = {"message": str(result_or_exc)}
+        logger.error(f"[ReqID: {request_id}] Scanner '{scanner_name}' API error for URL {sanitized_url}: {result_or_exc}")
+    elif isinstance(result_or_exc, ValueError): # e.g., invalid URL for a specific scanner
+         status = "error"; details = {"message": f"Input error: {result_or_exc}"}
+         logger.warning(f"[ReqID: {request_id}] Scanner '{scanner_name}' input error for URL {sanitized_url}: {result_or_exc}")
+    elif isinstance(result_or_exc, Exception): # Catch other unexpected exceptions
+        status = "error"; details = {"message": f"Unexpected internal error: {type(result_or_exc).__name__}"}
+        logger.error(f"[ReqID: {request_id}] Unexpected error in scanner '{scanner_name}' for URL {sanitized_url}: {result_or_exc}", exc_info=True)
+    elif result_or_exc is None: # Scanner explicitly returned None (e.g., VT 404, IPQS timeout/no_data, urlscan no result)
+        status = "no_data"; details = {"message": f"{scanner_name} reported no specific data found."}
+        logger.info(f"[ReqID: {request_id}] Scanner '{scanner_name}' found no existing data for URL: {sanitized_url}")
+    else: # Success case - raw data received, attempt parsing
+        parser = parser_map.get(scanner_name)
+        if parser:
+            try:
+                parsed = parser(result_or_exc) # result_or_exc should be the data dict here
+                status = parsed.get("status", "error") # Parser should return status ('success', 'no_scan_found', 'pending', etc.)
+                details = parsed.get("details", {})
+                if status == "error": # If parser itself encountered an error
+                    logger.warning(f"[ReqID: {request_id}] Parser for '{scanner_name}' failed or returned error status for URL {sanitized_url}. Details: {details.get('message', 'N/A')}")
+                elif status not in ["success", "scan_found", "no_scan_found", "pending", "likely_safe"]: # Allow likely_safe from parser
+                     logger.warning(f"[ReqID: {request_id}] Parser for '{scanner_name}' returned unexpected status '{status}' for URL {sanitized_url}")
+
+            except Exception as e:
+                status = "error"; details = {"message": f"Failed to parse {scanner_name} response: {e}"}
+                logger.error(f"[ReqID: {request_id}] Exception parsing '{scanner_name}' result for URL {sanitized_url}: {e}", exc_info=True)
+        else:
+            status = "error"; details = {"message": f"Internal error: No parser defined for {scanner_name}"}
+            logger.error(f"[ReqID: {request_id}] Missing parser definition for scanner: {scanner_name}")
+
+    return ScanResultDetail(status=status, details=details)
+
+def _malicious_scan_signals(scan_outputs: Dict[str, Optional[ScanResultDetail]]) -> int:
+    """Number of finished scanners that flag the URL as malicious/phishing."""
+    signals = 0
+    vt = scan_outputs.get('virustotal'); ipqs = scan_outputs.get('ipqualityscore'); urlscan = scan_outputs.get('urlscanio')
+    if vt and vt.status == 'success' and vt.details and vt.details.get('assessment') == 'malicious': signals += 1
+    if ipqs and ipqs.status == 'success' and ipqs.details and (ipqs.details.get('is_phishing') or ipqs.details.get('is_malware')): signals += 1
+    if urlscan and urlscan.status == 'scan_found' and urlscan.details and urlscan.details.get('verdict_malicious'): signals += 1
+    return signals
+
+def _scan_verdict_decided(scan_outputs: Dict[str, Optional[ScanResultDetail]]) -> bool:
+    """True once enough finished scanners flag the URL that the remaining ones cannot change the outcome
+    (e.g. IPQS phishing + VirusTotal malicious)."""
+    return URL_SCAN_EARLY_STOP_SIGNALS > 0 and _malicious_scan_signals(scan_outputs) >= URL_SCAN_EARLY_STOP_SIGNALS
+
+# Scans cut short by the budget or an early verdict. The upstream call keeps running anyway
+# (singleflight shields it), so the scan is left to finish and store its result in the scan cache.
+_detached_scans: Set[asyncio.Task] = set()
+
+def _detach_scan(task: asyncio.Task) -> None:
+    """Keeps an unfinished cached_scan() running in the background (referenced until done, errors only logged)."""
+    def _done(t: asyncio.Task) -> None:
+        _detached_scans.discard(t)
+        exc = None if t.cancelled() else t.exception()
+        if exc is not None:
+            logger.debug(f"Background scan finished with {type(exc).__name__}: {exc}")
+    _detached_scans.add(task)
+    task.add_done_callback(_done)
+    metrics.increment("url_scans.detached")
+
 async def _perform_url_scans(request_id: str, url: str) -> Dict[str, Optional[ScanResultDetail]]:
-    """Runs VT, IPQS, URLScan concurrently and processes results."""
+    """
+    Runs VT, IPQS, URLScan concurrently within the scan budget and processes results. Scans still
+    running at the budget or an early verdict are reported 'skipped' and finish in the background,
+    so their (already paid for) results land in the scan cache for the next request.
+    """
     logger.info(f"[ReqID: {request_id}] Performing concurrent scans for URL: {url}")
     # Ensure URL is sanitized before sending to scanners
     sanitized_url = sanitize_url_for_scan(url)
@@ -221,11 +333,11 @@ async def _perform_url_scans(request_id: str, url: str) -> Dict[str, Optional[Sc
         logger.error(f"[ReqID: {request_id}] Invalid or unsanitizable URL for scanning: {url}")
         raise ValueError("Invalid URL provided for scanning.")
 
-    # Define tasks for each scanner
+    # Define tasks for each scanner (raw results cached per scanner; urlscan searches by domain, so it is keyed by domain)
     scan_tasks = {
-        "virustotal": check_virustotal(sanitized_url),
-        "ipqualityscore": check_ipqs(sanitized_url),
-        "urlscanio": check_urlscan_existing_results(sanitized_url) # Check existing scans
+        "virustotal": cached_scan("virustotal", sanitized_url, lambda: check_virustotal(sanitized_url)),
+        "ipqualityscore": cached_scan("ipqualityscore", sanitized_url, lambda: check_ipqs(sanitized_url)),
+        "urlscanio": cached_scan("urlscanio", scanner_cache_key("urlscanio", sanitized_url), lambda: check_urlscan_existing_results(sanitized_url)) # Check existing scans
     }
     parser_map = {
         "virustotal": parse_vt_result,
@@ -234,59 +346,47 @@ async def _perform_url_scans(request_id: str, url: str) -> Dict[str, Optional[Sc
     }
 
     scan_start = time.perf_counter()
-    # Execute tasks concurrently, capturing results or exceptions
-    results = await asyncio.gather(*scan_tasks.values(), return_exceptions=True)
+    # Run scanners concurrently within the scan budget; stop early once the verdict is decided
+    tasks = {asyncio.ensure_future(coro): name for name, coro in scan_tasks.items()}
+    pending = set(tasks)
+    scan_outputs: Dict[str, Optional[ScanResultDetail]] = {}
+    deadline = scan_start + URL_SCAN_BUDGET
+    stop_reason = None
+    try:
+        while pending:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                stop_reason = f"scan budget of {URL_SCAN_BUDGET:g}s expired"
+                break
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                scanner_name = tasks[task]
+                if task.cancelled(): # Cancelled elsewhere (e.g. shutdown): report it, keep the other results
+                    scan_outputs[scanner_name] = ScanResultDetail(status="skipped", details={"message": f"{scanner_name} scan was cancelled."})
+                    continue
+                exc = task.exception()
+                result_or_exc = exc if exc is not None else task.result()
+                scan_outputs[scanner_name] = _scan_result_detail(request_id, scanner_name, result_or_exc, sanitized_url, parser_map)
+            if pending and _scan_verdict_decided(scan_outputs):
+                stop_reason = "verdict already decided by other scanners"
+                break
+    except asyncio.CancelledError: # Request itself cancelled (e.g. client disconnected): the scans still fill the cache
+        for task in pending: _detach_scan(task)
+        raise
+
+    # Report whatever is still running as skipped; it completes in the background
+    for task in pending:
+        _detach_scan(task)
+        scan_outputs[tasks[task]] = ScanResultDetail(status="skipped", details={"message": f"Not waited for: {stop_reason}; the result will be cached for later requests."})
+    if pending:
+        skipped = sorted(tasks[t] for t in pending)
+        metrics.increment("url_scans.early_stop" if stop_reason.startswith("verdict") else "url_scans.budget_expired")
+        logger.info(f"[ReqID: {request_id}] Skipped scanners {skipped}: {stop_reason}.")
+    scan_outputs = {name: scan_outputs.get(name) for name in scan_tasks} # Keep scanner order
     scan_duration = time.perf_counter() - scan_start
+    metrics.observe("url_scans.latency", scan_duration)
     logger.debug(f"[ReqID: {request_id}] URL scans completed in {scan_duration:.3f}s")
 
-    scan_outputs: Dict[str, Optional[ScanResultDetail]] = {}
-    any_critical_failure = False # Flag if a core scanner fails unexpectedly
-
-    # Process results for each scanner
-    for i, (scanner_name, result_or_exc) in enumerate(zip(scan_tasks.keys(), results)):
-        status = "error"; details = {"message": "Unknown processing error"}
-
-        if isinstance(result_or_exc, RateLimitException):
-            status = "rate_limited"; details = {"message": str(result_or_exc)}
-            logger.warning(f"[ReqID: {request_id}] Scanner '{scanner_name}' hit rate limit for URL: {sanitized_url}")
-        elif isinstance(result_or_exc, ApiException):
-            status = "error"; details = {"message": str(result_or_exc)}
-            logger.error(f"[ReqID: {request_id}] Scanner '{scanner_name}' API error for URL {sanitized_url}: {result_or_exc}")
-            any_critical_failure = True
-        elif isinstance(result_or_exc, ValueError): # e.g., invalid URL for a specific scanner
-             status = "error"; details = {"message": f"Input error: {result_or_exc}"}
-             logger.warning(f"[ReqID: {request_id}] Scanner '{scanner_name}' input error for URL {sanitized_url}: {result_or_exc}")
-        elif isinstance(result_or_exc, Exception): # Catch other unexpected exceptions
-            status = "error"; details = {"message": f"Unexpected internal error: {type(result_or_exc).__name__}"}
-            logger.error(f"[ReqID: {request_id}] Unexpected error in scanner '{scanner_name}' for URL {sanitized_url}: {result_or_exc}", exc_info=True)
-            any_critical_failure = True
-        elif result_or_exc is None: # Scanner explicitly returned None (e.g., VT 404, IPQS timeout/no_data, urlscan no result)
-            status = "no_data"; details = {"message": f"{scanner_name} reported no specific data found."}
-            logger.info(f"[ReqID: {request_id}] Scanner '{scanner_name}' found no existing data for URL: {sanitized_url}")
-        else: # Success case - raw data received, attempt parsing
-            parser = parser_map.get(scanner_name)
-            if parser:
-                try:
-                    parsed = parser(result_or_exc) # result_or_exc should be the data dict here
-                    status = parsed.get("status", "error") # Parser should return status ('success', 'no_scan_found', 'pending', etc.)
-                    details = parsed.get("details", {})
-                    if status == "error": # If parser itself encountered an error
-                        logger.warning(f"[ReqID: {request_id}] Parser for '{scanner_name}' failed or returned error status for URL {sanitized_url}. Details: {details.get('message', 'N/A')}")
-                    elif status not in ["success", "scan_found", "no_scan_found", "pending", "likely_safe"]: # Allow likely_safe from parser
-                         logger.warning(f"[ReqID: {request_id}] Parser for '{scanner_name}' returned unexpected status '{status}' for URL {sanitized_url}")
-
-                except Exception as e:
-                    status = "error"; details = {"message": f"Failed to parse {scanner_name} response: {e}"}
-                    logger.error(f"[ReqID: {request_id}] Exception parsing '{scanner_name}' result for URL {sanitized_url}: {e}", exc_info=True)
-                    any_critical_failure = True
-            else:
-                status = "error"; details = {"message": f"Internal error: No parser defined for {scanner_name}"}
-                logger.error(f"[ReqID: {request_id}] Missing parser definition for scanner: {scanner_name}")
-                any_critical_failure = True
-
-        # Store the parsed result detail
-        scan_outputs[scanner_name] = ScanResultDetail(status=status, details=details)
-
     # Check if ALL scans failed critically (not just 'no_data' or 'rate_limited')
     critical_failures = [s for s in scan_outputs.values() if s and s.status == 'error']
     if len(critical_failures) == len(scan_tasks):
@@ -428,11 +528,45 @@ def consolidate_url_assessment(
     }
 
 
+def _reputation_assessment(sanitized_url: str, text_assessment: Optional[TextContextAssessment], match: ReputationMatch) -> Dict[str, Any]:
+    """URL assessment from a local reputation filter hit (scanners skipped)."""
+    lists = {"phishing": "phishing blocklist", "malware": "malware blocklist", "allow": "allowlist", "recent": "recent verdicts of this service"}
+    source = lists.get(match.source, match.source)
+    if match.verdict == "Likely Safe":
+        summary = f"Domain {match.domain} is on the local allowlist; external scanners were not queried."
+    else:
+        summary = f"Domain {match.domain} is on the local {source} ({match.verdict.lower()}); external scanners were not queried."
+    skipped = ScanResultDetail(status="skipped", details={"message": f"Not queried: local reputation match ({source})."})
+    return {
+        "assessment": match.verdict, "scanned_url": sanitized_url, "confidence_score": round(match.confidence, 3),
+        "analysis_summary": summary, "text_context_assessment": text_assessment,
+        "scan_results": UrlScanResults(virustotal=skipped, ipqualityscore=skipped, urlscanio=skipped),
+        "evidence_notes": [f"Local reputation: {match.domain} matched the {source}."],
+    }
+
+
 async def _synthesize_from_web_results(
     request_id: str,
     original_query: str,
     search_results: List[Dict[str, str]],
     analysis_type: Literal["misinfo", "factual"]
+) -> Dict[str, Any]:
+    """Web search synthesis through the model cascade: small model first, larger one if the result is unconfident."""
+    def needs_escalation(result: Dict[str, Any]) -> bool:
+        return (result.get("data_source") != "Web Search Synthesis" or result.get("confidence_score", 0.0) < CASCADE_MIN_CONFIDENCE
+                or result.get("assessment") in ("Needs Verification / Uncertain", "Contradictory Information Found"))
+    return await run_cascade(
+        f"synthesis_{analysis_type}",
+        lambda model: _synthesize_with_model(request_id, original_query, search_results, analysis_type, model),
+        needs_escalation)
+
+
+async def _synthesize_with_model(
+    request_id: str,
+    original_query: str,
+    search_results: List[Dict[str, str]],
+    analysis_type: Literal["misinfo", "factual"],
+    synthesis_model: Optional[str] = None
 ) -> Dict[str, Any]:
     """
     Uses Groq to synthesize a consolidated answer/assessment based on web search results.
@@ -447,16 +581,23 @@ async def _synthesize_from_web_results(
         logger.warning(f"[ReqID: {request_id}] No search results provided for synthesis.")
         return {"explanation": "Web search returned no results for synthesis.", "answer": None, "assessment": "Needs Verification / Uncertain", "confidence_score": 0.1, "data_source": "Web Search", "evidence": []}
 
-    snippets_text = "\n\n---\n".join(
-        [f"Source URL: {res.get('link', 'N/A')}\nTitle: {res.get('title', 'N/A')}\nSnippet: {res.get('snippet', 'N/A')}" for res in search_results]
+    synthesis_model = synthesis_model or 'llama3-70b-8192' # Powerful model for quality synthesis unless the cascade picks a tier
+
+    # Snippets in search-rank order, repeated text (mirrored pages) removed, within the model's token budget
+    titles = {res.get('link', 'N/A'): res.get('title', 'N/A') for res in search_results}
+    snippet_separator = "\n\n---\n"
+    _, used_snippets = build_context(
+        [EvidenceChunk(res.get('snippet') or 'N/A', 1.0 - i / len(search_results), res.get('link', 'N/A')) for i, res in enumerate(search_results)],
+        context_budget(synthesis_model, SYNTHESIS_MAX_TOKENS), separator=snippet_separator, chunk_overhead_tokens=SNIPPET_HEADER_TOKENS)
+    if not used_snippets:
+        logger.warning(f"[ReqID: {request_id}] No web snippet fits the context budget of {synthesis_model}; skipping synthesis.")
+        return {"explanation": "Web search results could not be used for synthesis (context budget exhausted).", "answer": None, "assessment": "Needs Verification / Uncertain", "confidence_score": 0.1, "data_source": "Web Search", "evidence": []}
+    if len(used_snippets) < len(search_results):
+        logger.info(f"[ReqID: {request_id}] Using {len(used_snippets)}/{len(search_results)} web snippets (duplicates/over budget dropped).")
+    snippets_text = snippet_separator.join(
+        [f"Source URL: {chunk.source}\nTitle: {titles.get(chunk.source, 'N/A')}\nSnippet: {chunk.text}" for chunk in used_snippets]
     )
-    max_snippet_length = 3500
-    if len(snippets_text) > max_snippet_length:
-        logger.warning(f"[ReqID: {request_id}] Truncating web snippets from {len(snippets_text)} to {max_snippet_length} chars for LLM prompt.")
-        snippets_text = snippets_text[:max_snippet_length] + "... (truncated)"
-
 
-    synthesis_model = 'llama3-70b-8192' # Powerful model for quality synthesis
     prompt = ""
     temp = 0.15 # Slightly increased temp for better narrative flow, adjust if needed
 
@@ -512,7 +653,7 @@ Web Search Snippets:
     # --- Call Groq for Synthesis ---
     try:
         logger.info(f"[ReqID: {request_id}] Sending synthesis request to Groq model {synthesis_model} (Temp: {temp}).")
-        synthesis_llm_output = await query_groq(prompt, temperature=temp, model=synthesis_model, max_tokens=1536) # Increased max tokens for narrative
+        synthesis_llm_output = await query_groq(prompt, temperature=temp, model=synthesis_model, max_tokens=SYNTHESIS_MAX_TOKENS, cache_site="synthesis") # Increased max tokens for narrative
 
         if not synthesis_llm_output:
             logger.warning(f"[ReqID: {request_id}] Web synthesis LLM call returned empty.")
@@ -520,8 +661,8 @@ Web Search Snippets:
 
         # --- Parse the Synthesis Result ---
         synthesized_data = {"raw_llm_output": synthesis_llm_output, "answer": None, "explanation": None}
-        # Prepare evidence list from the search results *used* for synthesis
-        web_evidence = [EvidenceItem(source=res.get('link', 'N/A'), snippet=res.get('snippet', 'N/A')[:300]+"...", assessment_note="Used in Web Search Synthesis") for res in search_results]
+        # Evidence list: only the snippets the model saw, as it saw them
+        web_evidence = [EvidenceItem(source=chunk.source, snippet=chunk.text[:300]+"...", assessment_note="Used in Web Search Synthesis") for chunk in used_snippets]
         synthesized_data["evidence"] = web_evidence # Include evidence used
 
         if analysis_type == "factual":
@@ -633,13 +774,8 @@ async def get_status():
          rag_status = "Operational"
     elif rag_processor: rag_status = "Degraded/Partially Initialized"
 
-    kg_status = "Unavailable/Load Failed"
-    # Use the globally loaded graph variable reference from kg_utils
-    if kg_global_graph is not None and isinstance(kg_global_graph, nx.DiGraph):
-         kg_status = "Operational"
-    elif kg_global_graph is None: # Explicitly check None if load attempt was made but failed
-         kg_status = "Unavailable/Load Failed"
-    # If loading was never attempted or module failed import, kg_global_graph might not exist or be None
+    # Read the loaded flag at call time (importing kg_utils.graph by name would freeze it at None)
+    kg_status = "Operational" if get_kg_stats().get("loaded") else "Unavailable/Load Failed"
 
     cls_status = "Unavailable/Load Failed"
     # Check the global pipeline variable in classifier.py directly
@@ -650,7 +786,44 @@ async def get_status():
         cls_status = "Operational" if loaded else "Unavailable/Load Failed"
     except Exception as e: cls_status = f"Error Checking: {type(e).__name__}"
 
-    return StatusResponse(rag_index_status=rag_status, kg_status=kg_status, classifier_status=cls_status)
+    breakers = get_breaker_states()
+    overall = "DEGRADED" if any(b["state"] == OPEN for b in breakers.values()) else "OK" # Some upstream is failing fast
+    return StatusResponse(status=overall, rag_index_status=rag_status, kg_status=kg_status, classifier_status=cls_status, circuit_breakers=breakers)
+
+
+@app.get("/metrics", tags=["General"])
+async def get_metrics(api_key_dependency: Optional[str] = Depends(get_api_key)):
+    """In-process counters and latency summaries (cache hit rates, extraction paths)."""
+    snapshot = metrics.snapshot()
+    snapshot["entity_extraction"] = get_entity_extraction_stats()
+    snapshot["singleflight"] = get_singleflight_stats()
+    snapshot["http_pools"] = get_pool_stats()
+    return snapshot
+
+
+@app.get("/kg/stats", response_model=KGStatsResponse, tags=["Knowledge Graph"])
+async def kg_stats(api_key_dependency: Optional[str] = Depends(get_api_key)):
+    """Graph-wide Knowledge Graph counters (constant time, no traversal)."""
+    return KGStatsResponse(**get_kg_stats())
+
+
+@app.get("/kg/entities/{entity_id}", response_model=KGEntityStatsResponse, tags=["Knowledge Graph"],
+         responses={404: {"description": "Entity Not Found", "model": ErrorResponse}})
+async def kg_entity_stats(entity_id: str, api_key_dependency: Optional[str] = Depends(get_api_key)):
+    """Precomputed claim/assessment counters for one entity, e.g. 'person:joe_biden'."""
+    stats = get_entity_stats(entity_id)
+    if stats is None:
+        raise HTTPException(status_code=404, detail={"error": "Not Found", "message": f"Entity '{entity_id}' not found in Knowledge Graph."})
+    return KGEntityStatsResponse(**stats)
+
+
+@app.get("/kg/entities/{entity_id}/related", response_model=KGRelatedEntitiesResponse, tags=["Knowledge Graph"],
+         responses={404: {"description": "Entity Not Found", "model": ErrorResponse}})
+async def kg_related_entities(entity_id: str, depth: int = Query(QUERY_DEPTH, ge=1, le=4), api_key_dependency: Optional[str] = Depends(get_api_key)):
+    """Entities co-mentioned with this one (bounded k-hop walk over shared claims) and their verdict counters."""
+    if get_entity_stats(entity_id) is None:
+        raise HTTPException(status_code=404, detail={"error": "Not Found", "message": f"Entity '{entity_id}' not found in Knowledge Graph."})
+    return KGRelatedEntitiesResponse(entity_id=entity_id, depth=depth, related=get_related_entities(entity_id, depth=depth))
 
 
 @app.post("/analyze",
@@ -679,8 +852,6 @@ async def analyze_text(
     start_time = time.perf_counter()
     input_text = request.text.strip() if request.text else ""
 
-    result_model: Union[FactualAnalysisResponse, MisinformationAnalysisResponse, UrlAnalysisResponse]
-
     if not input_text:
         logger.warning(f"[ReqID: {request_id}] Received request with empty input text.")
         raise HTTPException(status_code=400, detail={"request_id": request_id, "error": "Bad Request", "message": "Input text cannot be empty."})
@@ -688,32 +859,7 @@ async def analyze_text(
     logger.info(f"[ReqID: {request_id}] Received analysis request for: '{input_text[:100]}...'")
 
     try:
-        # 1. Classify Intent
-        intent, intent_confidence = classify_intent(input_text)
-        logger.info(f"[ReqID: {request_id}] Classified intent as '{intent}' with confidence {intent_confidence:.3f}")
-
-        # --- Routing Logic ---
-        CLASSIFICATION_THRESHOLD = 0.60 # Move to config if needed
-        effective_intent = intent
-        if intent_confidence < CLASSIFICATION_THRESHOLD:
-             logger.warning(f"[ReqID: {request_id}] Intent confidence ({intent_confidence:.3f}) below threshold ({CLASSIFICATION_THRESHOLD}). Defaulting from '{intent}' to 'misinfo'.")
-             effective_intent = "misinfo" # Fallback
-
-        # --- Route based on effective intent ---
-        if effective_intent == "url": result_model = await handle_url_analysis(request_id, input_text)
-        elif effective_intent == "misinfo": result_model = await handle_misinfo_analysis(request_id, input_text)
-        elif effective_intent == "factual": result_model = await handle_factual_analysis(request_id, input_text)
-        else: # Should not happen if classifier labels are url/misinfo/factual
-             logger.error(f"[ReqID: {request_id}] Classifier returned unknown intent '{intent}'. Treating as misinfo.")
-             result_model = await handle_misinfo_analysis(request_id, input_text)
-             if isinstance(result_model, MisinformationAnalysisResponse):
-                 result_model.explanation = f"(Intent classification uncertain, processed as misinfo) {result_model.explanation or ''}"
-
-        end_time = time.perf_counter(); processing_time = round((end_time - start_time) * 1000, 2)
-        # Assign common fields just before returning
-        result_model.processing_time_ms = processing_time; result_model.request_id = request_id; result_model.input_text = input_text
-        logger.info(f"[ReqID: {request_id}] Analysis completed in {processing_time:.2f} ms. Final Assessment: {result_model.assessment}, Confidence: {result_model.confidence_score:.3f}, Source: {getattr(result_model, 'data_source', getattr(result_model, 'assessment', 'N/A'))}") # Show assessment if data_source N/A (e.g. URL)
-        return result_model
+        return await _run_analysis(request_id, input_text, start_time)
 
     # --- Exception Handling ---
     except (RateLimitException, ApiException, GroqApiException) as api_exc:
@@ -733,74 +879,243 @@ async def analyze_text(
         raise HTTPException(status_code=500, detail={"request_id": request_id, "error": "Internal Server Error", "message": f"An unexpected error occurred: {type(e).__name__}"})
 
 
-# --- Handler Functions for Each Intent ---
+async def _run_analysis(request_id: str, input_text: str, start_time: float) -> Union[FactualAnalysisResponse, MisinformationAnalysisResponse, UrlAnalysisResponse]:
+    """Classifies the input and runs the matching workflow (shared by /analyze and /analyze/stream)."""
+    result_model: Union[FactualAnalysisResponse, MisinformationAnalysisResponse, UrlAnalysisResponse]
 
-async def handle_url_analysis(request_id: str, input_text: str) -> UrlAnalysisResponse:
-    """Handles the URL analysis workflow."""
-    logger.info(f"[ReqID: {request_id}] Starting URL analysis workflow.")
+    # 1. Classify Intent
+    intent, intent_confidence = classify_intent(input_text)
+    logger.info(f"[ReqID: {request_id}] Classified intent as '{intent}' with confidence {intent_confidence:.3f}")
+
+    # --- Routing Logic ---
+    CLASSIFICATION_THRESHOLD = 0.60 # Move to config if needed
+    effective_intent = intent
+    if intent_confidence < CLASSIFICATION_THRESHOLD:
+         logger.warning(f"[ReqID: {request_id}] Intent confidence ({intent_confidence:.3f}) below threshold ({CLASSIFICATION_THRESHOLD}). Defaulting from '{intent}' to 'misinfo'.")
+         effective_intent = "misinfo" # Fallback
+
+    # --- Route based on effective intent ---
+    if effective_intent == "url": result_model = await handle_url_analysis(request_id, input_text)
+    elif effective_intent == "misinfo": result_model = await handle_misinfo_analysis(request_id, input_text)
+    elif effective_intent == "factual": result_model = await handle_factual_analysis(request_id, input_text)
+    else: # Should not happen if classifier labels are url/misinfo/factual
+         logger.error(f"[ReqID: {request_id}] Classifier returned unknown intent '{intent}'. Treating as misinfo.")
+         result_model = await handle_misinfo_analysis(request_id, input_text)
+         if isinstance(result_model, MisinformationAnalysisResponse):
+             result_model.explanation = f"(Intent classification uncertain, processed as misinfo) {result_model.explanation or ''}"
+
+    end_time = time.perf_counter(); processing_time = round((end_time - start_time) * 1000, 2)
+    # Assign common fields just before returning
+    result_model.processing_time_ms = processing_time; result_model.request_id = request_id; result_model.input_text = input_text
+    logger.info(f"[ReqID: {request_id}] Analysis completed in {processing_time:.2f} ms. Final Assessment: {result_model.assessment}, Confidence: {result_model.confidence_score:.3f}, Source: {getattr(result_model, 'data_source', getattr(result_model, 'assessment', 'N/A'))}") # Show assessment if data_source N/A (e.g. URL)
+    return result_model
+
+
+@app.post("/analyze/stream",
+          tags=["Analysis"],
+          response_class=StreamingResponse,
+          responses={
+              200: {"description": "Server-sent events: 'start', 'token'*, then 'result' or 'error'", "content": {"text/event-stream": {}}},
+              400: {"description": "Bad Request", "model": ErrorResponse}, 401: {"description": "Unauthorized", "model": ErrorResponse},
+          })
+async def analyze_text_stream(
+    request: AnalyzeRequest,
+    api_key_dependency: Optional[str] = Depends(get_api_key)
+):
+    """
+    Streaming variant of /analyze using server-sent events.
+    Emits 'start' ({request_id}) immediately, 'token' ({stage, text}) events with partial LLM
+    explanation text as it is generated, and finally one 'result' event carrying the same
+    response model /analyze returns - or an 'error' event ({request_id, status_code, error, message}).
+    """
+    request_id = str(uuid.uuid4())
+    input_text = request.text.strip() if request.text else ""
+    if not input_text:
+        logger.warning(f"[ReqID: {request_id}] Received stream request with empty input text.")
+        raise HTTPException(status_code=400, detail={"request_id": request_id, "error": "Bad Request", "message": "Input text cannot be empty."})
 
-    # 1. Extract URL and Context
-    extracted_url: Optional[str] = None; context_text: Optional[str] = input_text; url_found_info = {}
-    url_pattern_scheme = re.compile( r'\b(https?://(?:(?:[a-zA-Z0-9](?:[a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?\.)+[a-zA-Z]{2,12}|localhost|\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})(?::\d+)?(?:[/?#]\S*)?)\b', re.IGNORECASE)
-    url_pattern_noscheme = re.compile( r'(?:\s|^)((?:[a-zA-Z0-9](?:[a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?\.)+[a-zA-Z]{2,12})\b', re.IGNORECASE)
+    logger.info(f"[ReqID: {request_id}] Received streaming analysis request for: '{input_text[:100]}...'")
+    return StreamingResponse(
+        _analysis_event_stream(request_id, input_text),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"} # Stop proxies from buffering the stream
+    )
+
+
+async def _analysis_event_stream(request_id: str, input_text: str):
+    """Runs the analysis in a task and relays its streamed LLM text, then the final result, as SSE frames."""
+    start_time = time.perf_counter()
+    events: asyncio.Queue = asyncio.Queue()
+
+    async def run():
+        # Set inside the task: the sink then applies to this analysis (and tasks it spawns) only
+        stream_tokens_to(lambda stage, text: events.put_nowait(("token", {"stage": stage, "text": text})))
+        return await _run_analysis(request_id, input_text, start_time)
+
+    task = asyncio.create_task(run())
+    try:
+        yield format_sse("start", {"request_id": request_id})
+        while True:
+            next_event = asyncio.ensure_future(events.get())
+            done, _ = await asyncio.wait({next_event, task}, return_when=asyncio.FIRST_COMPLETED)
+            if next_event in done:
+                yield format_sse(*next_event.result())
+                continue
+            next_event.cancel()
+            break
+        while not events.empty():
+            yield format_sse(*events.get_nowait())
 
-    scheme_match = url_pattern_scheme.search(input_text)
-    if scheme_match:
-        found = scheme_match.group(1)
-        if len(found) < 500: url_found_info = {"match_str": found, "original": found}; logger.debug(f"[ReqID: {request_id}] Found URL with scheme: {found}")
-    else:
-        noscheme_match = url_pattern_noscheme.search(input_text)
-        if noscheme_match:
-            potential_domain_part = noscheme_match.group(1).strip('.').strip('/'); common_tlds = ['.com', '.org', '.net', '.gov', '.edu', '.io', '.co', '.ai', '.uk', '.de', '.ca', '.au']
-            if '.' in potential_domain_part and len(potential_domain_part) > 3 and any(potential_domain_part.lower().endswith(tld) for tld in common_tlds):
-                potential_url = "https://" + potential_domain_part
-                if is_valid_url(potential_url): url_found_info = {"match_str": potential_url, "original": potential_domain_part}; logger.debug(f"[ReqID: {request_id}] Found potential URL (no scheme), assumed https: {potential_url}")
-
-    sanitized_url: Optional[str] = None
-    if url_found_info:
         try:
-            sanitized_url = sanitize_url_for_scan(url_found_info["match_str"])
-            if sanitized_url and is_valid_url(sanitized_url):
-                extracted_url = sanitized_url
-                context_text = input_text.replace(url_found_info["original"], "[URL]", 1).strip()
-                logger.info(f"[ReqID: {request_id}] URL Extracted & Sanitized: {extracted_url} (Original: {url_found_info['original']})")
-                if context_text == "[URL]" or not context_text: context_text = None
-            else: logger.warning(f"[ReqID: {request_id}] URL found ('{url_found_info['match_str']}') but failed sanitization/validation."); extracted_url = None
-        except Exception as e: logger.error(f"[ReqID: {request_id}] Error during URL extraction/sanitization: {e}", exc_info=True); extracted_url = None
-
-    # --- Proceed with Analysis ---
-    consolidated_result: Dict[str, Any]
-    if extracted_url:
-        text_assessment_obj: Optional[TextContextAssessment] = None
-        if context_text: text_assessment_obj = _analyze_text_context(request_id, context_text)
-        else: text_assessment_obj = TextContextAssessment(suspicion_level="N/A", key_indicators=[]); logger.debug(f"[ReqID: {request_id}] No surrounding text context for URL.")
-
-        try: scan_outputs_dict = await _perform_url_scans(request_id, extracted_url)
-        except ValueError as ve: # Catch invalid URL from _perform_url_scans
-             logger.error(f"[ReqID: {request_id}] URL scanning failed due to invalid URL input: {ve}")
-             consolidated_result = consolidate_url_assessment(input_text, None, None, {}) # Pass empty scans
-             consolidated_result.update({"assessment": "Analysis Failed", "analysis_summary": f"URL processing error: {ve}", "confidence_score": 0.1, "evidence_notes": [f"URL processing error: {ve}"]})
-             # Return early with error structure
-             # Processing time etc are set by the main endpoint wrapper
-             return UrlAnalysisResponse(request_id="dummy", input_text="dummy", processing_time_ms=0.0, **consolidated_result)
-        except (ApiException, RateLimitException) as scan_api_err:
-            logger.error(f"[ReqID: {request_id}] Critical failure during URL scanning: {scan_api_err}")
-            consolidated_result = consolidate_url_assessment(input_text, extracted_url, text_assessment_obj, {}) # Pass empty scans
-            consolidated_result.update({"assessment": "Analysis Failed", "analysis_summary": f"Failed to get results from scanners: {scan_api_err}", "confidence_score": 0.1, "evidence_notes": [f"Scanning services unavailable: {scan_api_err}"]})
-            return UrlAnalysisResponse(request_id="dummy", input_text="dummy", processing_time_ms=0.0, **consolidated_result)
-
-        # Consolidate if scans ran (even if some failed individually)
-        consolidated_result = consolidate_url_assessment(input_text, extracted_url, text_assessment_obj, scan_outputs_dict)
-    else: # No processable URL found
+            result_model = task.result()
+            yield format_sse("result", result_model.model_dump(mode="json"))
+        except (RateLimitException, ApiException, GroqApiException) as api_exc:
+            status_code = 429 if isinstance(api_exc, RateLimitException) else 503
+            logger.warning(f"[ReqID: {request_id}] API Error during streamed analysis: {api_exc}")
+            yield format_sse("error", {"request_id": request_id, "status_code": status_code, "error": "Rate Limit Exceeded" if status_code == 429 else "Service Unavailable", "message": str(api_exc)})
+        except HTTPException as he:
+            message = he.detail.get("message", str(he.detail)) if isinstance(he.detail, dict) else str(he.detail)
+            yield format_sse("error", {"request_id": request_id, "status_code": he.status_code, "error": "API Error", "message": message})
+        except Exception as e:
+            logger.error(f"[ReqID: {request_id}] Unexpected internal server error during streamed analysis: {e}", exc_info=True)
+            yield format_sse("error", {"request_id": request_id, "status_code": 500, "error": "Internal Server Error", "message": f"An unexpected error occurred: {type(e).__name__}"})
+    finally:
+        if not task.done(): # Client disconnected mid-stream
+            logger.info(f"[ReqID: {request_id}] Stream closed before analysis finished; cancelling.")
+            task.cancel()
+
+
+@app.get("/analyze/url/jobs/{job_id}", response_model=ScanJobResponse, tags=["Analysis"],
+         responses={404: {"description": "Job Not Found or Expired", "model": ErrorResponse}})
+async def get_url_scan_job(job_id: str, api_key_dependency: Optional[str] = Depends(get_api_key)):
+    """Progress of a background scan job (see followup_job_id); once completed, includes the re-run URL analysis."""
+    job = await get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail={"error": "Not Found", "message": f"Scan job '{job_id}' not found or expired."})
+    result = None
+    if job["status"] == JOB_COMPLETED:
+        if job.get("result"):
+            result = UrlAnalysisResponse(**job["result"]) # Re-run once per job; later polls reuse it
+        else:
+            result = await _scan_job_reanalysis.do(job_id, _reanalyze_scan_job, job_id, job["input_text"])
+    return ScanJobResponse(job_id=job_id, status=job["status"], scanners=job["scanners"],
+                           created_at=job["created_at"], updated_at=job["updated_at"], result=result)
+
+
+_scan_job_reanalysis = SingleFlight("scan_job_reanalysis") # Concurrent first polls of a completed job share one re-run
+
+async def _reanalyze_scan_job(job_id: str, input_text: str) -> Optional[UrlAnalysisResponse]:
+    """Re-runs the caller's URL analysis for a completed job and stores it on the job record."""
+    # New scanner results are in the scanner cache now, so this re-run is cheap and upgrades the verdict
+    request_id = str(uuid.uuid4()); start_time = time.perf_counter()
+    try:
+        result = await handle_url_analysis(request_id, input_text, submit_unknown=False)
+        result.request_id = request_id; result.input_text = input_text
+        result.processing_time_ms = round((time.perf_counter() - start_time) * 1000, 2)
+    except Exception as e:
+        logger.error(f"[ReqID: {request_id}] Re-analysis for scan job {job_id} failed: {e}", exc_info=True)
+        return None # Not stored: the next poll tries again
+    await store_job_result(job_id, result.model_dump(mode="json"))
+    return result
+
+
+# --- Handler Functions for Each Intent ---
+
+# Worst-first ranking of URL verdicts (multi-URL inputs report the worst one at the top level)
+_URL_SEVERITY = {"Phishing": 6, "Malicious": 6, "Suspicious": 4, "Spam": 3, "Uncertain": 2, "Analysis Failed": 1, "Likely Safe": 0}
+_url_fanout_limit: Optional[asyncio.Semaphore] = None # Shared by all requests: bounds concurrent per-URL analyses
+
+async def handle_url_analysis(request_id: str, input_text: str, submit_unknown: bool = True) -> UrlAnalysisResponse:
+    """
+    Handles the URL analysis workflow for every URL in the input (fan-out under a shared concurrency limit).
+    With submit_unknown, URLs VT/URLScan have no data for are queued for background submission.
+    """
+    global _url_fanout_limit
+    logger.info(f"[ReqID: {request_id}] Starting URL analysis workflow.")
+
+    # 1. Extract URLs (deduplicated by sanitized form) and the surrounding text
+    urls = extract_urls(input_text, max_urls=URL_MAX_PER_REQUEST)
+    if not urls: # No processable URL found
         logger.warning(f"[ReqID: {request_id}] No processable URL found in input text for analysis.")
         consolidated_result = consolidate_url_assessment(input_text, None, None, {}) # Use logic for N/A URL
+        return UrlAnalysisResponse(request_id="dummy", input_text="dummy", processing_time_ms=0.0, **consolidated_result)
+    logger.info(f"[ReqID: {request_id}] URLs extracted: {[u.sanitized for u in urls]}")
+
+    context_text = input_text
+    for u in reversed(urls): context_text = context_text[:u.start] + "[URL]" + context_text[u.end:]
+    context_text = context_text.strip()
+    if not context_text.replace("[URL]", "").strip(): context_text = None
+
+    text_assessment_obj: Optional[TextContextAssessment] = None
+    if context_text: text_assessment_obj = _analyze_text_context(request_id, context_text)
+    else: text_assessment_obj = TextContextAssessment(suspicion_level="N/A", key_indicators=[]); logger.debug(f"[ReqID: {request_id}] No surrounding text context for URL.")
+
+    # 2. Analyze every URL concurrently, bounded by the shared fan-out limit
+    if _url_fanout_limit is None: _url_fanout_limit = asyncio.Semaphore(URL_FANOUT_CONCURRENCY)
+    async def analyze(url_info) -> Dict[str, Any]:
+        async with _url_fanout_limit:
+            return await _analyze_single_url(request_id, input_text, url_info.sanitized, text_assessment_obj, submit_unknown)
+    results = await asyncio.gather(*(analyze(u) for u in urls))
+
+    # 3. Worst case across URLs is the overall verdict; every URL keeps its own verdict
+    verdicts = [UrlVerdict(url=u.sanitized, registered_domain=u.registered_domain, assessment=r["assessment"], confidence_score=r["confidence_score"],
+                           analysis_summary=r["analysis_summary"], scan_results=r.get("scan_results"), evidence_notes=r.get("evidence_notes", []),
+                           followup_job_id=r.get("followup_job_id"))
+                for u, r in zip(urls, results)]
+    worst = max(range(len(results)), key=lambda i: (_URL_SEVERITY.get(results[i]["assessment"], 2), results[i]["confidence_score"]))
+    consolidated_result = dict(results[worst], url_results=verdicts)
+    if len(urls) > 1:
+        consolidated_result["analysis_summary"] = f"{len(urls)} URLs analyzed; worst: {verdicts[worst].assessment} ({verdicts[worst].url}). {results[worst]['analysis_summary']}"
+        consolidated_result["evidence_notes"] = [f"URL {v.url}: {v.assessment} ({v.confidence_score:.2f})" for v in verdicts] + list(results[worst].get("evidence_notes", []))
 
     # Assemble and return the final response
     response = UrlAnalysisResponse(request_id="dummy", input_text="dummy", processing_time_ms=0.0, **consolidated_result)
-    logger.info(f"[ReqID: {request_id}] URL Analysis Completed. Assessment: {response.assessment}, Confidence: {response.confidence_score:.3f}")
+    logger.info(f"[ReqID: {request_id}] URL Analysis Completed ({len(urls)} URL(s)). Assessment: {response.assessment}, Confidence: {response.confidence_score:.3f}")
     return response
 
 
+async def _analyze_single_url(request_id: str, input_text: str, extracted_url: str, text_assessment_obj: Optional[TextContextAssessment],
+                              submit_unknown: bool) -> Dict[str, Any]:
+    """Reputation check, scans and consolidation for one sanitized URL; returns the consolidated assessment dict."""
+    # Local reputation filters answer known-good/known-bad domains without spending scanner quota
+    reputation = check_url_reputation(extracted_url)
+    if reputation:
+        logger.info(f"[ReqID: {request_id}] Local reputation match for {extracted_url}: {reputation.verdict} ({reputation.source}: {reputation.domain})")
+        return _reputation_assessment(extracted_url, text_assessment_obj, reputation)
+
+    try: scan_outputs_dict = await _perform_url_scans(request_id, extracted_url)
+    except ValueError as ve: # Catch invalid URL from _perform_url_scans
+         logger.error(f"[ReqID: {request_id}] URL scanning failed due to invalid URL input: {ve}")
+         consolidated_result = consolidate_url_assessment(input_text, None, None, {}) # Pass empty scans
+         consolidated_result.update({"assessment": "Analysis Failed", "scanned_url": extracted_url, "analysis_summary": f"URL processing error: {ve}", "confidence_score": 0.1, "evidence_notes": [f"URL processing error: {ve}"]})
+         return consolidated_result
+    except (ApiException, RateLimitException) as scan_api_err:
+        logger.error(f"[ReqID: {request_id}] Critical failure during URL scanning: {scan_api_err}")
+        consolidated_result = consolidate_url_assessment(input_text, extracted_url, text_assessment_obj, {}) # Pass empty scans
+        consolidated_result.update({"assessment": "Analysis Failed", "analysis_summary": f"Failed to get results from scanners: {scan_api_err}", "confidence_score": 0.1, "evidence_notes": [f"Scanning services unavailable: {scan_api_err}"]})
+        return consolidated_result
+
+    # Consolidate if scans ran (even if some failed individually)
+    consolidated_result = consolidate_url_assessment(input_text, extracted_url, text_assessment_obj, scan_outputs_dict)
+    record_verdict(extracted_url, consolidated_result["assessment"], consolidated_result["confidence_score"],
+                   _malicious_scan_signals(scan_outputs_dict)) # Feeds the local blocklists
+
+    # Unseen URL: submit to the scanners in the background; the client can poll the job for an upgraded verdict
+    if submit_unknown:
+        unseen = [name for name in ("virustotal", "urlscanio")
+                  if scan_outputs_dict.get(name) and scan_outputs_dict[name].status in ("no_data", "no_scan_found", "pending")]
+        if unseen:
+            try: consolidated_result["followup_job_id"] = await enqueue_scan_job(input_text, extracted_url, unseen)
+            except Exception as e: logger.error(f"[ReqID: {request_id}] Could not queue background scan: {e}", exc_info=True)
+            if consolidated_result.get("followup_job_id"):
+                consolidated_result["evidence_notes"].append(f"Submitted to {', '.join(unseen)} for a fresh scan; poll job {consolidated_result['followup_job_id']} for an updated verdict.")
+    return consolidated_result
+
+
+# Normalized KG assessment -> response label (add_claim_to_graph stores lower_snake_case)
+_KG_ASSESSMENT_LABELS = {label.lower().replace(" ", "_"): label for label in
+                         ("Likely Factual", "Likely Misleading", "Opinion", "Needs Verification / Uncertain", "Contradictory Information Found")}
+
 async def handle_misinfo_analysis(request_id: str, input_text: str) -> MisinformationAnalysisResponse:
     """Handles Misinfo analysis: RAG -> Direct LLM -> Web Search Synthesis Fallback."""
     logger.info(f"[ReqID: {request_id}] Starting Misinformation analysis workflow (with web fallback).")
@@ -812,13 +1127,34 @@ async def handle_misinfo_analysis(request_id: str, input_text: str) -> Misinform
     # Initialize response fields
     assessment: Literal["Likely Factual", "Likely Misleading", "Opinion", "Needs Verification / Uncertain", "Contradictory Information Found"] = "Needs Verification / Uncertain"
     confidence = 0.0; explanation = "Analysis pending."; evidence: List[EvidenceItem] = []
-    kg_insights: Optional[str] = None; data_source: Literal["RAG", "LLM Internal Knowledge", "Web Search", "Web Search Synthesis"] = "LLM Internal Knowledge"
+    kg_insights: Optional[str] = None; data_source: Literal["RAG", "LLM Internal Knowledge", "Web Search", "Web Search Synthesis", "Knowledge Graph"] = "LLM Internal Knowledge"
     key_issues: List[str] = []; verifiable_claims: List[str] = []; raw_llm_output: Optional[str] = None
 
     # KG Query
-    try: extracted_ents = extract_entities(input_text); kg_insights = query_kg_for_entities(extracted_ents) if extracted_ents else None
+    try: extracted_ents = await extract_entities_async(input_text); kg_insights = query_kg_for_entities(extracted_ents) if extracted_ents else None
     except Exception as kg_err: logger.error(f"[ReqID: {request_id}] KG query error: {kg_err}", exc_info=True); kg_insights = "Knowledge Graph query failed."
 
+    # --- Stage 0: Prior verdict for an exact repeat claim (skips RAG/LLM/web entirely) ---
+    prior = None
+    if SERVE_PRIOR_VERDICTS:
+        try: prior = find_prior_verdict(input_text)
+        except Exception as e: logger.error(f"[ReqID: {request_id}] KG prior verdict lookup failed: {e}", exc_info=True)
+    prior_assessment = _KG_ASSESSMENT_LABELS.get(prior.get("assessment")) if prior else None
+    if prior_assessment and not prior["exact"]: # Near-duplicate: may differ by a negation, number or date - analyze it anew
+        note = f"A similar claim (similarity {prior['similarity']:.2f}) was previously assessed as {prior_assessment}."
+        kg_insights = f"{kg_insights}\n{note}" if kg_insights else note
+        logger.info(f"[ReqID: {request_id}] Near-duplicate of KG claim {prior['claim_id']} ({prior['similarity']:.2f}); analyzing anyway.")
+    elif prior_assessment and prior_assessment not in ("Needs Verification / Uncertain", "Contradictory Information Found") and (prior.get("confidence") or 0.0) >= PRIOR_VERDICT_MIN_CONFIDENCE:
+        assessment = prior_assessment; confidence = float(prior["confidence"]); data_source = "Knowledge Graph"
+        explanation = f"This exact claim was analyzed before (seen {prior['seen_count']} time(s)); the recorded assessment was reused."
+        evidence = [EvidenceItem(source="Knowledge Graph", snippet=f"Prior claim {prior['claim_id']}", assessment_note=f"Prior assessment: {assessment}")]
+        # Not submitted back to the KG: a reused verdict is not new evidence, and re-recording it would keep it fresh forever
+        logger.info(f"[ReqID: {request_id}] Served prior verdict from KG claim {prior['claim_id']}. Assessment: {assessment}, Conf: {confidence:.2f}")
+        return MisinformationAnalysisResponse(
+            request_id="dummy", input_text="dummy", processing_time_ms=0.0, # Placeholders
+            assessment=assessment, confidence_score=round(confidence, 3), explanation=explanation,
+            evidence=evidence, data_source=data_source, knowledge_graph_insights=kg_insights )
+
     # --- Stage 1: Try RAG ---
     rag_sufficient = False
     if rag_processor: # Only attempt RAG if processor is available
@@ -888,7 +1224,7 @@ async def handle_misinfo_analysis(request_id: str, input_text: str) -> Misinform
 
     # --- Update KG ---
     try:
-        if extracted_ents: add_claim_to_graph(input_text, str(assessment), f"user_input:{request_id}", extracted_ents); logger.info(f"[ReqID: {request_id}] Updated KG with final assessment: {assessment}")
+        if extracted_ents: await submit_claim(input_text, str(assessment), f"user_input:{request_id}", extracted_ents, confidence=confidence); logger.info(f"[ReqID: {request_id}] Queued KG update with final assessment: {assessment}")
     except Exception as e: logger.error(f"[ReqID: {request_id}] KG update failed: {e}", exc_info=True)
 
     # --- Construct Final Response ---
@@ -912,7 +1248,7 @@ async def handle_factual_analysis(request_id: str, input_text: str) -> FactualAn
     raw_llm_output: Optional[str] = None
 
     # KG Query
-    try: extracted_ents = extract_entities(input_text); kg_insights = query_kg_for_entities(extracted_ents) if extracted_ents else None
+    try: extracted_ents = await extract_entities_async(input_text); kg_insights = query_kg_for_entities(extracted_ents) if extracted_ents else None
     except Exception as kg_err: logger.error(f"[ReqID: {request_id}] KG query error: {kg_err}", exc_info=True); kg_insights = "Knowledge Graph query failed."
 
     # --- Stage 1: Try RAG ---
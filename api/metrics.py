@@ -0,0 +1,76 @@
+# api/metrics.py
+"""
+Minimal in-process metrics: named counters and latency summaries.
+
+Counters are plain integers keyed by a dotted name (e.g. 'llm_cache.misinfo.l1_hit').
+Summaries keep count/sum/max plus a bounded window of recent samples for percentiles.
+Everything runs on the event loop thread, so no locking is needed; snapshot() feeds
+the /metrics endpoint.
+"""
+
+import time
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, Optional
+
+SUMMARY_WINDOW = 512 # Recent samples kept per summary for percentile estimates
+
+_counters: Dict[str, int] = defaultdict(int)
+_gauges: Dict[str, float] = {}
+_summaries: Dict[str, Dict[str, Any]] = {}
+_started_at = time.time()
+
+
+def increment(name: str, value: int = 1) -> None:
+    _counters[name] += value
+
+
+def set_gauge(name: str, value: float) -> None:
+    _gauges[name] = value
+
+
+def observe(name: str, value: float) -> None:
+    """Records one sample (e.g. a latency in seconds)."""
+    summary = _summaries.get(name)
+    if summary is None:
+        summary = _summaries[name] = {"count": 0, "sum": 0.0, "max": 0.0, "recent": deque(maxlen=SUMMARY_WINDOW)}
+    summary["count"] += 1
+    summary["sum"] += value
+    summary["max"] = max(summary["max"], value)
+    summary["recent"].append(value)
+
+
+def percentile(name: str, pct: float) -> Optional[float]:
+    """Percentile (0-100) over the recent window of a summary, or None without samples."""
+    summary = _summaries.get(name)
+    if not summary or not summary["recent"]:
+        return None
+    ordered = sorted(summary["recent"])
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100.0))]
+
+
+def sample_count(name: str) -> int:
+    """Samples currently in a summary's recent window."""
+    summary = _summaries.get(name)
+    return len(summary["recent"]) if summary else 0
+
+
+def get_counter(name: str) -> int:
+    return _counters.get(name, 0)
+
+
+def snapshot() -> Dict[str, Any]:
+    """All metrics as plain JSON-serializable data."""
+    summaries = {}
+    for name, summary in _summaries.items():
+        recent: Deque[float] = summary["recent"]
+        summaries[name] = {
+            "count": summary["count"], "sum": round(summary["sum"], 6), "max": round(summary["max"], 6),
+            "avg": round(summary["sum"] / summary["count"], 6) if summary["count"] else None,
+            "p50": percentile(name, 50), "p95": percentile(name, 95), "window": len(recent),
+        }
+    return {
+        "uptime_seconds": round(time.time() - _started_at, 1),
+        "counters": dict(sorted(_counters.items())),
+        "gauges": dict(sorted(_gauges.items())),
+        "summaries": dict(sorted(summaries.items())),
+    }
@@ -39,13 +39,33 @@ class BaseAnalysisResponse(BaseModel):
         return min(max(v, 0.0), 1.0)
 
 # Forward references are implicitly handled by Pydantic v2+
+class UrlVerdict(BaseModel):
+    url: str = Field(..., description="Sanitized URL as scanned.")
+    registered_domain: Optional[str] = Field(None, description="Registrable domain (public-suffix aware), e.g. example.co.uk.")
+    assessment: Literal["Malicious", "Phishing", "Spam", "Suspicious", "Likely Safe", "Uncertain", "Analysis Failed"]
+    confidence_score: float = Field(..., ge=0.0, le=1.0)
+    analysis_summary: str
+    scan_results: Optional[UrlScanResults] = None
+    evidence_notes: List[str] = Field(default_factory=list)
+    followup_job_id: Optional[str] = None
+
 class UrlAnalysisResponse(BaseAnalysisResponse):
     assessment: Literal["Malicious", "Phishing", "Spam", "Suspicious", "Likely Safe", "Uncertain", "Analysis Failed"]
-    scanned_url: Optional[str] = Field(None, description="The primary URL that was extracted and analyzed.")
+    scanned_url: Optional[str] = Field(None, description="The primary URL analyzed: with several URLs, the one with the worst verdict.")
     analysis_summary: str = Field(..., description="A brief textual summary of the findings.")
     text_context_assessment: Optional[TextContextAssessment] = Field(None, description="Assessment of text surrounding the URL, if applicable.")
     scan_results: Optional[UrlScanResults] = Field(None, description="Detailed results from integrated URL scanning services.")
     evidence_notes: List[str] = Field(default_factory=list, description="Specific textual points supporting the assessment.")
+    followup_job_id: Optional[str] = Field(None, description="Background scan job submitting the URL to scanners that had no data; poll GET /analyze/url/jobs/{job_id} for the upgraded verdict.")
+    url_results: List[UrlVerdict] = Field(default_factory=list, description="Per-URL verdicts when the input contains several URLs (top-level fields are the worst case).")
+
+class ScanJobResponse(BaseModel):
+    job_id: str
+    status: str = Field(..., description="'queued', 'running', 'completed' (at least one scanner produced a result) or 'failed'.")
+    scanners: Dict[str, str] = Field(default_factory=dict, description="Per-scanner progress: queued, running, completed, timed_out or failed: <reason>.")
+    created_at: float
+    updated_at: float
+    result: Optional[UrlAnalysisResponse] = Field(None, description="Re-run analysis using the new scanner results (once completed).")
 
 class FactualAnalysisResponse(BaseAnalysisResponse):
     assessment: Literal["Likely Factual", "Opinion", "Needs Verification / Uncertain", "Contradictory Information Found"]
@@ -72,6 +92,46 @@ class StatusResponse(BaseModel):
     rag_index_status: str = Field(..., description="Status of the RAG vector index.")
     kg_status: str = Field(..., description="Status of the Knowledge Graph component.")
     classifier_status: str = Field(..., description="Status of the Intent Classifier model.")
+    circuit_breakers: Dict[str, Dict[str, Any]] = Field(default_factory=dict, description="Per-upstream circuit breaker state: closed, open (failing fast) or half_open (probing).")
+
+class KGEntityStatsResponse(BaseModel):
+    entity_id: str = Field(..., description="Normalized KG node ID, e.g. 'person:joe_biden'.")
+    name: Optional[str] = Field(None, description="Entity surface form as first seen.")
+    entity_type: Optional[str] = Field(None, description="NER label of the entity (PERSON, ORG, ...).")
+    claim_count: int = Field(0, description="Number of claims recorded that mention this entity.")
+    assessment_counts: Dict[str, int] = Field(default_factory=dict, description="Claim count per normalized assessment.")
+    last_seen: Optional[float] = Field(None, description="Unix timestamp of the most recent claim mentioning this entity.")
+
+class KGRelatedEntity(BaseModel):
+    entity_id: str
+    name: Optional[str] = None
+    entity_type: Optional[str] = None
+    hops: int = Field(..., description="Entity hops from the queried entity (1 = shares a claim with it).")
+    via: str = Field(..., description="Entity through which this one was reached.")
+    shared_claims: int = Field(..., description="Claims shared with the 'via' entity.")
+    claim_count: int = 0
+    assessment_counts: Dict[str, int] = Field(default_factory=dict)
+
+class KGRelatedEntitiesResponse(BaseModel):
+    entity_id: str
+    depth: int
+    related: List[KGRelatedEntity] = Field(default_factory=list)
+
+class KGStatsResponse(BaseModel):
+    loaded: bool = Field(..., description="Whether the Knowledge Graph is loaded.")
+    node_count: int = 0
+    edge_count: int = 0
+    claim_count: int = 0
+    entity_count: int = 0
+    assessment_counts: Dict[str, int] = Field(default_factory=dict, description="Total claims per normalized assessment.")
+    duplicate_count: int = Field(0, description="Repeat claims folded into an existing claim node.")
+    evicted_claim_count: int = Field(0, description="Claims dropped by retention (still counted in entity aggregates).")
+    last_seq: int = Field(0, description="Sequence number of the latest applied mutation.")
+    snapshot_seq: int = Field(0, description="Sequence number covered by the on-disk snapshot.")
+    pending_log_records: int = Field(0, description="Mutations not yet appended to the mutation log.")
+    read_view_seq: int = Field(0, description="Sequence number reflected by the read-only view served to queries.")
+    write_queue_depth: int = Field(0, description="Write jobs queued for the KG writer task.")
+    log_size_bytes: int = 0
 
 class ErrorDetail(BaseModel):
     request_id: Optional[str] = None # Make optional for easier exception raising
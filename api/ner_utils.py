@@ -0,0 +1,188 @@
+# api/ner_utils.py
+"""
+Batched named-entity recognition for the Knowledge Graph.
+
+* EntityCache: LRU of extraction results keyed by a hash of the text, so repeated
+  (viral) texts are parsed once.
+* BatchedNER: collects concurrent extract() calls for up to `max_wait_ms` and runs
+  them through one nlp.pipe() call in a worker thread, off the event loop.
+  extract_many() is the bulk path (nlp.pipe with n_process) for back-filling corpora.
+"""
+
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from typing import Iterable, List, Optional, Sequence, Set, Tuple
+
+from spacy.language import Language
+
+from .utils import get_config
+
+logger = logging.getLogger(__name__)
+CONFIG = get_config()
+NER_CONFIG = CONFIG.get('ner', {})
+NER_BATCH_SIZE = NER_CONFIG.get('batch_size', 32) # Texts per nlp.pipe call on the request path
+NER_MAX_WAIT_MS = NER_CONFIG.get('max_batch_wait_ms', 5) # How long the first request waits for others to join its batch
+NER_BULK_BATCH_SIZE = NER_CONFIG.get('bulk_batch_size', 256)
+NER_BULK_N_PROCESS = NER_CONFIG.get('bulk_n_process', 1) # >1 forks worker processes (bulk mode only)
+NER_CACHE_SIZE = NER_CONFIG.get('cache_size', 10000)
+
+Entity = Tuple[str, str] # (surface text, NER label)
+
+
+def text_cache_key(text: str) -> bytes:
+    """Fixed-size cache key, so the cache never holds on to full request texts."""
+    return hashlib.blake2b(text.encode('utf8', errors='replace'), digest_size=16).digest()
+
+
+class EntityCache:
+    """Small LRU mapping text hash -> extracted entities."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._items: "OrderedDict[bytes, Tuple[Entity, ...]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: bytes) -> Optional[List[Entity]]:
+        entities = self._items.get(key)
+        if entities is None:
+            self.misses += 1
+            return None
+        self._items.move_to_end(key)
+        self.hits += 1
+        return list(entities)
+
+    def put(self, key: bytes, entities: Sequence[Entity]) -> None:
+        if self.max_size <= 0:
+            return
+        self._items[key] = tuple(entities)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class BatchedNER:
+    """Micro-batching front end for a spaCy pipeline. One batch runs at a time, in a worker thread."""
+
+    def __init__(self, nlp: Language, entity_types: Set[str], batch_size: int = NER_BATCH_SIZE,
+                 max_wait_ms: float = NER_MAX_WAIT_MS, cache_size: int = NER_CACHE_SIZE):
+        self.nlp = nlp
+        self.entity_types = entity_types
+        self.batch_size = batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.cache = EntityCache(cache_size)
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._inflight: dict = {} # Cache key -> future of a queued/running parse (identical concurrent texts share it)
+        self.batches_run = 0
+        self.texts_parsed = 0
+
+    # --- Core extraction ---
+
+    def _entities_from_doc(self, doc) -> List[Entity]:
+        entities = [(ent.text.strip(), ent.label_) for ent in doc.ents if ent.label_ in self.entity_types]
+        return list(dict.fromkeys(entities)) # Simple deduplication by text
+
+    def _run_pipe(self, texts: List[str], batch_size: int, n_process: int = 1) -> List[List[Entity]]:
+        docs = self.nlp.pipe((t[:self.nlp.max_length] for t in texts), batch_size=batch_size, n_process=n_process)
+        results = [self._entities_from_doc(doc) for doc in docs]
+        self.batches_run += 1; self.texts_parsed += len(texts)
+        return results
+
+    def extract_many(self, texts: Iterable[str], batch_size: int = NER_BULK_BATCH_SIZE, n_process: int = NER_BULK_N_PROCESS) -> List[List[Entity]]:
+        """Bulk mode (synchronous): cache-aware nlp.pipe over a whole corpus, duplicates parsed once."""
+        texts = list(texts)
+        results: List[Optional[List[Entity]]] = [None] * len(texts)
+        pending: "OrderedDict[bytes, List[int]]" = OrderedDict() # Cache key -> positions still needing a parse
+        for pos, text in enumerate(texts):
+            if not text:
+                results[pos] = []; continue
+            key = text_cache_key(text)
+            cached = self.cache.get(key)
+            if cached is not None:
+                results[pos] = cached
+            else:
+                pending.setdefault(key, []).append(pos)
+        if pending:
+            unique_texts = [texts[positions[0]] for positions in pending.values()]
+            start = time.perf_counter()
+            parsed = self._run_pipe(unique_texts, batch_size=batch_size, n_process=n_process)
+            logger.info(f"Bulk NER parsed {len(unique_texts)} unique texts in {time.perf_counter() - start:.2f}s (n_process={n_process}).")
+            for (key, positions), entities in zip(pending.items(), parsed):
+                self.cache.put(key, entities)
+                for pos in positions: results[pos] = list(entities)
+        return results
+
+    # --- Request path (micro-batched) ---
+
+    async def extract(self, text: str) -> List[Entity]:
+        """Entities for one text; concurrent calls are batched into a single nlp.pipe run."""
+        if not text:
+            return []
+        key = text_cache_key(text)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        if self._task is None or self._task.done(): # Batcher not running - parse inline in a thread
+            return (await asyncio.to_thread(self.extract_many, [text], self.batch_size, 1))[0]
+        future = self._inflight.get(key)
+        if future is None:
+            future = self._inflight[key] = asyncio.get_running_loop().create_future()
+            await self._queue.put((key, text, future))
+        return list(await asyncio.shield(future)) # Shielded: one caller's cancellation must not fail the others
+
+    async def _batch_loop(self):
+        while True:
+            batch = [await self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try: batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+                except asyncio.TimeoutError: break
+
+            try:
+                parsed = await asyncio.to_thread(self._run_pipe, [text for _, text, _ in batch], self.batch_size)
+                for (key, _, future), entities in zip(batch, parsed):
+                    self.cache.put(key, entities)
+                    if not future.done(): future.set_result(entities)
+            except Exception as e:
+                logger.error(f"Batched NER failed for {len(batch)} texts: {e}", exc_info=True)
+                for _, _, future in batch:
+                    if not future.done(): future.set_exception(e)
+            finally:
+                for key, _, _ in batch: self._inflight.pop(key, None)
+
+    def start(self):
+        """Starts the batching task on the running event loop (idempotent)."""
+        if self._task is not None and not self._task.done():
+            return
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._batch_loop(), name="ner-batcher")
+        logger.info(f"Batched NER started (batch size: {self.batch_size}, max wait: {self.max_wait * 1000:.0f}ms, cache: {self.cache.max_size}).")
+
+    async def stop(self):
+        """Stops the batching task; requests still queued get an error instead of hanging."""
+        if self._task is not None:
+            self._task.cancel()
+            try: await self._task
+            except asyncio.CancelledError: pass
+            self._task = None
+        while self._queue is not None and not self._queue.empty():
+            key, _, future = self._queue.get_nowait()
+            if not future.done(): future.set_exception(RuntimeError("NER batcher stopped"))
+            self._inflight.pop(key, None)
+
+    def stats(self) -> dict:
+        return {
+            "cache_size": len(self.cache), "cache_hits": self.cache.hits, "cache_misses": self.cache.misses,
+            "batches_run": self.batches_run, "texts_parsed": self.texts_parsed,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+        }
@@ -0,0 +1,127 @@
+# api/prompt_builder.py
+"""
+Token-budgeted context assembly for LLM prompts.
+
+Evidence chunks (RAG documents, web snippets) are ordered by score, stripped of sentences
+already included from higher-ranked chunks (mirrored web pages repeat snippets), and packed
+until the model's context budget is spent. For overlapping chunks (RAG chunks share
+rag.chunk_overlap characters with their neighbours) the partial sentences at a chunk's edges
+are also dropped when they repeat text of an earlier chunk from the same document. The last chunk that does not fit is cut at a sentence boundary.
+
+Token counts are estimates (word/punctuation pieces, ~1.25 tokens per word for the
+Llama 3 tokenizer on English text) - close enough for budgeting, no tokenizer needed.
+"""
+
+import logging
+import re
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from .utils import get_config
+
+logger = logging.getLogger(__name__)
+CONFIG = get_config()
+BUDGET_CONFIG = CONFIG.get('prompt_budget', {})
+CONTEXT_WINDOWS = BUDGET_CONFIG.get('context_window', {}) # Model -> total context tokens
+CONTEXT_TOKENS = BUDGET_CONFIG.get('context_tokens', {}) # Model -> tokens allowed for evidence
+TEMPLATE_RESERVE = BUDGET_CONFIG.get('template_reserve_tokens', 600) # Instructions + query around the evidence
+MIN_PARTIAL_TOKENS = BUDGET_CONFIG.get('min_partial_tokens', 60) # Don't bother adding a cut chunk smaller than this
+MIN_FRAGMENT_WORDS = BUDGET_CONFIG.get('min_fragment_words', 6) # Shorter edge sentences are kept even if found in earlier text
+
+_PIECE_RE = re.compile(r"\w+|[^\w\s]")
+_SENTENCE_RE = re.compile(r"[^.!?\n]+(?:[.!?]+|\n|$)")
+_NORMALIZE_RE = re.compile(r"\W+")
+
+
+class EvidenceChunk(NamedTuple):
+    text: str
+    score: float
+    source: str = ""
+
+
+def count_tokens(text: str) -> int:
+    """Estimated Llama 3 token count."""
+    return int(len(_PIECE_RE.findall(text or "")) * 1.25) + 1
+
+
+def context_budget(model: Optional[str], max_output_tokens: int) -> int:
+    """Evidence tokens for `model`: its configured budget, capped by what the window leaves after output and template."""
+    model = model or CONFIG.get('groq', {}).get('model')
+    window = CONTEXT_WINDOWS.get(model, CONTEXT_WINDOWS.get('default', 8192))
+    configured = CONTEXT_TOKENS.get(model, CONTEXT_TOKENS.get('default', 3000))
+    return max(0, min(configured, window - max_output_tokens - TEMPLATE_RESERVE))
+
+
+def _normalize(text: str) -> str:
+    return _NORMALIZE_RE.sub(" ", text.lower()).strip()
+
+
+def _novel_text(text: str, seen_sentences: set, same_source_text: List[str]) -> str:
+    """The sentences of `text` not already included. Boundary fragments (chunk overlap cuts
+    sentences mid-way) are also dropped when they occur inside `same_source_text`, the earlier
+    chunks of the same document (empty for independent chunks such as web snippets)."""
+    sentences = [m.group(0) for m in _SENTENCE_RE.finditer(text) if m.group(0).strip()]
+    blob = " ".join(same_source_text)
+    kept = []
+    for i, sentence in enumerate(sentences):
+        norm = _normalize(sentence)
+        if not norm or norm in seen_sentences:
+            continue
+        if blob and (i == 0 or i == len(sentences) - 1) and len(norm.split()) >= MIN_FRAGMENT_WORDS and norm in blob:
+            continue
+        seen_sentences.add(norm)
+        kept.append(sentence)
+    return "".join(kept).strip()
+
+
+def _cut_to_tokens(text: str, max_tokens: int) -> str:
+    """Longest sentence prefix of `text` within max_tokens."""
+    out, used = [], 0
+    for m in _SENTENCE_RE.finditer(text):
+        cost = count_tokens(m.group(0))
+        if used + cost > max_tokens:
+            break
+        out.append(m.group(0)); used += cost
+    return "".join(out).strip()
+
+
+def build_context(chunks: Iterable[EvidenceChunk], budget_tokens: int, separator: str = "\n\n---\n\n",
+                  overlapping: bool = False, chunk_overhead_tokens: int = 0) -> Tuple[str, List[EvidenceChunk]]:
+    """
+    Packs the highest-scoring, de-duplicated chunks into `budget_tokens`.
+    overlapping: chunks were split from documents with overlap (RAG), so edge fragments repeating
+    an earlier chunk of the same source are dropped too.
+    chunk_overhead_tokens: extra tokens the caller adds around each chunk it uses (e.g. source/title lines).
+    Returns (context string, chunks used - with their de-duplicated text).
+    """
+    chunks = sorted(chunks, key=lambda c: c.score, reverse=True)
+    seen_sentences: set = set(); seen_by_source: Dict[str, List[str]] = {}
+    used: List[EvidenceChunk] = []
+    remaining = max(0, budget_tokens)
+    separator_cost = count_tokens(separator)
+    dropped_duplicate = truncated = 0
+
+    for chunk in chunks:
+        same_source = seen_by_source.get(chunk.source, []) if overlapping and chunk.source else []
+        text = _novel_text(chunk.text, seen_sentences, same_source)
+        if not text:
+            dropped_duplicate += 1
+            continue
+        overhead = chunk_overhead_tokens + (separator_cost if used else 0)
+        cost = count_tokens(text) + overhead
+        if cost > remaining:
+            if remaining - overhead >= MIN_PARTIAL_TOKENS:
+                text = _cut_to_tokens(text, remaining - overhead)
+                if text:
+                    used.append(chunk._replace(text=text)); truncated += 1
+                    remaining -= count_tokens(text) + overhead
+            break
+        if overlapping and chunk.source:
+            seen_by_source.setdefault(chunk.source, []).append(_normalize(chunk.text)) # The full chunk: its overlap is what the next one repeats
+        used.append(chunk._replace(text=text))
+        remaining -= cost
+
+    skipped = len(chunks) - len(used) - dropped_duplicate
+    if dropped_duplicate or skipped or truncated:
+        logger.debug(f"Prompt context: {len(used)}/{len(chunks)} chunks, {max(0, budget_tokens) - remaining} tokens "
+                     f"(duplicates dropped: {dropped_duplicate}, over budget: {skipped}, truncated: {truncated}).")
+    return separator.join(c.text for c in used), used
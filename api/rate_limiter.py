@@ -0,0 +1,189 @@
+# api/rate_limiter.py
+"""
+Client-side rate limiting for Groq, per model.
+
+* TokenBucket: continuous-refill bucket (requests per minute, tokens per minute).
+* ModelRateLimiter: admits calls in FIFO order once both buckets have room and a
+  concurrency slot is free. A waiting call re-checks whenever capacity comes back
+  (a call finishing, a TPM refund) and fails with RateLimitException only once its
+  deadline has actually passed, not on a projected wait.
+* Reservations: prompt estimate + the model's typical completion size (moving average of
+  reported completion_tokens, capped by max_tokens), corrected by reconcile() afterwards.
+* Adaptation: x-ratelimit-* response headers resize the TPM bucket and clamp its level
+  to what the server reports; a 429 blocks the model for its retry-after and halves the
+  concurrency limit, which then grows back by ~1 per limit-many successes (AIMD).
+"""
+
+import asyncio
+import logging
+import re
+import time
+from typing import Mapping, Optional
+
+from . import metrics
+from .utils import RateLimitException
+
+logger = logging.getLogger(__name__)
+
+_DURATION_PART_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+
+
+def parse_reset_duration(value: Optional[str]) -> Optional[float]:
+    """Parses Groq's reset headers ('7.66s', '2m59.56s', '120ms', or plain seconds) into seconds."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART_RE.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough prompt token count (~4 characters per token for English)."""
+    return len(text or "") // 4 + 1
+
+
+class TokenBucket:
+    """Continuously refilling bucket. The level may go negative after reconciling an underestimate."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0 # Refill per second
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def time_until(self, amount: float, now: float) -> float:
+        """Seconds until `amount` is available (0 if it is now). Amounts above capacity wait for a full bucket."""
+        self._refill(now)
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate) if self.rate > 0 else float("inf")
+
+    def consume(self, amount: float) -> None:
+        """Takes `amount` (negative amounts refund). Call after time_until() said it is available."""
+        self.level = min(self.capacity, self.level - amount)
+
+    def resize(self, per_minute: float) -> None:
+        if per_minute > 0 and per_minute != self.capacity:
+            self.capacity = float(per_minute); self.rate = self.capacity / 60.0
+            self.level = min(self.level, self.capacity)
+
+
+class ModelRateLimiter:
+    """RPM + TPM buckets and an adaptive concurrency limit for one model."""
+
+    def __init__(self, model: str, rpm: float, tpm: float, max_concurrency: int, completion_estimate: float = 512):
+        self.model = model
+        self.completion_estimate = float(completion_estimate) # Moving average of completion tokens per call
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.concurrency_limit = float(self.max_concurrency)
+        self.in_flight = 0
+        self.blocked_until = 0.0 # Monotonic time before which no call is sent (after a 429)
+        self._admission = asyncio.Lock() # FIFO: one caller at a time waits for capacity
+        self._capacity_changed = asyncio.Event() # Set on release/reconcile so the waiting caller re-checks
+
+    def _reject(self, reason: str):
+        metrics.increment(f"groq.limiter.{self.model}.rejected")
+        raise RateLimitException(f"Groq {self.model} capacity unavailable within deadline ({reason}).")
+
+    def estimate_call_tokens(self, prompt: str, max_tokens: int) -> int:
+        """TPM reservation for one call: prompt estimate + the typical completion size (at most max_tokens)."""
+        return estimate_tokens(prompt) + int(min(max_tokens, self.completion_estimate))
+
+    async def _wait_for_capacity(self, timeout: float) -> None:
+        """Sleeps until `timeout` passes or capacity may have come back, whichever is first."""
+        self._capacity_changed.clear()
+        try: await asyncio.wait_for(self._capacity_changed.wait(), timeout=max(0.0, timeout))
+        except asyncio.TimeoutError: pass
+
+    async def acquire(self, estimated_tokens: int, deadline: float) -> None:
+        """Waits for capacity for one call of ~estimated_tokens; raises RateLimitException once past `deadline`."""
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(self._admission.acquire(), timeout=max(0.0, deadline - start))
+        except asyncio.TimeoutError:
+            self._reject("queue")
+        try:
+            while True:
+                now = time.monotonic()
+                if self.blocked_until > deadline: # A 429 pause is never shortened, so waiting cannot help
+                    self._reject(f"paused for {self.blocked_until - now:.1f}s")
+                wait = max(self.blocked_until - now, self.requests.time_until(1, now), self.tokens.time_until(estimated_tokens, now))
+                if wait <= 0 and self.in_flight < int(self.concurrency_limit):
+                    break
+                if now >= deadline:
+                    self._reject(f"needs {wait:.1f}s more" if wait > 0 else "concurrency")
+                # A bucket refill is predictable; a finishing call or a TPM refund is not, so wake on either
+                await self._wait_for_capacity(min(wait, deadline - now) if wait > 0 else deadline - now)
+            self.requests.consume(1)
+            self.tokens.consume(estimated_tokens)
+            self.in_flight += 1
+        finally:
+            self._admission.release()
+        waited = time.monotonic() - start
+        metrics.observe(f"groq.limiter.{self.model}.wait_seconds", waited)
+        if waited > 1.0:
+            logger.info(f"Groq limiter held a {self.model} call for {waited:.2f}s (in flight: {self.in_flight}, limit: {int(self.concurrency_limit)}).")
+
+    def release(self, status_code: Optional[int] = None, headers: Optional[Mapping[str, str]] = None) -> None:
+        """Frees the concurrency slot and adapts to the response (status/headers are None on network errors)."""
+        self.in_flight = max(0, self.in_flight - 1)
+        self._capacity_changed.set()
+        if headers:
+            self._sync_from_headers(headers)
+        if status_code == 429:
+            retry_after = parse_reset_duration((headers or {}).get("retry-after")) or 1.0
+            self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+            self.concurrency_limit = max(1.0, self.concurrency_limit / 2)
+            metrics.increment(f"groq.limiter.{self.model}.throttled")
+            logger.warning(f"Groq 429 for {self.model}: pausing {retry_after:.1f}s, concurrency limit now {int(self.concurrency_limit)}.")
+        elif status_code is not None and status_code < 400:
+            self.concurrency_limit = min(float(self.max_concurrency), self.concurrency_limit + 1.0 / self.concurrency_limit)
+        metrics.set_gauge(f"groq.limiter.{self.model}.concurrency_limit", int(self.concurrency_limit))
+
+    def reconcile(self, estimated_tokens: int, usage: Optional[Mapping[str, int]]) -> None:
+        """Corrects the TPM reservation with the usage reported by the API and updates the completion estimate."""
+        if not usage:
+            return
+        if usage.get("total_tokens") is not None:
+            self.tokens.consume(usage["total_tokens"] - estimated_tokens)
+            self._capacity_changed.set() # A refund may admit the waiting caller now
+        if usage.get("completion_tokens") is not None:
+            self.completion_estimate += 0.2 * (float(usage["completion_tokens"]) - self.completion_estimate)
+
+    def _sync_from_headers(self, headers: Mapping[str, str]) -> None:
+        try:
+            limit_tokens = headers.get("x-ratelimit-limit-tokens")
+            if limit_tokens:
+                self.tokens.resize(float(limit_tokens))
+            remaining_tokens = headers.get("x-ratelimit-remaining-tokens")
+            if remaining_tokens is not None:
+                self.tokens._refill(time.monotonic())
+                self.tokens.level = min(self.tokens.level, float(remaining_tokens)) # Server view wins when lower
+            # Groq's request limit is per day; only honour it once exhausted
+            if headers.get("x-ratelimit-remaining-requests") == "0":
+                reset = parse_reset_duration(headers.get("x-ratelimit-reset-requests"))
+                if reset:
+                    self.blocked_until = max(self.blocked_until, time.monotonic() + reset)
+        except (TypeError, ValueError) as e:
+            logger.debug(f"Ignoring malformed Groq rate limit headers: {e}")
+
+    def has_headroom(self, estimated_tokens: int) -> bool:
+        """Whether a call could be admitted right now without waiting (used to gate optional hedges)."""
+        now = time.monotonic()
+        return (self.blocked_until <= now and self.in_flight < int(self.concurrency_limit)
+                and self.requests.time_until(1, now) == 0 and self.tokens.time_until(estimated_tokens, now) == 0)
+
+    def can_admit_by(self, deadline: float) -> bool:
+        """Whether a 429 pause ends before `deadline` (worth re-queueing the call)."""
+        return self.blocked_until < deadline
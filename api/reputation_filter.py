@@ -0,0 +1,266 @@
+# api/reputation_filter.py
+"""
+Local domain reputation layer in front of the external URL scanners.
+
+Bloom filters built offline (build_reputation_filter.py) from allowlists, blocklists and our
+own past high-confidence Phishing/Malicious verdicts. Each filter is one file in
+reputation_filter.directory, memory-mapped read-only - the OS shares the pages between
+workers and nothing is parsed at startup. A lookup is a few blake2b hashes and bit tests.
+
+Filters and their verdicts (block filters are checked first):
+  phishing.bloom -> "Phishing"     host or a parent domain up to its registered domain listed
+                                    (login.evil.co.uk matches evil.co.uk, never co.uk)
+  malware.bloom  -> "Malicious"    same as phishing
+  allow.bloom    -> "Likely Safe"  exact host only (www. stripped): an allowed domain does not
+                                    vouch for user content hosted on its subdomains
+
+Reload without restart: the builder writes a new file and os.replace()s it; lookups notice the
+changed file (checked every reload_check_seconds) and remap it. Bloom filters have false
+positives (never false negatives), so build with a tiny rate (false_positive_rate, default 1e-6).
+
+New verdicts from this API are appended to verdicts.tsv (picked up by the next build) and
+served from memory by this worker for recent_ttl_seconds. Only verdicts at least
+record_min_scanners scanners agree on are recorded, at registered-domain level. Shared hosting
+and shortener domains (shared_domains: docs.google.com, bit.ly, ...) serve many unrelated
+owners, so they are never recorded and never matched as a whole - the scanners judge each URL.
+"""
+
+import hashlib
+import ipaddress
+import logging
+import math
+import mmap
+import os
+import struct
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlparse
+
+from . import metrics
+from .utils import get_config, parse_domain
+
+logger = logging.getLogger(__name__)
+CONFIG = get_config()
+REPUTATION_CONFIG = CONFIG.get('reputation_filter', {})
+REPUTATION_ENABLED = REPUTATION_CONFIG.get('enabled', True)
+REPUTATION_DIR = REPUTATION_CONFIG.get('directory', "data/reputation")
+RELOAD_CHECK_SECONDS = REPUTATION_CONFIG.get('reload_check_seconds', 30)
+DEFAULT_FALSE_POSITIVE_RATE = REPUTATION_CONFIG.get('false_positive_rate', 1e-6)
+VERDICT_CONFIDENCE = REPUTATION_CONFIG.get('confidence', {"Phishing": 0.95, "Malicious": 0.95, "Likely Safe": 0.9})
+RECORD_MIN_CONFIDENCE = REPUTATION_CONFIG.get('record_min_confidence', 0.9) # Own verdicts added to the blocklists
+RECORD_MIN_SCANNERS = REPUTATION_CONFIG.get('record_min_scanners', 2) # ...and only when this many scanners flagged the URL
+RECENT_TTL = REPUTATION_CONFIG.get('recent_ttl_seconds', 86400) # How long this process serves its own verdicts from memory
+SHARED_DOMAINS = frozenset(d.lower() for d in REPUTATION_CONFIG.get('shared_domains', [
+    "docs.google.com", "drive.google.com", "sites.google.com", "storage.googleapis.com", "forms.gle",
+    "onedrive.live.com", "1drv.ms", "sharepoint.com", "dropbox.com", "dl.dropboxusercontent.com",
+    "bit.ly", "tinyurl.com", "t.co", "goo.gl", "ow.ly", "is.gd", "buff.ly", "cutt.ly", "rebrand.ly", "t.ly",
+    "linktr.ee", "notion.site", "wixsite.com", "weebly.com", "github.io", "pages.dev", "workers.dev",
+    "netlify.app", "vercel.app", "web.app", "firebaseapp.com", "herokuapp.com", "blogspot.com",
+])) # Hosts with many unrelated owners: never recorded or matched at domain level
+VERDICTS_FILE = "verdicts.tsv" # <verdict>\t<registered domain> per line
+
+# Filter name -> verdict, in lookup order (block filters first)
+FILTERS: Dict[str, str] = {"phishing": "Phishing", "malware": "Malicious", "allow": "Likely Safe"}
+BLOCK_FILTERS = ("phishing", "malware")
+BLOCK_VERDICTS = {FILTERS[name]: name for name in BLOCK_FILTERS} # "Phishing" -> "phishing"
+
+_MAGIC = b"HTHBLOOM"
+_HEADER = struct.Struct("<8sIQIQ") # magic, version, bits, hashes, items
+_VERSION = 1
+
+
+class ReputationMatch(NamedTuple):
+    verdict: str # "Phishing", "Malicious" or "Likely Safe"
+    source: str # Filter that matched ('phishing', 'malware', 'allow', or 'recent' for this process's own verdicts)
+    domain: str # The host or parent domain that matched
+    confidence: float
+
+
+def _digest(item: str) -> Tuple[int, int]:
+    """The two 64-bit hashes all bit positions derive from (one blake2b call per item, shared by all filters)."""
+    digest = hashlib.blake2b(item.encode("utf8"), digest_size=16).digest()
+    return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+
+
+def _positions(hashed: Tuple[int, int], bits: int, hashes: int) -> Iterable[int]:
+    """Double hashing (Kirsch-Mitzenmacher): position i = h1 + i * h2 (mod bits)."""
+    h1, h2 = hashed
+    return ((h1 + i * h2) % bits for i in range(hashes))
+
+
+def build_bloom(items: Iterable[str], path: str, false_positive_rate: float = DEFAULT_FALSE_POSITIVE_RATE) -> int:
+    """Writes a Bloom filter of `items` to `path` atomically (temp file + os.replace). Returns the item count."""
+    unique = {i.strip().lower() for i in items if i and i.strip()}
+    n = max(1, len(unique))
+    bits = max(64, int(math.ceil(-n * math.log(false_positive_rate) / (math.log(2) ** 2))))
+    hashes = max(1, int(round(bits / n * math.log(2))))
+    array = bytearray((bits + 7) // 8)
+    for item in unique:
+        for pos in _positions(_digest(item), bits, hashes):
+            array[pos >> 3] |= 1 << (pos & 7)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, bits, hashes, len(unique)))
+        f.write(array)
+    os.replace(tmp_path, path) # Readers keep their old mapping until they reload
+    logger.info(f"Built reputation filter {path}: {len(unique)} items, {bits} bits, {hashes} hashes ({len(array) / 1e6:.1f} MB).")
+    return len(unique)
+
+
+class MappedBloomFilter:
+    """Read-only, memory-mapped Bloom filter file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        magic, version, self.bits, self.hashes, self.items = _HEADER.unpack_from(self.mm, 0)
+        if magic != _MAGIC or version != _VERSION or len(self.mm) < _HEADER.size + (self.bits + 7) // 8:
+            self.mm.close()
+            raise ValueError(f"Not a valid reputation filter file: {path}")
+
+    def contains_hashed(self, hashed: Tuple[int, int]) -> bool:
+        mm, offset = self.mm, _HEADER.size
+        return all(mm[offset + (pos >> 3)] & (1 << (pos & 7)) for pos in _positions(hashed, self.bits, self.hashes))
+
+    def __contains__(self, item: str) -> bool:
+        return self.contains_hashed(_digest(item))
+
+    def close(self) -> None:
+        self.mm.close()
+
+
+_filters: Dict[str, MappedBloomFilter] = {}
+_recent: Dict[str, Tuple[str, float]] = {} # domain -> (verdict, expires) recorded by this process (also in verdicts.tsv for the next build)
+_last_check = 0.0
+
+
+def _file_signature(path: str) -> Optional[Tuple[int, int, int]]:
+    try:
+        stat = os.stat(path)
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        return None
+
+
+def reload_filters(force: bool = False) -> None:
+    """(Re)maps filter files that appeared or changed on disk; drops ones that were removed."""
+    global _last_check
+    _last_check = time.monotonic()
+    for name in FILTERS:
+        path = os.path.join(REPUTATION_DIR, f"{name}.bloom")
+        signature = _file_signature(path)
+        current = _filters.get(name)
+        if signature is None:
+            if current is not None:
+                _filters.pop(name).close()
+                logger.info(f"Reputation filter '{name}' removed.")
+            continue
+        if current is not None and current.signature == signature and not force:
+            continue
+        try:
+            _filters[name] = MappedBloomFilter(path)
+        except (OSError, ValueError, struct.error) as e:
+            logger.error(f"Could not load reputation filter {path}: {e}") # Keep serving the previous version
+            continue
+        if current is not None:
+            current.close()
+        metrics.set_gauge(f"reputation.{name}.items", _filters[name].items)
+        logger.info(f"Reputation filter '{name}' loaded: {_filters[name].items} items.")
+
+
+def is_shared_domain(domain: str) -> bool:
+    """True for a shared hosting/shortener domain or any host under one (see SHARED_DOMAINS)."""
+    labels = domain.split(".")
+    return any(".".join(labels[i:]) in SHARED_DOMAINS for i in range(len(labels)))
+
+
+def _candidate_domains(host: str) -> List[str]:
+    """
+    host, then each parent domain down to the registered domain (a.b.example.co.uk -> b.example.co.uk
+    -> example.co.uk). The walk stops before a shared domain: nothing at or above it may match.
+    """
+    if host[-1].isdigit() or ":" in host: # Cheap pre-check: TLDs never end in a digit
+        try:
+            ipaddress.ip_address(host)
+            return [host] # IP literals have no parents
+        except ValueError:
+            pass
+    registered = parse_domain(host).registered_domain
+    labels = host.split(".")
+    candidates = []
+    for i in range(len(labels) - registered.count(".")):
+        domain = ".".join(labels[i:])
+        if domain in SHARED_DOMAINS:
+            break
+        candidates.append(domain)
+    return candidates
+
+
+def _recent_verdict(domain: str) -> Optional[str]:
+    entry = _recent.get(domain)
+    if entry is None:
+        return None
+    if entry[1] < time.monotonic():
+        _recent.pop(domain, None)
+        return None
+    return entry[0]
+
+
+def check_url_reputation(url: str) -> Optional[ReputationMatch]:
+    """Local verdict for the URL's host, or None if no filter matches (then ask the scanners)."""
+    if not REPUTATION_ENABLED:
+        return None
+    if time.monotonic() - _last_check > RELOAD_CHECK_SECONDS:
+        reload_filters()
+    host = (urlparse(url).hostname or "").lower().rstrip(".")
+    if not host:
+        return None
+    for domain in _candidate_domains(host):
+        recent = _recent_verdict(domain)
+        if recent is not None:
+            return _match(recent, "recent", domain)
+        hashed = _digest(domain)
+        for name in BLOCK_FILTERS:
+            bloom = _filters.get(name)
+            if bloom is not None and bloom.contains_hashed(hashed):
+                return _match(FILTERS[name], name, domain)
+    allow = _filters.get("allow")
+    exact = host[4:] if host.startswith("www.") else host
+    if allow is not None and exact in allow:
+        return _match(FILTERS["allow"], "allow", exact)
+    metrics.increment("reputation.miss")
+    return None
+
+
+def _match(verdict: str, source: str, domain: str) -> ReputationMatch:
+    metrics.increment(f"reputation.hit.{source}")
+    return ReputationMatch(verdict, source, domain, VERDICT_CONFIDENCE.get(verdict, 0.9))
+
+
+def record_verdict(url: str, verdict: str, confidence: float, agreeing_scanners: int) -> None:
+    """
+    Remembers a confident Phishing/Malicious verdict that at least RECORD_MIN_SCANNERS scanners
+    agree on, for the URL's registered domain (for this process now, and for the next build).
+    URLs on shared domains and allowlisted domains are never recorded.
+    """
+    if (not REPUTATION_ENABLED or verdict not in BLOCK_VERDICTS or confidence < RECORD_MIN_CONFIDENCE
+            or agreeing_scanners < RECORD_MIN_SCANNERS):
+        return
+    host = (urlparse(url).hostname or "").lower().rstrip(".")
+    if not host or is_shared_domain(host):
+        return
+    domain = parse_domain(host).registered_domain
+    allow = _filters.get("allow")
+    if not domain or (allow is not None and domain in allow) or _recent_verdict(domain) == verdict:
+        return
+    _recent[domain] = (verdict, time.monotonic() + RECENT_TTL)
+    try:
+        os.makedirs(REPUTATION_DIR, exist_ok=True)
+        with open(os.path.join(REPUTATION_DIR, VERDICTS_FILE), "a", encoding="utf8") as f:
+            f.write(f"{verdict}\t{domain}\n")
+    except OSError as e:
+        logger.warning(f"Could not record reputation verdict for {domain}: {e}")
+
@@ -0,0 +1,79 @@
+# api/scan_cache.py
+"""
+Cache of raw URL-scanner responses (VirusTotal, IPQS, URLScan).
+
+* Fresh hits are served without calling the scanner (per-scanner TTLs, cache.scanner_ttl_seconds).
+* Negative caching: a None result (404 / no existing scan) is kept for a short TTL, so a
+  burst of requests for an unknown URL does not burn the scanner quota either.
+* Stale-if-error: entries are kept for scanner_stale_ttl_seconds past freshness and served
+  when the scanner is rate limited or its circuit breaker is open.
+
+Entries live in the two-tier cache (process LRU + Redis), so workers share them.
+Background submissions (scan_jobs.py) write their results in via store_scan_result().
+"""
+
+import logging
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+import httpx
+
+from . import metrics
+from .cache_utils import TwoTierCache
+from .circuit_breaker import CircuitOpenException
+from .utils import get_config, RateLimitException
+
+logger = logging.getLogger(__name__)
+CONFIG = get_config()
+CACHE_CONFIG = CONFIG.get('cache', {})
+SCANNER_TTLS = CACHE_CONFIG.get('scanner_ttl_seconds', {}) # Scanner -> fresh TTL for positive results
+DEFAULT_SCANNER_TTL = CACHE_CONFIG.get('default_ttl_seconds', 600)
+NEGATIVE_TTL = CACHE_CONFIG.get('scanner_negative_ttl_seconds', 120) # Fresh TTL for None/404 results
+STALE_TTL = CACHE_CONFIG.get('scanner_stale_ttl_seconds', 86400) # How long past freshness an entry may serve as a fallback
+
+_cache = TwoTierCache("scan", max_entries=CACHE_CONFIG.get('scanner_local_max_entries', 5000))
+
+
+def _fresh_ttl(scanner: str, negative: bool) -> float:
+    return NEGATIVE_TTL if negative else SCANNER_TTLS.get(scanner, DEFAULT_SCANNER_TTL)
+
+
+def scanner_cache_key(scanner: str, sanitized_url: str) -> str:
+    """Cache key for a scanner's result: the sanitized URL, or its domain for URLScan (which searches by domain)."""
+    if scanner == "urlscanio":
+        return httpx.URL(sanitized_url).host or sanitized_url
+    return sanitized_url
+
+
+async def store_scan_result(scanner: str, key: str, data: Optional[Any]) -> None:
+    """Writes a result obtained outside cached_scan() (e.g. after a background submission)."""
+    negative = data is None
+    await _cache.set(f"{scanner}:{key}", {"data": data, "stored_at": time.time(), "negative": negative}, _fresh_ttl(scanner, negative) + STALE_TTL)
+
+
+async def cached_scan(scanner: str, key: str, fetch: Callable[[], Awaitable[Optional[Any]]]) -> Optional[Any]:
+    """
+    Returns the scanner's raw result for `key` (sanitized URL, or domain for URLScan),
+    calling fetch() only when there is no fresh entry. Exceptions from fetch() propagate,
+    except rate limits / open circuits, which are answered from a stale entry when one exists.
+    """
+    cache_key = f"{scanner}:{key}"
+    hit, entry = await _cache.get(cache_key, site=scanner)
+    now = time.time()
+    if hit:
+        age = now - entry["stored_at"]
+        if age < _fresh_ttl(scanner, entry["negative"]):
+            logger.debug(f"Scan cache hit ({scanner}, age {age:.0f}s) for {key}")
+            return entry["data"]
+
+    try:
+        data = await fetch()
+    except (RateLimitException, CircuitOpenException) as e:
+        if hit:
+            metrics.increment(f"cache.scan.{scanner}.stale_served")
+            logger.warning(f"{scanner} unavailable ({type(e).__name__}); serving cached result {now - entry['stored_at']:.0f}s old for {key}")
+            return entry["data"]
+        raise
+
+    await store_scan_result(scanner, key, data)
+    return data
@@ -0,0 +1,266 @@
+# api/scan_jobs.py
+"""
+Background submission queue for URLs the scanners have not seen yet.
+
+A URL lookup only finds *existing* VirusTotal reports / urlscan.io scans, so an unseen URL
+comes back 'no_data' and the verdict stays "Uncertain". Submitting and waiting inline would
+take minutes, so handle_url_analysis() enqueues a job instead and returns its ID.
+
+Two records per job:
+  * submission (shared, one per URL): the actual scanner submissions and their progress
+      queued -> running -> completed (at least one scanner produced a result) / failed
+    Requests for a URL that is already pending join its submission instead of resubmitting.
+  * job (one per request, random unguessable ID): points at the submission and keeps that
+    caller's own input text, which the shared submission never holds.
+
+A worker submits the URL to each scanner that had no data, polls with exponential backoff
+(poll_interval * poll_backoff^n, up to poll_timeout per scanner) and writes the result into
+the scanner cache (scan_cache.store_scan_result). Re-running the analysis afterwards - which
+GET /analyze/url/jobs/{job_id} does once per job, storing the result on the job record for
+later polls (store_job_result) - then gets the upgraded verdict from the cache.
+
+Submissions and polls run at 'background' quota priority, so they never starve user requests.
+Job records live in Redis (readable from any worker) with an in-process fallback; the queue
+itself is per worker.
+"""
+
+import asyncio
+import json
+import logging
+import secrets
+import time
+import weakref
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from . import metrics
+from .cache_utils import get_redis_client, hash_key
+from .scan_cache import scanner_cache_key, store_scan_result
+from .scanner_quota import scan_priority, BACKGROUND
+from .utils import get_config, RateLimitException
+from .vt_utils import check_virustotal, submit_virustotal_url
+from .urlscan_utils import check_urlscan_existing_results, submit_urlscan
+
+logger = logging.getLogger(__name__)
+CONFIG = get_config()
+JOBS_CONFIG = CONFIG.get('scan_jobs', {})
+JOBS_ENABLED = JOBS_CONFIG.get('enabled', True)
+JOB_WORKERS = JOBS_CONFIG.get('workers', 2)
+JOB_QUEUE_SIZE = JOBS_CONFIG.get('queue_size', 200)
+JOB_TTL = JOBS_CONFIG.get('job_ttl_seconds', 3600) # How long job records stay pollable
+POLL_BACKOFF = JOBS_CONFIG.get('poll_backoff', 1.5)
+VT_POLL_INTERVAL = CONFIG.get('virustotal', {}).get('poll_interval', 20)
+VT_POLL_TIMEOUT = CONFIG.get('virustotal', {}).get('poll_timeout', 180)
+URLSCAN_POLL_INTERVAL = CONFIG.get('urlscan', {}).get('poll_interval', 10)
+URLSCAN_POLL_TIMEOUT = CONFIG.get('urlscan', {}).get('poll_timeout', 60)
+
+QUEUED, RUNNING, COMPLETED, FAILED = "queued", "running", "completed", "failed"
+
+_queue: Optional[asyncio.Queue] = None
+_workers: List[asyncio.Task] = []
+_local_records: Dict[str, Dict[str, Any]] = {} # '<kind>:<id>' -> record, used when Redis is unavailable
+_submission_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary() # Submission ID -> lock around its check-then-create (dropped once unused)
+
+
+def _submission_id_for(sanitized_url: str) -> str:
+    """One submission per URL: requests while it is pending share it."""
+    return hash_key("scan_submission", sanitized_url)[:24]
+
+
+async def _save_record(kind: str, record_id: str, record: Dict[str, Any]) -> None:
+    record["updated_at"] = time.time()
+    _local_records[f"{kind}:{record_id}"] = record
+    redis = get_redis_client()
+    if redis is not None:
+        try:
+            await redis.set(f"{kind}:{record_id}", json.dumps(record), ex=JOB_TTL)
+        except Exception as e:
+            logger.warning(f"Could not store {kind} {record_id} in Redis: {e}")
+
+
+async def _load_record(kind: str, record_id: str) -> Optional[Dict[str, Any]]:
+    redis = get_redis_client()
+    if redis is not None:
+        try:
+            raw = await redis.get(f"{kind}:{record_id}")
+            return json.loads(raw) if raw else None
+        except Exception as e:
+            logger.warning(f"Could not read {kind} {record_id} from Redis: {e}")
+    record = _local_records.get(f"{kind}:{record_id}")
+    if record is not None and time.time() - record["updated_at"] > JOB_TTL:
+        _local_records.pop(f"{kind}:{record_id}", None)
+        return None
+    return record
+
+
+async def _save_submission(submission: Dict[str, Any]) -> None:
+    await _save_record("scan_submission", submission["submission_id"], submission)
+
+
+async def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """
+    The job's progress (its submission's status and per-scanner progress) plus the caller's
+    input_text, or None if unknown/expired.
+    """
+    job = await _load_record("scan_job", job_id)
+    if job is None:
+        return None
+    submission = await _load_record("scan_submission", job["submission_id"])
+    if submission is None:
+        return None
+    return {"job_id": job_id, "input_text": job["input_text"], "status": submission["status"],
+            "scanners": submission["scanners"], "created_at": job["created_at"], "updated_at": submission["updated_at"],
+            "result": job.get("result")}
+
+
+async def store_job_result(job_id: str, result: Dict[str, Any]) -> None:
+    """Keeps the re-run analysis of a completed job on its (per-request) record, so later polls reuse it."""
+    job = await _load_record("scan_job", job_id)
+    if job is not None:
+        job["result"] = result
+        await _save_record("scan_job", job_id, job)
+
+
+async def enqueue_scan_job(input_text: str, sanitized_url: str, scanners: List[str]) -> Optional[str]:
+    """
+    Queues submission of `sanitized_url` to `scanners` ('virustotal', 'urlscanio'), joining a
+    pending submission of the same URL if there is one. Returns a new job ID for this caller
+    (random, mapped onto the shared submission), or None if not queued.
+    """
+    scanners = [s for s in scanners if s in _SUBMITTERS]
+    if not JOBS_ENABLED or _queue is None or not scanners:
+        return None
+    submission_id = _submission_id_for(sanitized_url)
+    lock = _submission_locks.get(submission_id)
+    if lock is None:
+        lock = _submission_locks[submission_id] = asyncio.Lock()
+    async with lock: # Concurrent callers for one URL: the first creates the submission, the rest join it
+        existing = await _load_record("scan_submission", submission_id)
+        if not existing or existing["status"] not in (QUEUED, RUNNING):
+            if _queue.full():
+                metrics.increment("scan_jobs.queue_full")
+                logger.warning(f"Scan job queue full; not submitting {sanitized_url[:60]}.")
+                return None
+            # Saved before it is queued: a worker that picks the ID up must find the record
+            submission = {"submission_id": submission_id, "url": sanitized_url, "status": QUEUED,
+                          "scanners": {s: QUEUED for s in scanners}, "created_at": time.time()}
+            await _save_submission(submission)
+            try:
+                _queue.put_nowait(submission_id)
+            except asyncio.QueueFull: # Filled up by other URLs while the record was saved
+                submission.update(status=FAILED, scanners={s: f"{FAILED}: queue full" for s in scanners})
+                await _save_submission(submission)
+                metrics.increment("scan_jobs.queue_full")
+                logger.warning(f"Scan job queue full; not submitting {sanitized_url[:60]}.")
+                return None
+            metrics.increment("scan_jobs.queued")
+            logger.info(f"Queued background scan submission {submission_id} for {sanitized_url[:60]} ({', '.join(scanners)}).")
+        else:
+            metrics.increment("scan_jobs.joined")
+
+    job_id = secrets.token_urlsafe(16)
+    await _save_record("scan_job", job_id, {"job_id": job_id, "submission_id": submission_id,
+                                            "input_text": input_text, "created_at": time.time()})
+    return job_id
+
+
+async def _poll(fetch: Callable[[], Awaitable[Optional[Any]]], interval: float, timeout: float) -> Optional[Any]:
+    """Calls fetch() with exponential backoff until it returns a result or `timeout` passes."""
+    deadline = time.monotonic() + timeout
+    delay = interval
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        await asyncio.sleep(min(delay, remaining))
+        try:
+            data = await fetch()
+        except RateLimitException as e: # Quota busy: try again on the next round
+            logger.debug(f"Poll deferred: {e}")
+            data = None
+        if data is not None:
+            return data
+        delay *= POLL_BACKOFF
+
+
+async def _submit_virustotal(url: str) -> bool:
+    await submit_virustotal_url(url)
+    data = await _poll(lambda: check_virustotal(url), VT_POLL_INTERVAL, VT_POLL_TIMEOUT)
+    if data is not None:
+        await store_scan_result("virustotal", scanner_cache_key("virustotal", url), data)
+    return data is not None
+
+
+async def _submit_urlscan(url: str) -> bool:
+    await submit_urlscan(url)
+    data = await _poll(lambda: check_urlscan_existing_results(url), URLSCAN_POLL_INTERVAL, URLSCAN_POLL_TIMEOUT)
+    if data is not None:
+        await store_scan_result("urlscanio", scanner_cache_key("urlscanio", url), data)
+    return data is not None
+
+
+_SUBMITTERS: Dict[str, Callable[[str], Awaitable[bool]]] = {
+    "virustotal": _submit_virustotal,
+    "urlscanio": _submit_urlscan,
+}
+
+
+async def _run_submission(job: Dict[str, Any]) -> None:
+    job["status"] = RUNNING
+    job["scanners"] = {s: RUNNING for s in job["scanners"]}
+    await _save_submission(job)
+    started = time.monotonic()
+
+    async def run(scanner: str) -> None:
+        try:
+            found = await _SUBMITTERS[scanner](job["url"])
+            job["scanners"][scanner] = COMPLETED if found else "timed_out"
+        except Exception as e:
+            job["scanners"][scanner] = f"{FAILED}: {e}"
+            logger.warning(f"Background {scanner} scan failed for {job['url'][:60]}: {e}")
+        await _save_submission(job) # Progress is visible per scanner
+
+    with scan_priority(BACKGROUND):
+        await asyncio.gather(*(run(s) for s in job["scanners"]))
+
+    job["status"] = COMPLETED if COMPLETED in job["scanners"].values() else FAILED
+    await _save_submission(job)
+    metrics.increment(f"scan_jobs.{job['status']}")
+    metrics.observe("scan_jobs.duration", time.monotonic() - started)
+    logger.info(f"Background scan submission {job['submission_id']} {job['status']}: {job['scanners']}")
+
+
+async def _worker_loop() -> None:
+    while True:
+        submission_id = await _queue.get()
+        try:
+            submission = await _load_record("scan_submission", submission_id)
+            if submission is not None:
+                await _run_submission(submission)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Background scan submission {submission_id} crashed: {e}", exc_info=True)
+        finally:
+            _queue.task_done()
+
+
+def start_scan_jobs() -> None:
+    """Starts the submission workers on the running event loop (idempotent)."""
+    global _queue
+    if not JOBS_ENABLED or _workers:
+        return
+    _queue = asyncio.Queue(maxsize=JOB_QUEUE_SIZE)
+    for i in range(JOB_WORKERS):
+        _workers.append(asyncio.create_task(_worker_loop(), name=f"scan-job-worker-{i}"))
+    logger.info(f"Background scan jobs started ({JOB_WORKERS} workers, queue size {JOB_QUEUE_SIZE}).")
+
+
+async def stop_scan_jobs() -> None:
+    """Cancels the workers; queued and running jobs are abandoned (their records expire)."""
+    global _queue
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+    _queue = None
+    logger.info("Background scan jobs stopped.")
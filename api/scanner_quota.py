@@ -0,0 +1,190 @@
+# api/scanner_quota.py
+"""
+Quota scheduler for the URL scanners (VirusTotal, IPQS, URLScan), shared by all workers.
+
+Each scanner has a per-minute token bucket and a per-day counter, kept in Redis and
+updated atomically by a Lua script, so every uvicorn worker draws on the same quota
+instead of each one bursting through it. Calls take a token right before the HTTP request:
+
+* interactive (default) -> may use the whole quota; waits up to max_defer_seconds for a token.
+* background (re-scans) -> must leave `interactive_reserve` of each bucket untouched, so user
+  requests still get through; may wait longer (background_max_defer_seconds).
+
+Calls that cannot get a token within their wait, or once the day's quota is spent, are not
+sent: they raise RateLimitException (the same outcome as an upstream 429, without spending
+quota). An upstream 429 empties the shared minute bucket so the other workers back off too.
+
+Without Redis the buckets are kept per process (each worker then has the full quota).
+Remaining quota is published as gauges (scanner_quota.<name>.remaining_minute / remaining_day).
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from . import metrics
+from .cache_utils import get_redis_client
+from .utils import get_config, RateLimitException
+
+logger = logging.getLogger(__name__)
+CONFIG = get_config()
+QUOTA_CONFIG = CONFIG.get('scanner_quotas', {})
+QUOTAS_ENABLED = QUOTA_CONFIG.get('enabled', True)
+MAX_DEFER = QUOTA_CONFIG.get('max_defer_seconds', 5) # Interactive calls: longest wait for a token
+BACKGROUND_MAX_DEFER = QUOTA_CONFIG.get('background_max_defer_seconds', 60)
+
+INTERACTIVE, BACKGROUND = "interactive", "background"
+
+_priority: ContextVar[str] = ContextVar("scan_priority", default=INTERACTIVE)
+
+# Token bucket (minute) + counter (day), checked and taken atomically.
+# KEYS: bucket hash, day counter. ARGV: per_minute, per_day (0 = unlimited), reserve fraction.
+# Returns {granted, wait_seconds (-1 = day quota spent), minute level, day remaining}.
+_TAKE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local cap = tonumber(ARGV[1]); local day_cap = tonumber(ARGV[2]); local reserve = tonumber(ARGV[3])
+local rate = cap / 60.0
+local b = redis.call('HMGET', KEYS[1], 'level', 'ts')
+local level = tonumber(b[1]) or cap
+local ts = tonumber(b[2]) or now
+level = math.min(cap, level + math.max(0, now - ts) * rate)
+local used = tonumber(redis.call('GET', KEYS[2]) or '0')
+local granted = 0
+local wait = 0
+if day_cap > 0 and used + 1 > day_cap * (1 - reserve) then
+  wait = -1
+elseif level - 1 < cap * reserve then
+  wait = (cap * reserve + 1 - level) / rate
+else
+  level = level - 1
+  granted = 1
+  if day_cap > 0 then
+    used = redis.call('INCR', KEYS[2])
+    redis.call('EXPIRE', KEYS[2], 90000)
+  end
+end
+redis.call('HSET', KEYS[1], 'level', tostring(level), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], 3600)
+return {granted, tostring(wait), tostring(level), tostring(day_cap - used)}
+"""
+
+_DRAIN_SCRIPT = """
+local t = redis.call('TIME')
+redis.call('HSET', KEYS[1], 'level', '0', 'ts', tostring(tonumber(t[1]) + tonumber(t[2]) / 1000000))
+redis.call('EXPIRE', KEYS[1], 3600)
+return 1
+"""
+
+
+def _settings(name: str) -> Dict[str, Any]:
+    return {**QUOTA_CONFIG.get('default', {}), **QUOTA_CONFIG.get(name, {})}
+
+
+class _LocalQuota:
+    """In-process fallback with the same semantics as _TAKE_SCRIPT."""
+
+    def __init__(self):
+        self.level: Optional[float] = None
+        self.updated = time.monotonic()
+        self.day = ""
+        self.used = 0
+
+    def take(self, cap: float, day_cap: int, reserve: float) -> Tuple[bool, float, float, float]:
+        now = time.monotonic()
+        self.level = cap if self.level is None else min(cap, self.level + (now - self.updated) * cap / 60.0)
+        self.updated = now
+        today = _today()
+        if today != self.day:
+            self.day, self.used = today, 0
+        if day_cap > 0 and self.used + 1 > day_cap * (1 - reserve):
+            return False, -1.0, self.level, day_cap - self.used
+        if self.level - 1 < cap * reserve:
+            return False, (cap * reserve + 1 - self.level) / (cap / 60.0), self.level, day_cap - self.used
+        self.level -= 1; self.used += 1
+        return True, 0.0, self.level, day_cap - self.used
+
+    def drain(self) -> None:
+        self.level = 0.0; self.updated = time.monotonic()
+
+
+_local: Dict[str, _LocalQuota] = {}
+
+
+def _today() -> str:
+    return datetime.now(timezone.utc).strftime("%Y%m%d")
+
+
+@contextmanager
+def scan_priority(priority: str):
+    """Runs scanner calls made inside the block (in this task) at `priority`."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+async def _take(name: str, cap: float, day_cap: int, reserve: float) -> Tuple[bool, float, float, float]:
+    redis = get_redis_client()
+    if redis is not None:
+        try:
+            granted, wait, level, day_left = await redis.eval(
+                _TAKE_SCRIPT, 2, f"quota:{name}:minute", f"quota:{name}:day:{_today()}", cap, day_cap, reserve)
+            return bool(int(granted)), float(wait), float(level), float(day_left)
+        except Exception as e:
+            metrics.increment(f"scanner_quota.{name}.redis_error")
+            logger.warning(f"Shared quota for '{name}' unavailable ({e}); using this worker's local bucket.")
+    return _local.setdefault(name, _LocalQuota()).take(cap, day_cap, reserve)
+
+
+async def acquire_scan_quota(name: str) -> None:
+    """
+    Takes one request from the scanner's shared quota, waiting (deferring) if a token frees up
+    within the priority's wait limit. Raises RateLimitException when the call should be skipped.
+    """
+    settings = _settings(name)
+    cap = float(settings.get('per_minute', 0))
+    if not QUOTAS_ENABLED or cap <= 0:
+        return
+    day_cap = int(settings.get('per_day', 0))
+    priority = _priority.get()
+    reserve = float(settings.get('interactive_reserve', 0.2)) if priority == BACKGROUND else 0.0
+    deadline = time.monotonic() + (BACKGROUND_MAX_DEFER if priority == BACKGROUND else MAX_DEFER)
+    deferred = False
+
+    while True:
+        granted, wait, level, day_left = await _take(name, cap, day_cap, reserve)
+        metrics.set_gauge(f"scanner_quota.{name}.remaining_minute", round(max(0.0, level), 2))
+        if day_cap > 0:
+            metrics.set_gauge(f"scanner_quota.{name}.remaining_day", max(0.0, day_left))
+        if granted:
+            metrics.increment(f"scanner_quota.{name}.granted.{priority}")
+            return
+        if wait < 0:
+            metrics.increment(f"scanner_quota.{name}.skipped.{priority}")
+            raise RateLimitException(f"{name} daily quota used up ({day_cap}/day); request not sent.")
+        if time.monotonic() + wait > deadline:
+            metrics.increment(f"scanner_quota.{name}.skipped.{priority}")
+            raise RateLimitException(f"{name} quota exhausted (next request slot in {wait:.0f}s); request not sent.")
+        if not deferred:
+            metrics.increment(f"scanner_quota.{name}.deferred.{priority}")
+            logger.info(f"{name} quota exhausted; deferring {priority} request by {wait:.1f}s.")
+            deferred = True
+        await asyncio.sleep(wait + 0.05) # Small margin: the token has refilled when we retry
+
+
+async def drain_scan_quota(name: str) -> None:
+    """Called on an upstream 429: empties the shared minute bucket so no worker sends more right away."""
+    _local.setdefault(name, _LocalQuota()).drain()
+    redis = get_redis_client()
+    if redis is not None:
+        try:
+            await redis.eval(_DRAIN_SCRIPT, 1, f"quota:{name}:minute")
+        except Exception as e:
+            logger.warning(f"Could not drain shared quota for '{name}': {e}")
+    metrics.set_gauge(f"scanner_quota.{name}.remaining_minute", 0.0)
@@ -7,6 +7,9 @@ import os
 import asyncio
 
 from .utils import get_config, RateLimitException, ApiException
+from .singleflight import singleflight
+from .circuit_breaker import circuit_breaker
+from .http_clients import shared_client
 
 load_dotenv()
 CONFIG = get_config()
@@ -22,6 +25,8 @@ BASE_API_URL = "https://www.searchapi.io/api/v1/search"
 
 logger = logging.getLogger(__name__)
 
+@singleflight("search")
+@circuit_breaker("search")
 async def perform_search(query: str) -> Optional[List[Dict[str, str]]]:
     """
     Performs a web search using the configured Search API provider.
@@ -47,10 +52,10 @@ async def perform_search(query: str) -> Optional[List[Dict[str, str]]]:
         'num': str(RESULTS_COUNT) # API might expect string count
     }
 
-    async with httpx.AsyncClient(timeout=TIMEOUT) as client:
+    async with shared_client("search") as client:
         try:
             logger.debug(f"Performing web search via SearchApi.io for: {query}")
-            response = await client.get(BASE_API_URL, params=params)
+            response = await client.get(BASE_API_URL, params=params, timeout=TIMEOUT)
 
             # Check for rate limits (adjust based on provider's response)
             if response.status_code == 429: # Common rate limit code
@@ -69,16 +74,17 @@ async def perform_search(query: str) -> Optional[List[Dict[str, str]]]:
             logger.debug(f"Search for '{query}' yielded {len(results)} results.")
             return results
 
+        # Transport failures raise so the circuit breaker sees the upstream is unreachable
         except httpx.TimeoutException:
             logger.warning(f"Search API request timed out for query: {query}")
-            return None
+            raise ApiException(f"Search API request timed out ({TIMEOUT}s).", upstream_failure=True)
         except httpx.RequestError as req_err:
             logger.error(f"Network error querying Search API for '{query}': {req_err}")
-            return None
+            raise ApiException(f"Network error contacting Search API: {req_err}", upstream_failure=True)
         except httpx.HTTPStatusError as status_err:
             logger.error(f"Search API error for '{query}': Status {status_err.response.status_code}, Body: {status_err.response.text}")
             if status_err.response.status_code != 429:
-                 raise ApiException(f"Search API error {status_err.response.status_code}")
+                 raise ApiException(f"Search API error {status_err.response.status_code}", status_code=status_err.response.status_code)
             return None
         except Exception as e:
             logger.error(f"Unexpected error during web search for '{query}': {e}", exc_info=True)
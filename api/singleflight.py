@@ -0,0 +1,88 @@
+# api/singleflight.py
+"""
+Request coalescing ("singleflight") for upstream calls.
+
+Concurrent calls with identical arguments share one in-flight task: the first caller
+(the leader) starts it, later callers wait on the same result. Once it finishes the key
+is released, so this never serves stale data - it only collapses bursts (e.g. a viral
+claim submitted many times within seconds). Pair it with a cache for reuse over time.
+
+Shared results are the same object for every caller and must be treated as read-only.
+"""
+
+import asyncio
+import logging
+from functools import wraps
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
+
+from . import metrics
+from .cache_utils import hash_key
+from .utils import get_config
+
+logger = logging.getLogger(__name__)
+CONFIG = get_config()
+SINGLEFLIGHT_ENABLED = CONFIG.get('singleflight', {}).get('enabled', True)
+
+_groups: Dict[str, "SingleFlight"] = {} # Name -> group, for stats
+
+
+class SingleFlight:
+    """One coalescing group (one upstream function). Metrics live under 'singleflight.<name>.*'."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+        self._waiters: Dict[Hashable, int] = {} # Key -> callers sharing the in-flight task (leader excluded)
+        _groups[name] = self
+
+    async def do(self, key: Hashable, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """Runs func(*args, **kwargs) unless a call with the same key is already in flight."""
+        task = self._tasks.get(key)
+        if task is None:
+            # Run as a task so a cancelled leader (client disconnect) does not fail the waiters
+            task = asyncio.ensure_future(func(*args, **kwargs))
+            self._tasks[key] = task; self._waiters[key] = 0
+            task.add_done_callback(lambda t, k=key: self._finish(k, t))
+            metrics.increment(f"singleflight.{self.name}.leader")
+        else:
+            self._waiters[key] += 1
+            metrics.increment(f"singleflight.{self.name}.shared")
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Task) -> None:
+        self._tasks.pop(key, None)
+        waiters = self._waiters.pop(key, 0)
+        metrics.observe(f"singleflight.{self.name}.waiters", waiters)
+        if waiters:
+            logger.debug(f"Singleflight '{self.name}' served {waiters} extra caller(s) from one call.")
+        if not task.cancelled():
+            task.exception() # Mark retrieved - every caller may have been cancelled already
+
+    def inflight(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Busiest in-flight keys with their current waiter counts."""
+        busiest = sorted(self._waiters.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [{"key": str(key)[:16], "waiters": count} for key, count in busiest]
+
+
+def singleflight(name: str, key_func: Optional[Callable[..., Hashable]] = None):
+    """
+    Decorator coalescing concurrent identical calls of an async function.
+    The key defaults to a hash of all arguments; pass key_func to use a subset.
+    """
+    group = SingleFlight(name)
+
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            if not SINGLEFLIGHT_ENABLED:
+                return await func(*args, **kwargs)
+            key = key_func(*args, **kwargs) if key_func else hash_key(args, sorted(kwargs.items()))
+            return await group.do(key, func, *args, **kwargs)
+        wrapper.singleflight_group = group
+        return wrapper
+    return decorator
+
+
+def get_singleflight_stats() -> Dict[str, Any]:
+    """In-flight keys and waiter counts per group (for /metrics)."""
+    return {name: {"inflight": len(group._tasks), "busiest": group.inflight()} for name, group in _groups.items()}
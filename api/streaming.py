@@ -0,0 +1,79 @@
+# api/streaming.py
+"""
+Helpers for streaming analysis output to clients as server-sent events (SSE).
+
+* format_sse(): one SSE frame.
+* JsonFieldStreamer: turns streamed LLM output into user-readable text as it arrives.
+  Plain-text completions pass straight through; for JSON completions (the misinfo
+  prompts answer in ```json ... ```) only the string values of the narrative keys
+  (e.g. "explanation") are decoded and emitted, so clients never see raw JSON.
+"""
+
+import json
+import re
+from typing import Any, Iterable
+
+_JSON_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+
+def format_sse(event: str, data: Any) -> str:
+    """One SSE frame; data is JSON-encoded (single line, so no multi-line 'data:' handling needed)."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+class JsonFieldStreamer:
+    """Incremental extractor for selected JSON string fields; passes non-JSON output through unchanged."""
+
+    def __init__(self, fields: Iterable[str]):
+        self._key_re = re.compile(r'"(?:%s)"\s*:\s*"' % "|".join(re.escape(f) for f in fields))
+        self._buffer = ""
+        self._mode = None # None until the first non-whitespace character: "text" or "json"
+        self._pos = 0 # JSON mode: next unread buffer position
+        self._in_value = False
+        self._fields_seen = 0
+
+    def feed(self, chunk: str) -> str:
+        """Adds a chunk of model output; returns the newly readable text (possibly empty)."""
+        self._buffer += chunk
+        if self._mode is None:
+            head = self._buffer.lstrip()
+            if not head:
+                return ""
+            self._mode = "json" if head[0] in "{`" else "text"
+            if self._mode == "text":
+                return self._buffer
+        if self._mode == "text":
+            return chunk
+        return self._scan()
+
+    def _scan(self) -> str:
+        out, buf = [], self._buffer
+        while True:
+            if not self._in_value:
+                match = self._key_re.search(buf, self._pos)
+                if match is None:
+                    return "".join(out) # Key may still be incomplete; rescan from _pos next time
+                self._pos = match.end(); self._in_value = True
+                if self._fields_seen: out.append("\n\n") # Separate consecutive fields
+                self._fields_seen += 1
+            i = self._pos
+            while i < len(buf):
+                char = buf[i]
+                if char == '\\':
+                    if i + 1 >= len(buf) or (buf[i + 1] == 'u' and i + 6 > len(buf)):
+                        break # Escape split across chunks - wait for the rest
+                    escape = buf[i + 1]
+                    if escape == 'u':
+                        try: out.append(chr(int(buf[i + 2:i + 6], 16)))
+                        except ValueError: pass
+                        i += 6
+                    else:
+                        out.append(_JSON_ESCAPES.get(escape, escape)); i += 2
+                    continue
+                if char == '"':
+                    self._in_value = False; i += 1
+                    break
+                out.append(char); i += 1
+            self._pos = i
+            if self._in_value:
+                return "".join(out)
@@ -4,11 +4,16 @@ from typing import Optional, Dict, Any
 import httpx
 from dotenv import load_dotenv
 import os
+import time
 import json # <-- Ensure imported for parsing safety
 
 # --- Custom Exception Imports ---
 try:
     from .utils import get_config, RateLimitException, ApiException
+    from .singleflight import singleflight
+    from .circuit_breaker import circuit_breaker
+    from .http_clients import shared_client
+    from .scanner_quota import acquire_scan_quota, drain_scan_quota
 except ImportError:
     print("Warning: Running urlscan_utils possibly standalone.")
     from utils import get_config, RateLimitException, ApiException # type: ignore
@@ -19,17 +24,21 @@ CONFIG = get_config()
 URLSCAN_CONFIG = CONFIG.get('urlscan', {}) # Use .get()
 API_KEY = os.getenv("URLSCAN_API_KEY")
 SEARCH_API_URL = URLSCAN_CONFIG.get('search_api_url', "https://urlscan.io/api/v1/search/")
+SUBMIT_API_URL = URLSCAN_CONFIG.get('submit_api_url', "https://urlscan.io/api/v1/scan/")
+SUBMIT_VISIBILITY = URLSCAN_CONFIG.get('submit_visibility', "unlisted") # public / unlisted / private
 TIMEOUT = URLSCAN_CONFIG.get('request_timeout', 25)
 logger = logging.getLogger(__name__)
 
 # --- Main Check Function ---
+@singleflight("urlscan")
+@circuit_breaker("urlscan")
 async def check_urlscan_existing_results(url: str) -> Optional[Dict[str, Any]]:
     """
     Searches urlscan.io for existing results based on the domain of the URL.
 
-    Returns: Raw result object from urlscan API on success (latest result), None if no results found,
-             or on timeout/network errors.
-    Raises: RateLimitException, ApiException on specific API errors.
+    Returns: Raw result object from urlscan API on success (latest result), None if no results found.
+    Raises: RateLimitException, ApiException on specific API errors, timeouts and network errors
+            (CircuitOpenException while urlscan.io is known to be down).
     """
     if not url:
          logger.warning("URLScan check called with empty URL.")
@@ -50,17 +59,19 @@ async def check_urlscan_existing_results(url: str) -> Optional[Dict[str, Any]]:
     query = f"domain:{domain}"
     params = {'q': query, 'size': '1'} # Get only the latest result by default
 
-    async with httpx.AsyncClient(timeout=TIMEOUT, headers=headers) as client:
+    await acquire_scan_quota("urlscan") # Shared per-minute/day quota; raises RateLimitException instead of sending
+    async with shared_client("urlscan") as client:
         request_start_time = time.monotonic()
         logger.debug(f"Sending request to URLScan Search: Query='{query}'")
         try:
-            response = await client.get(SEARCH_API_URL, params=params)
+            response = await client.get(SEARCH_API_URL, params=params, headers=headers, timeout=TIMEOUT)
             request_duration = time.monotonic() - request_start_time
             logger.debug(f"URLScan response received in {request_duration:.3f}s. Status: {response.status_code}")
 
             # --- Error Checks ---
             if response.status_code == 429:
                 logger.warning(f"URLScan rate limit (429) for query '{query}'.")
+                await drain_scan_quota("urlscan")
                 raise RateLimitException("URLScan API rate limit reached.")
             if response.status_code == 400: # Often bad query syntax
                 try: detail=response.json()
@@ -72,7 +83,7 @@ async def check_urlscan_existing_results(url: str) -> Optional[Dict[str, Any]]:
                 raise ApiException("URLScan API Key invalid or required for search.")
             if response.status_code >= 500: # Server errors
                 logger.error(f"URLScan server error ({response.status_code}) for query '{query}'. Response: {response.text}")
-                raise ApiException(f"URLScan server error {response.status_code}.")
+                raise ApiException(f"URLScan server error {response.status_code}.", status_code=response.status_code)
             # Check other specific codes if necessary
             response.raise_for_status() # Catch any remaining 4xx not explicitly handled
             # --- End Error Checks ---
@@ -95,12 +106,13 @@ async def check_urlscan_existing_results(url: str) -> Optional[Dict[str, Any]]:
                 logger.warning(f"Unexpected response structure from URLScan search for '{query}'. Data: {str(data)[:200]}")
                 return None # Return None if structure is wrong
 
+        # Transport failures raise (like vt_utils) so the circuit breaker sees the upstream is unreachable
         except httpx.TimeoutException:
             logger.warning(f"URLScan search request timed out for query: '{query}'")
-            return None
+            raise ApiException(f"URLScan search timed out ({TIMEOUT}s).", upstream_failure=True)
         except httpx.RequestError as req_err:
             logger.error(f"Network error contacting URLScan search for '{query}': {req_err}")
-            return None
+            raise ApiException(f"Network error contacting URLScan: {req_err}", upstream_failure=True)
         except json.JSONDecodeError as json_err:
              logger.error(f"URLScan returned non-JSON response ({response.status_code}). Body: '{response.text[:200]}...'. Error: {json_err}")
              return None
@@ -113,6 +125,48 @@ async def check_urlscan_existing_results(url: str) -> Optional[Dict[str, Any]]:
             raise ApiException(f"Unexpected error during URLScan search: {e}") from e
 
 
+@circuit_breaker("urlscan")
+async def submit_urlscan(url: str) -> Optional[str]:
+    """
+    Submits a URL for a new urlscan.io scan (used by the background scan queue, see scan_jobs.py).
+    The result shows up in check_urlscan_existing_results() once the scan finishes.
+
+    Returns: The scan UUID, or None if urlscan.io did not return one.
+    Raises: RateLimitException, ApiException (submission needs an API key), ValueError if the URL is refused.
+    """
+    if not API_KEY:
+        raise ApiException("URLScan API Key not configured (required for submissions).")
+    headers = {'Content-Type': 'application/json', 'API-Key': API_KEY}
+    payload = {"url": url, "visibility": SUBMIT_VISIBILITY}
+
+    await acquire_scan_quota("urlscan_submit") # Submissions have their own quota
+    async with shared_client("urlscan") as client:
+        try:
+            response = await client.post(SUBMIT_API_URL, json=payload, headers=headers, timeout=TIMEOUT)
+        except httpx.TimeoutException:
+            raise ApiException(f"URLScan submission timed out ({TIMEOUT}s).", upstream_failure=True)
+        except httpx.RequestError as req_err:
+            raise ApiException(f"Network error submitting to URLScan: {req_err}", upstream_failure=True)
+
+    if response.status_code == 429:
+        logger.warning(f"URLScan submission rate limit (429) for {url[:60]}.")
+        await drain_scan_quota("urlscan_submit")
+        raise RateLimitException("URLScan submission rate limit reached.")
+    if response.status_code >= 400:
+        try: detail = response.json().get("message", response.text)
+        except Exception: detail = response.text
+        logger.warning(f"URLScan submission failed ({response.status_code}) for {url[:60]}: {detail}")
+        if response.status_code == 400: # URL/domain urlscan.io refuses to scan - not an outage
+            raise ValueError(f"URLScan refused the submission: {detail}")
+        raise ApiException(f"URLScan submission error {response.status_code}: {detail}", status_code=response.status_code)
+    try:
+        scan_id = response.json().get("uuid")
+    except json.JSONDecodeError:
+        scan_id = None
+    logger.info(f"Submitted URL to urlscan.io (scan {scan_id}): {url[:60]}...")
+    return scan_id
+
+
 def parse_urlscan_result(scan_data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
     """
     Parses the raw urlscan.io *search result item* object.
@@ -3,17 +3,31 @@ import logging.config
 import yaml
 import os
 import re
+from typing import List, NamedTuple, Optional, Tuple
 from urllib.parse import urlparse, urlunparse
 import httpx # Keep for URL pinging etc.
 
+try:
+    import tldextract # Full Public Suffix List; the bundled snapshot is used (no network fetch)
+    _TLD_EXTRACT = tldextract.TLDExtract(suffix_list_urls=())
+except ImportError:
+    _TLD_EXTRACT = None
+
 # --- Custom Exceptions ---
 class RateLimitException(Exception):
     """Custom exception for downstream API rate limits."""
     pass
 
 class ApiException(Exception):
-    """Custom exception for general downstream API errors."""
-    pass
+    """
+    Custom exception for general downstream API errors.
+    `upstream_failure` marks errors showing the upstream itself is unhealthy (timeouts, transport
+    errors, 5xx - the default when status_code >= 500); only those trip circuit breakers.
+    """
+    def __init__(self, *args, status_code: Optional[int] = None, upstream_failure: Optional[bool] = None):
+        super().__init__(*args)
+        self.status_code = status_code
+        self.upstream_failure = upstream_failure if upstream_failure is not None else (status_code or 0) >= 500
 
 
 # --- Config Loading ---
@@ -164,6 +178,137 @@ def sanitize_url_for_scan(url: str) -> str:
           return url # Return original on error
 
 
+# --- URL Extraction ---
+# Patterns are compiled once. Scheme URLs may use any host (incl. localhost / IPv4); bare
+# domains ("paypa1-login.com/verify") must end in a known public suffix to count as URLs.
+_URL_WITH_SCHEME_RE = re.compile(
+    r'\b(https?://(?:(?:[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?\.)+[a-z]{2,24}|localhost|\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})(?::\d+)?(?:[/?#]\S*)?)',
+    re.IGNORECASE)
+_BARE_DOMAIN_RE = re.compile(
+    r'(?<![\w@/.:-])((?:[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?\.)+[a-z]{2,24})((?::\d+)?(?:/\S*)?)',
+    re.IGNORECASE)
+_TRAILING_PUNCTUATION = ".,;:!?)]}'\"»”’>"
+MAX_URL_LENGTH = 500
+
+# Fallback public suffixes when tldextract is not installed: common TLDs, multi-label country
+# suffixes and the hosting suffixes (PSL private section) phishing pages are often served from.
+_KNOWN_TLDS = frozenset("""
+    com org net gov edu mil int info biz name pro xyz top site online app dev io co ai me us uk de ca au fr it nl es
+    be ch at se no dk fi pl cz ru ua cn jp kr in br mx ar cl za ng ke eu tv cc ly to ws pw tk ml ga cf gq link click
+    shop store live club icu vip buzz rest cam work support help page email finance bank money loan
+""".split())
+_MULTI_LABEL_SUFFIXES = frozenset("""
+    co.uk org.uk ac.uk gov.uk me.uk com.au net.au org.au co.nz co.jp co.in co.kr co.za com.br com.cn com.mx
+    com.ar com.tr com.sg com.hk com.tw com.ng com.pk com.my co.id
+    github.io gitlab.io blogspot.com herokuapp.com netlify.app vercel.app web.app firebaseapp.com pages.dev
+    workers.dev azurewebsites.net appspot.com wixsite.com weebly.com glitch.me ngrok.io ngrok-free.app
+    000webhostapp.com repl.co r2.dev s3.amazonaws.com
+""".split())
+# ccTLDs that are far more often file extensions: a bare "main.py" / "notes.sh" without a path is a file name
+_FILE_EXTENSION_SUFFIXES = frozenset("py md sh js ts rs rb pm ps so gz hs".split())
+
+
+class DomainParts(NamedTuple):
+    subdomain: str # "login.secure" in login.secure.example.co.uk
+    domain: str # "example"
+    suffix: str # "co.uk" ("" if not a known public suffix, e.g. IPs or localhost)
+
+    @property
+    def registered_domain(self) -> str:
+        """example.co.uk - the part an owner registers (the whole host when there is no known suffix)."""
+        return f"{self.domain}.{self.suffix}" if self.suffix and self.domain else self.domain
+
+
+def parse_domain(host: str) -> DomainParts:
+    """Splits a host name at its public suffix (tldextract's PSL when installed, else a built-in subset)."""
+    host = (host or "").lower().strip().rstrip(".")
+    if _TLD_EXTRACT is not None:
+        parts = _TLD_EXTRACT(host)
+        return DomainParts(parts.subdomain, parts.domain, parts.suffix)
+    labels = host.split(".")
+    if len(labels) < 2 or labels[-1].isdigit():
+        return DomainParts("", host, "")
+    for size in (3, 2):
+        suffix = ".".join(labels[-size:])
+        if len(labels) > size and suffix in _MULTI_LABEL_SUFFIXES:
+            break
+    else:
+        size, suffix = 1, labels[-1]
+        if suffix not in _KNOWN_TLDS:
+            return DomainParts("", host, "")
+    return DomainParts(".".join(labels[:-size - 1]), labels[-size - 1], suffix)
+
+
+class ExtractedUrl(NamedTuple):
+    original: str # As written in the text
+    url: str # With scheme (https:// assumed for bare domains)
+    sanitized: str # sanitize_url_for_scan() form - what scanners see
+    registered_domain: str
+    start: int # Span of `original` in the text
+    end: int
+
+
+def _strip_trailing(candidate: str) -> str:
+    """Drops sentence punctuation glued to a URL ('see evil.com/login.' / '(https://x.io/a)')."""
+    while candidate and candidate[-1] in _TRAILING_PUNCTUATION:
+        if candidate[-1] == ")" and candidate.count("(") >= candidate.count(")"): # Balanced: part of the URL
+            break
+        candidate = candidate[:-1]
+    return candidate
+
+
+def _dedup_key(sanitized: str) -> str:
+    """Scheme and host are case-insensitive and an empty path is the root: EVIL.com/login == evil.com/login, a.com == a.com/."""
+    parsed = urlparse(sanitized)
+    return urlunparse(parsed._replace(scheme=parsed.scheme.lower(), netloc=parsed.netloc.lower(), path=parsed.path or "/"))
+
+
+def extract_urls(text: str, max_urls: Optional[int] = None) -> List[ExtractedUrl]:
+    """
+    The first `max_urls` URLs in `text` (all by default) in order of appearance, deduplicated
+    (case-insensitive scheme/host, "" == "/" root path; the first occurrence is kept).
+    Finds scheme URLs and bare domains with a known public suffix (emails are not URLs).
+    """
+    if not text:
+        return []
+    candidates: List[Tuple[int, str, str]] = [] # (start, original, url with scheme)
+    taken: List[range] = [] # Spans of scheme URLs, so bare-domain matches inside them are skipped
+
+    for match in _URL_WITH_SCHEME_RE.finditer(text):
+        original = _strip_trailing(match.group(1))
+        taken.append(range(match.start(1), match.start(1) + len(original)))
+        candidates.append((match.start(1), original, original))
+    for match in _BARE_DOMAIN_RE.finditer(text):
+        if any(match.start(1) in span for span in taken):
+            continue
+        suffix = parse_domain(match.group(1)).suffix
+        if not suffix:
+            continue # "e.g", "file.txt", "v1.2" - not a known public suffix
+        if suffix in _FILE_EXTENSION_SUFFIXES and not match.group(2):
+            continue # "main.py", "readme.md" - a file name, not a link
+        original = _strip_trailing(match.group(1) + match.group(2))
+        candidates.append((match.start(1), original, "https://" + original))
+    candidates.sort(key=lambda c: c[0]) # Dedup and the cap follow text order, whichever pattern found the URL
+
+    found: List[ExtractedUrl] = []
+    seen = set()
+    for start, original, url in candidates:
+        if max_urls is not None and len(found) >= max_urls:
+            break
+        if len(url) > MAX_URL_LENGTH:
+            continue
+        sanitized = sanitize_url_for_scan(url)
+        if not sanitized or not is_valid_url(sanitized):
+            continue
+        key = _dedup_key(sanitized)
+        if key in seen:
+            continue
+        seen.add(key)
+        host = urlparse(sanitized).hostname or ""
+        found.append(ExtractedUrl(original, url, sanitized, parse_domain(host).registered_domain, start, start + len(original)))
+    return found
+
+
 # Example ping_url if needed elsewhere (often not needed if scanners are used)
 async def ping_url(url: str, timeout: int = 5) -> bool:
      """Checks if a URL is reachable with a HEAD request."""
@@ -12,6 +12,10 @@ from dotenv import load_dotenv
 # --- Custom Exception Imports ---
 try:
     from .utils import get_config, RateLimitException, ApiException, sanitize_url_for_scan
+    from .singleflight import singleflight
+    from .circuit_breaker import circuit_breaker
+    from .http_clients import shared_client
+    from .scanner_quota import acquire_scan_quota, drain_scan_quota
 except ImportError:
     print("Warning: Running vt_utils possibly standalone. Trying relative path for utils.")
     from utils import get_config, RateLimitException, ApiException, sanitize_url_for_scan # type: ignore
@@ -39,17 +43,18 @@ async def _make_vt_request(method: str, endpoint_url: str, headers: Dict[str, st
     Makes an async request to a VirusTotal endpoint and handles common errors.
     Raises RateLimitException or ApiException on relevant errors.
     """
-    # Note: Using temporary clients here for simplicity, but a shared client is also possible.
-    async with httpx.AsyncClient(timeout=REQUEST_TIMEOUT + 5, headers=headers) as client:
+    await acquire_scan_quota("virustotal") # Shared per-minute/day quota; raises RateLimitException instead of sending
+    # Shared pooled client (see http_clients.py); headers and timeout are per request
+    async with shared_client("virustotal") as client:
         request_start_time = time.monotonic()
         logger.debug(f"Sending {method} request to VirusTotal: {endpoint_url}")
         response = None
         try:
             if method.upper() == 'GET':
-                response = await client.get(endpoint_url, params=params)
+                response = await client.get(endpoint_url, params=params, headers=headers, timeout=REQUEST_TIMEOUT + 5)
             elif method.upper() == 'POST':
                 # VT POST /urls expects x-www-form-urlencoded *data*, not JSON
-                response = await client.post(endpoint_url, data=data, json=json_payload)
+                response = await client.post(endpoint_url, data=data, json=json_payload, headers=headers, timeout=REQUEST_TIMEOUT + 5)
             else:
                 raise ValueError(f"Unsupported HTTP method for VT: {method}")
 
@@ -59,6 +64,7 @@ async def _make_vt_request(method: str, endpoint_url: str, headers: Dict[str, st
             # --- Specific Error Checks ---
             if response.status_code == 429:
                 logger.warning(f"VirusTotal rate limit hit (Status 429) for {endpoint_url}")
+                await drain_scan_quota("virustotal")
                 raise RateLimitException("VirusTotal API rate limit exceeded.")
             if response.status_code == 401: # Unauthorized
                 logger.error("VirusTotal API Unauthorized (Status 401). Check API Key.")
@@ -70,7 +76,7 @@ async def _make_vt_request(method: str, endpoint_url: str, headers: Dict[str, st
                 except Exception: error_details = response.text
                 error_message += f": {error_details}"
                 logger.error(error_message)
-                raise ApiException(error_message)
+                raise ApiException(error_message, status_code=response.status_code)
             # --- End Error Checks ---
 
             return response # Return successful response object
@@ -78,13 +84,15 @@ async def _make_vt_request(method: str, endpoint_url: str, headers: Dict[str, st
         # Handle client-side/network errors separately
         except httpx.TimeoutException:
             logger.warning(f"VirusTotal request timed out for {endpoint_url}")
-            raise ApiException(f"VirusTotal request timed out ({REQUEST_TIMEOUT}s).")
+            raise ApiException(f"VirusTotal request timed out ({REQUEST_TIMEOUT}s).", upstream_failure=True)
         except httpx.RequestError as req_err:
             logger.error(f"Network error contacting VirusTotal for {endpoint_url}: {req_err}")
-            raise ApiException(f"Network error contacting VirusTotal: {req_err}")
+            raise ApiException(f"Network error contacting VirusTotal: {req_err}", upstream_failure=True)
 
 
 # --- Main Function to Check URL ---
+@singleflight("virustotal")
+@circuit_breaker("virustotal")
 async def check_virustotal(url: str) -> Optional[dict]:
     """
     Checks a URL against VirusTotal API v3. Gets report ONLY. Does NOT submit or poll.
@@ -165,6 +173,27 @@ async def check_virustotal(url: str) -> Optional[dict]:
     # return None
 
 
+@circuit_breaker("virustotal")
+async def submit_virustotal_url(url: str) -> Optional[str]:
+    """
+    Submits a URL to VirusTotal for analysis (used by the background scan queue, see scan_jobs.py).
+    The report becomes available to check_virustotal() once the analysis completes.
+
+    Returns: The analysis ID, or None if VT did not return one.
+    Raises: RateLimitException, ApiException (as _make_vt_request).
+    """
+    if not API_KEY:
+        raise ApiException("VirusTotal API Key not configured.")
+    headers = {"x-apikey": API_KEY, "Accept": "application/json"}
+    logger.info(f"Submitting URL to VirusTotal for analysis: {url[:60]}...")
+    response = await _make_vt_request('POST', URLS_ENDPOINT_BASE, headers=headers, data={"url": url})
+    try:
+        return response.json().get("data", {}).get("id")
+    except Exception as e:
+        logger.warning(f"Could not read VirusTotal submission response for {url[:60]}: {e}")
+        return None
+
+
 def parse_vt_result(vt_data: Optional[Dict]) -> Dict[str, Any]:
     """
     Parses the raw VirusTotal data object (expects the 'data' part of the full response).
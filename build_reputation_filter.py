@@ -0,0 +1,120 @@
+"""
+Builds the memory-mapped Bloom filters used by api/reputation_filter.py.
+
+Input files hold one domain or URL per line ('#' comments allowed; for CSV lists such as
+Tranco's 'rank,domain' the last field is used). Our own recorded verdicts
+(<directory>/verdicts.tsv) are added to the phishing/malware filters being rebuilt unless --no-verdicts.
+Shared hosting/shortener domains and allowlisted domains are never put into a block filter: public
+feeds list open-redirect hosts such as www.google.com/url?..., and a block hit is served before
+the allowlist is checked. The allowlist is --allow if given, else the existing allow.bloom.
+Only filters whose lists are given are rebuilt.
+Running API workers pick up the new files within reputation_filter.reload_check_seconds.
+
+Usage:
+    python build_reputation_filter.py --allow lists/tranco_top100k.csv --phishing lists/openphish.txt
+    python build_reputation_filter.py --malware lists/urlhaus_domains.txt --fp-rate 1e-7
+"""
+import argparse
+import logging
+import os
+import sys
+from typing import Callable, Dict, Iterable, List, Set
+from urllib.parse import urlparse
+
+try:
+    from api.reputation_filter import (
+        build_bloom, is_shared_domain, MappedBloomFilter, BLOCK_FILTERS, BLOCK_VERDICTS, DEFAULT_FALSE_POSITIVE_RATE,
+        REPUTATION_DIR, VERDICTS_FILE
+    )
+    from api.utils import setup_logging
+except ImportError as e:
+    print(f"Error importing API modules: {e}. Run from the project root.")
+    sys.exit(1)
+
+setup_logging()
+logger = logging.getLogger("build_reputation_filter")
+
+
+def _normalize(entry: str, strip_www: bool) -> str:
+    entry = entry.strip().split(",")[-1].strip().lower()
+    if "://" in entry:
+        entry = urlparse(entry).hostname or ""
+    entry = entry.split("/")[0].rstrip(".")
+    if strip_www and entry.startswith("www."):
+        entry = entry[4:]
+    return entry
+
+
+def read_domains(paths: Iterable[str], strip_www: bool = False) -> Set[str]:
+    domains: Set[str] = set()
+    for path in paths:
+        with open(path, encoding="utf8", errors="replace") as f:
+            for line in f:
+                if line.strip() and not line.lstrip().startswith("#"):
+                    domain = _normalize(line, strip_www)
+                    if domain: domains.add(domain)
+        logger.info(f"Read {path}: {len(domains)} domains so far.")
+    return domains
+
+
+def read_verdicts(directory: str) -> Dict[str, List[str]]:
+    """Recorded verdicts grouped by filter name ('phishing'/'malware'); shared domains (older records) are skipped."""
+    grouped: Dict[str, List[str]] = {name: [] for name in BLOCK_VERDICTS.values()}
+    path = os.path.join(directory, VERDICTS_FILE)
+    if not os.path.exists(path):
+        return grouped
+    with open(path, encoding="utf8") as f:
+        for line in f:
+            verdict, _, host = line.rstrip("\n").partition("\t")
+            if verdict in BLOCK_VERDICTS and host and not is_shared_domain(host):
+                grouped[BLOCK_VERDICTS[verdict]].append(host)
+    logger.info(f"Read {sum(len(v) for v in grouped.values())} recorded verdicts from {path}.")
+    return grouped
+
+
+def blockable(domains: Set[str], allowed: Callable[[str], bool]) -> Set[str]:
+    """`domains` minus shared domains and allowlisted ones (www. stripped, as the allowlist stores them)."""
+    kept = {d for d in domains if not is_shared_domain(d) and not allowed(d[4:] if d.startswith("www.") else d)}
+    if len(kept) < len(domains):
+        logger.info(f"Dropped {len(domains) - len(kept)} shared or allowlisted domains from a block filter.")
+    return kept
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the local domain reputation Bloom filters.")
+    parser.add_argument("--allow", nargs="+", default=[], help="Allowlist files (exact-host matches, www. stripped).")
+    parser.add_argument("--phishing", nargs="+", default=[], help="Phishing blocklist files (match host and subdomains).")
+    parser.add_argument("--malware", nargs="+", default=[], help="Malware blocklist files (match host and subdomains).")
+    parser.add_argument("--out-dir", default=REPUTATION_DIR, help="Output directory (default: reputation_filter.directory from config).")
+    parser.add_argument("--fp-rate", type=float, default=DEFAULT_FALSE_POSITIVE_RATE, help="Target false positive rate per filter.")
+    parser.add_argument("--no-verdicts", action="store_true", help=f"Do not add recorded verdicts from {VERDICTS_FILE}.")
+    args = parser.parse_args()
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    verdicts = {} if args.no_verdicts else read_verdicts(args.out_dir)
+    sources = {"allow": args.allow, "phishing": args.phishing, "malware": args.malware} # Allowlist first: it filters the others
+
+    allowed: Callable[[str], bool] = lambda domain: False
+    allow_path = os.path.join(args.out_dir, "allow.bloom")
+    if not args.allow and os.path.exists(allow_path):
+        allow_bloom = MappedBloomFilter(allow_path)
+        allowed = allow_bloom.__contains__
+
+    for name, paths in sources.items():
+        if not paths: # A filter is rebuilt from its full source lists, never from recorded verdicts alone
+            logger.info(f"No --{name} lists given; leaving any existing {name}.bloom untouched.")
+            continue
+        domains = read_domains(paths, strip_www=(name == "allow"))
+        if name in BLOCK_FILTERS:
+            domains.update(verdicts.get(name, []))
+            domains = blockable(domains, allowed)
+        else:
+            allowed = domains.__contains__
+        count = build_bloom(domains, os.path.join(args.out_dir, f"{name}.bloom"), args.fp_rate)
+        print(f"{name}: {count} domains")
+
+    logger.info("--- Reputation filter build complete ---")
+
+
+if __name__ == "__main__":
+    main()
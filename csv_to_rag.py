@@ -76,6 +76,8 @@ def main():
                         help="List of column names to include as metadata (space-separated). 'url' or 'source_domain' recommended.")
     # Allow overriding index path for flexibility if needed
     parser.add_argument("--index_path", default=None, help="Override the index path from config.yaml.")
+    parser.add_argument("--kg_backfill", action="store_true",
+                        help="Also extract entities from the documents (batched spaCy NER) and add new ones to the Knowledge Graph.")
 
     args = parser.parse_args()
 
@@ -105,6 +107,16 @@ def main():
     # Update index
     success = rag_processor.update_index(documents)
 
+    if success and args.kg_backfill:
+        # Imported lazily: spaCy is only needed for the back-fill
+        from api.kg_utils import load_graph, load_spacy_model, backfill_entities, save_graph
+        if load_spacy_model():
+            load_graph()
+            backfill_entities([doc.page_content for doc in documents])
+            save_graph()
+        else:
+            logger.error("SpaCy model unavailable - skipping Knowledge Graph entity back-fill.")
+
     if success:
         logger.info("--- CSV to RAG Ingestion Completed Successfully ---")
     else:
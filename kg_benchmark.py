@@ -0,0 +1,140 @@
+"""
+Memory / latency benchmark: compact KG store vs. the legacy networkx DiGraph layout.
+
+Builds the same synthetic claim graph in both representations (Zipf-like entity
+popularity, so a few 'hot' entities accumulate many claims) and reports build
+time, memory, pickle time/size and hot-entity lookup latency.
+
+Usage:
+    python kg_benchmark.py --claims 1000000
+    python kg_benchmark.py --claims 100000 --backends compact
+"""
+import argparse
+import bisect
+import gc
+import pickle
+import random
+import statistics
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+from api.kg_compact import CompactKnowledgeGraph
+
+ASSESSMENTS = ["likely_factual", "likely_misleading", "opinion", "needs_verification_/_uncertain", "contradictory_information_found"]
+ENTITY_TYPES = ["PERSON", "ORG", "GPE", "EVENT"]
+
+
+def make_workload(num_claims: int, num_entities: int, entities_per_claim: int, seed: int) -> List[Tuple[str, str, List[Tuple[str, str]]]]:
+    rng = random.Random(seed)
+    entity_pool = [(f"Entity {i}", ENTITY_TYPES[i % len(ENTITY_TYPES)]) for i in range(num_entities)]
+    # Zipf(1) popularity: entity 0 is the hottest. Cumulative weights are built once and
+    # sampled with bisect - random.choices() re-validates the whole weight list per call.
+    cum_weights, total = [], 0.0
+    for rank in range(num_entities):
+        total += 1.0 / (rank + 1)
+        cum_weights.append(total)
+    workload = []
+    for i in range(num_claims):
+        picks = (entity_pool[bisect.bisect(cum_weights, rng.random() * total)] for _ in range(entities_per_claim))
+        ents = list(dict.fromkeys(picks))
+        workload.append((f"claim:{i:016x}_user_input:{i}", rng.choice(ASSESSMENTS), ents))
+    return workload
+
+
+def _entity_id(text: str, label: str) -> str:
+    return f"{label.lower()}:{text.lower().replace(' ', '_')}"
+
+
+def build_networkx(workload):
+    import networkx as nx
+    g = nx.DiGraph()
+    for n, (claim_id, assessment, ents) in enumerate(workload):
+        g.add_node(claim_id, type='claim', text=f"Synthetic claim text number {n}", assessment=assessment, url=f"user_input:{n}", created_at=float(n))
+        for text, label in ents:
+            entity_id = _entity_id(text, label)
+            if not g.has_node(entity_id):
+                g.add_node(entity_id, type=label, name=text)
+            g.add_edge(claim_id, entity_id, relationship='mentions')
+            g.add_edge(entity_id, claim_id, relationship='mentioned_in')
+    return g
+
+
+def lookup_networkx(g, entity_id: str) -> Dict[str, int]:
+    # The pre-aggregate query path: scan every neighbor and count assessments
+    claims = [n for n in g.neighbors(entity_id) if g.nodes[n].get('type') == 'claim']
+    assessments = [g.nodes[c].get('assessment', 'unknown') for c in claims]
+    return {a: assessments.count(a) for a in set(assessments)}
+
+
+def build_compact(workload):
+    g = CompactKnowledgeGraph()
+    for n, (claim_id, assessment, ents) in enumerate(workload):
+        entity_ids = []
+        for text, label in ents:
+            entity_id = _entity_id(text, label)
+            if not g.is_entity(entity_id):
+                g.add_entity(entity_id, type=label, name=text)
+            entity_ids.append(entity_id)
+        g.add_claim(claim_id, entities=entity_ids, text=f"Synthetic claim text number {n}", assessment=assessment, url=f"user_input:{n}", created_at=float(n))
+    g.recompute_aggregates()
+    return g
+
+
+def lookup_compact(g, entity_id: str) -> Dict[str, int]:
+    return g.entity_assessment_counts(entity_id)
+
+
+def run_backend(name: str, build: Callable, lookup: Callable, workload, hot_entity: str, lookups: int):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    g = build(workload)
+    build_s = time.perf_counter() - start
+    mem_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    blob = pickle.dumps(g, pickle.HIGHEST_PROTOCOL)
+    dump_s = time.perf_counter() - start
+    start = time.perf_counter()
+    pickle.loads(blob)
+    load_s = time.perf_counter() - start
+
+    timings = []
+    for _ in range(lookups):
+        t0 = time.perf_counter(); lookup(g, hot_entity); timings.append(time.perf_counter() - t0)
+
+    print(f"[{name}]")
+    print(f"  build:          {build_s:9.2f} s")
+    print(f"  memory:         {mem_bytes / 2**20:9.1f} MiB ({mem_bytes / max(len(workload), 1):.0f} B/claim)")
+    print(f"  pickle dump:    {dump_s:9.2f} s  ({len(blob) / 2**20:.1f} MiB)")
+    print(f"  pickle load:    {load_s:9.2f} s")
+    print(f"  hot lookup p50: {statistics.median(timings) * 1e6:9.1f} us")
+    print(f"  hot lookup max: {max(timings) * 1e6:9.1f} us")
+    del g, blob
+    gc.collect()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the compact KG store against networkx.")
+    parser.add_argument("--claims", type=int, default=1_000_000, help="Number of synthetic claims.")
+    parser.add_argument("--entities", type=int, default=50_000, help="Size of the entity pool.")
+    parser.add_argument("--entities_per_claim", type=int, default=3)
+    parser.add_argument("--lookups", type=int, default=200, help="Hot-entity lookups to time.")
+    parser.add_argument("--backends", nargs='+', default=["compact", "networkx"], choices=["compact", "networkx"])
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"Generating workload: {args.claims} claims over {args.entities} entities...")
+    workload = make_workload(args.claims, args.entities, args.entities_per_claim, args.seed)
+    hot_entity = _entity_id("Entity 0", ENTITY_TYPES[0])
+
+    backends = {"compact": (build_compact, lookup_compact), "networkx": (build_networkx, lookup_networkx)}
+    for name in args.backends:
+        build, lookup = backends[name]
+        run_backend(name, build, lookup, workload, hot_entity, args.lookups)
+
+
+if __name__ == "__main__":
+    main()
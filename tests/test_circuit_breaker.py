@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from api import circuit_breaker as cb
+from api.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenException, is_upstream_failure
+from api.utils import ApiException, RateLimitException
+
+
+def test_opens_after_consecutive_failures_and_success_resets():
+    breaker = CircuitBreaker("t", failure_threshold=3, recovery_timeout=60)
+    breaker.record_failure(); breaker.record_failure(); breaker.record_success()
+    breaker.record_failure(); breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenException):
+        breaker.check()
+
+
+def test_half_open_lets_one_probe_through(monkeypatch):
+    breaker = CircuitBreaker("t", failure_threshold=1, recovery_timeout=10)
+    breaker.record_failure()
+    now = breaker.opened_at
+    monkeypatch.setattr(cb.time, "monotonic", lambda: now + 11)
+    assert breaker.allow_request() and breaker.state == HALF_OPEN
+    assert not breaker.allow_request() # Only one probe in flight
+    breaker.record_failure()
+    assert breaker.state == OPEN and breaker.opened_at == now + 11 # Failed probe: a full timeout again
+    monkeypatch.setattr(cb.time, "monotonic", lambda: now + 22)
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.consecutive_failures == 0
+
+
+def test_neutral_outcome_frees_the_probe_slot(monkeypatch):
+    breaker = CircuitBreaker("t", failure_threshold=1, recovery_timeout=0)
+    breaker.record_failure()
+    assert breaker.allow_request()
+    breaker.record_neutral()
+    assert breaker.state == HALF_OPEN and breaker.allow_request()
+
+
+@pytest.mark.parametrize("exc, counts", [
+    (ApiException("boom", status_code=503), True),
+    (ApiException("timeout", upstream_failure=True), True),
+    (ApiException("bad request", status_code=400), False),
+    (ApiException("auth", status_code=401), False),
+    (ApiException("no key configured"), False),
+    (RateLimitException("slow down"), False),
+    (CircuitOpenException("open", upstream_failure=True), False),
+    (ValueError("bug"), False),
+])
+def test_only_upstream_failures_count(exc, counts):
+    assert is_upstream_failure(exc) is counts
+
+
+def test_decorator_trips_on_5xx_only(monkeypatch):
+    monkeypatch.setattr(cb, "_breakers", {})
+    monkeypatch.setattr(cb, "BREAKER_CONFIG", {"default": {"failure_threshold": 2, "recovery_timeout_seconds": 60}})
+    errors = []
+
+    @cb.circuit_breaker("upstream")
+    async def call():
+        raise errors.pop(0)
+
+    async def scenario():
+        for exc in (ApiException("bad", status_code=400), ApiException("bad", status_code=422), RateLimitException("429"),
+                    ApiException("down", status_code=502), ApiException("down", status_code=500)):
+            errors.append(exc)
+            with pytest.raises((ApiException, RateLimitException)):
+                await call()
+            yield call.breaker.state
+
+    async def collect():
+        return [state async for state in scenario()]
+
+    assert asyncio.run(collect()) == [CLOSED, CLOSED, CLOSED, CLOSED, OPEN]
+    assert cb.get_breaker_states()["upstream"]["state"] == OPEN
@@ -0,0 +1,67 @@
+from api import utils
+from api.utils import extract_urls, parse_domain
+
+
+def sanitized(text, **kwargs):
+    return [u.sanitized for u in extract_urls(text, **kwargs)]
+
+
+def test_dedup_ignores_host_case():
+    assert sanitized("visit evil.com/login. Also EVIL.com/login") == ["https://evil.com/login"]
+
+
+def test_dedup_treats_empty_and_root_path_alike():
+    assert sanitized("https://a.com https://a.com/") == ["https://a.com"]
+
+
+def test_dedup_ignores_scheme_case():
+    assert sanitized("HTTPS://b.com/x and https://b.com/x") == ["https://b.com/x"]
+
+
+def test_file_names_are_not_urls():
+    assert extract_urls("Run main.py then check readme.md and notes.sh") == []
+
+
+def test_file_extension_suffix_with_path_is_a_url(monkeypatch):
+    monkeypatch.setattr(utils, "_TLD_EXTRACT", None)
+    monkeypatch.setattr(utils, "_KNOWN_TLDS", utils._KNOWN_TLDS | {"sh"}) # A real ccTLD in the full PSL
+    assert sanitized("run evil.sh") == []
+    assert sanitized("open evil.sh/payload now") == ["https://evil.sh/payload"]
+
+
+def test_bare_domains_need_a_known_suffix():
+    assert sanitized("e.g. file.txt v1.2 foo.zz, but paypa1-login.com/verify") == ["https://paypa1-login.com/verify"]
+
+
+def test_emails_are_not_urls():
+    assert extract_urls("mail me at someone@example.com") == []
+
+
+def test_trailing_punctuation_is_stripped():
+    assert sanitized("(see https://x.io/a), then evil.co.uk.") == ["https://x.io/a", "https://evil.co.uk"]
+
+
+def test_order_and_cap_follow_text_position():
+    text = "first bare.com then https://scheme.com and last.org"
+    assert sanitized(text) == ["https://bare.com", "https://scheme.com", "https://last.org"]
+    assert sanitized(text, max_urls=1) == ["https://bare.com"]
+    assert sanitized(text, max_urls=2) == ["https://bare.com", "https://scheme.com"]
+
+
+def test_cap_counts_unique_urls():
+    assert sanitized("a.com A.com b.com", max_urls=2) == ["https://a.com", "https://b.com"]
+
+
+def test_spans_point_at_the_original_text():
+    text = "go to evil.com/login now"
+    url = extract_urls(text)[0]
+    assert text[url.start:url.end] == url.original == "evil.com/login"
+    assert url.registered_domain == "evil.com"
+
+
+def test_parse_domain_fallback(monkeypatch):
+    monkeypatch.setattr(utils, "_TLD_EXTRACT", None)
+    assert parse_domain("a.b.example.co.uk") == ("a.b", "example", "co.uk")
+    assert parse_domain("login.user.github.io").registered_domain == "user.github.io"
+    assert parse_domain("foo.zz").suffix == "" # Unknown 2-letter labels are not ccTLDs
+    assert parse_domain("127.0.0.1").suffix == ""
@@ -0,0 +1,33 @@
+from api.gazetteer import Gazetteer
+
+
+def build():
+    gaz = Gazetteer()
+    gaz.add_many([("European Central Bank", "ORG"), ("Central Bank", "ORG"), ("Paris", "GPE"), ("Apple", "ORG")])
+    return gaz
+
+
+def test_add_skips_short_duplicate_and_unlabelled_names():
+    gaz = build()
+    assert gaz.size == 4
+    assert gaz.add("paris", "PERSON") is False # First label wins
+    assert gaz.add("EU", "ORG") is False and Gazetteer(min_name_length=2).add("EU", "ORG") is True
+    assert gaz.add("Berlin", "") is False
+
+
+def test_match_takes_the_longest_name_with_original_surface():
+    entities, coverage = build().match("Officials said the European Central Bank met in Paris.")
+    assert entities == [("European Central Bank", "ORG"), ("Paris", "GPE")]
+    assert coverage == 1.0
+
+
+def test_single_token_names_must_be_capitalized():
+    entities, _ = build().match("I ate an apple in paris")
+    assert entities == []
+
+
+def test_coverage_counts_unknown_proper_nouns_but_not_sentence_starts():
+    entities, coverage = build().match("Reports say Apple hired Jane Doe. Paris agreed.")
+    assert entities == [("Apple", "ORG"), ("Paris", "GPE")]
+    assert coverage == 1 / 3 # Apple matched; Jane and Doe did not; sentence-initial Paris is not a candidate
+    assert build().match("nothing to see here") == ([], 0.0)
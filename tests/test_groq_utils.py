@@ -0,0 +1,77 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from api import groq_utils
+from api.circuit_breaker import CLOSED
+from api.rate_limiter import ModelRateLimiter
+
+
+class FakeClient:
+    """Replays scripted outcomes: an httpx.Response, an exception, or (delay, outcome)."""
+
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    async def post(self, path, json=None, timeout=None):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, tuple):
+            delay, outcome = outcome
+            await asyncio.sleep(delay)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+
+def ok(text="answer"):
+    return httpx.Response(200, json={"choices": [{"message": {"content": text}}], "usage": {"total_tokens": 50, "completion_tokens": 20}})
+
+
+@pytest.fixture(autouse=True)
+def groq_setup(monkeypatch):
+    monkeypatch.setattr(groq_utils, "HEDGE_ENABLED", False)
+    monkeypatch.setattr(groq_utils, "RETRY_BASE_DELAY", 0.0)
+    monkeypatch.setattr(groq_utils, "RETRY_MAX_ATTEMPTS", 2)
+    monkeypatch.setattr(groq_utils, "_rate_limiters", {})
+    breaker = groq_utils._query_groq_uncached.__wrapped__.breaker
+    breaker.state, breaker.consecutive_failures, breaker._probes_in_flight = CLOSED, 0, 0
+
+
+def query(client):
+    groq_utils._groq_client = client
+    try:
+        return asyncio.run(groq_utils._query_groq_uncached("prompt", "test-model", 0.0, 100))
+    finally:
+        groq_utils._groq_client = None
+
+
+def test_5xx_is_retried():
+    client = FakeClient([httpx.Response(503), ok()])
+    assert query(client) == "answer" and client.calls == 2
+
+
+def test_4xx_is_not_retried():
+    client = FakeClient([httpx.Response(400, json={"error": "bad"})])
+    with pytest.raises(groq_utils.GroqApiException) as err:
+        query(client)
+    assert client.calls == 1 and err.value.upstream_failure is False
+
+
+def test_each_retry_gets_a_fresh_admission_deadline(monkeypatch):
+    monkeypatch.setattr(groq_utils, "RATE_LIMIT_MAX_WAIT", 0.2)
+    limiter = groq_utils._rate_limiters["test-model"] = ModelRateLimiter("test-model", rpm=600, tpm=100000, max_concurrency=1)
+    # The first attempt outlives the whole admission window before timing out; the retry must still be admitted
+    client = FakeClient([(0.3, httpx.ReadTimeout("slow")), ok()])
+    assert query(client) == "answer" and client.calls == 2
+    assert limiter.in_flight == 0
+
+
+def test_timeouts_exhaust_retries_and_count_as_upstream_failures():
+    client = FakeClient([httpx.ReadTimeout("t")] * 3)
+    with pytest.raises(groq_utils.GroqApiException) as err:
+        query(client)
+    assert client.calls == 3 and err.value.upstream_failure is True
@@ -0,0 +1,90 @@
+import pickle
+
+from api.kg_compact import CompactKnowledgeGraph
+
+TEXTS = [
+    "The mayor announced a new public transport plan for the northern districts of the city this week",
+    "Scientists reported that the river water quality improved after the factory closed last spring",
+    "The football club signed a young striker from a second division team for a record fee",
+]
+
+
+def sample_graph():
+    kg = CompactKnowledgeGraph()
+    for i, text in enumerate(TEXTS):
+        kg.add_claim(f"claim:{i}", ["org:city", f"person:p{i}"], text=text, assessment="likely_factual", created_at=100.0 + i)
+    return kg
+
+
+def test_claims_link_both_ways_and_count_co_mentions():
+    kg = sample_graph()
+    assert (kg.number_of_claims(), kg.number_of_entities()) == (3, 4)
+    assert kg.claim_entity_ids("claim:1") == ["org:city", "person:p1"]
+    assert kg.entity_claim_ids("org:city") == ["claim:0", "claim:1", "claim:2"]
+    assert dict(kg.co_mentions("org:city")) == {"person:p0": 1, "person:p1": 1, "person:p2": 1}
+    assert kg.get_attrs("claim:2")["text"] == TEXTS[2] and kg.get_attrs("missing") is None
+
+
+def test_attributes_go_to_columns_or_extras():
+    kg = sample_graph()
+    kg.set_attrs("org:city", claim_count=3, assessment_counts={"likely_factual": 3}, aliases=["Town"])
+    kg.set_attrs("claim:0", seen_count=4, confidence=0.8)
+    entity = kg.get_attrs("org:city")
+    assert (entity["claim_count"], entity["assessment_counts"], entity["aliases"]) == (3, {"likely_factual": 3}, ["Town"])
+    assert kg.get_attrs("claim:0")["seen_count"] == 4
+
+
+def test_near_duplicate_lookup():
+    kg = sample_graph()
+    claim_id, similarity = kg.find_similar_claim(TEXTS[1].replace("last spring", "last  spring!"), 0.8)
+    assert claim_id == "claim:1" and similarity >= 0.8
+    assert kg.find_similar_claim("completely unrelated words about cooking pasta at home tonight", 0.5) is None
+
+
+def test_copy_and_pickle_are_independent():
+    kg = sample_graph()
+    clone = kg.copy()
+    clone.add_claim("claim:new", ["org:city"], text="another claim about the city budget and its schools", created_at=200.0)
+    assert kg.number_of_claims() == 3 and clone.number_of_claims() == 4
+    restored = pickle.loads(pickle.dumps(kg))
+    assert restored.entity_claim_ids("org:city") == kg.entity_claim_ids("org:city")
+    assert restored.find_similar_claim(TEXTS[0], 0.9)[0] == "claim:0"
+
+
+def test_eviction_by_age_keeps_aggregates_and_reindexes():
+    kg = sample_graph()
+    kg.set_attrs("org:city", claim_count=3)
+    kg.set_attrs("claim:0", last_seen_at=150.0) # Re-seen recently: stays
+    assert kg.evict_claims(created_before=102.0) == 1
+    assert [c for c in ("claim:0", "claim:1", "claim:2") if kg.is_claim(c)] == ["claim:0", "claim:2"]
+    assert kg.entity_claim_ids("org:city") == ["claim:0", "claim:2"]
+    assert kg.claim_entity_ids("claim:2") == ["org:city", "person:p2"]
+    assert kg.get_attrs("org:city")["claim_count"] == 3 # Aggregates keep evicted claims folded in
+    assert kg.find_similar_claim(TEXTS[1], 0.8) is None and kg.find_similar_claim(TEXTS[2], 0.9)[0] == "claim:2"
+    assert kg.graph["evicted_claim_count"] == 1
+
+
+def test_eviction_per_entity_drops_the_oldest():
+    kg = sample_graph()
+    assert kg.evict_claims(max_per_entity=1) == 2
+    assert kg.entity_claim_ids("org:city") == ["claim:2"]
+
+
+def test_plan_does_not_touch_the_graph_until_applied():
+    kg = sample_graph()
+    plan = kg.plan_eviction(created_before=1000.0)
+    assert kg.number_of_claims() == 3
+    assert kg.apply_eviction(plan) == 3 and kg.number_of_claims() == 0
+    assert kg.apply_eviction(kg.plan_eviction(created_before=1000.0)) == 0
+
+
+def test_claim_side_memory_shrinks_with_eviction():
+    kg = CompactKnowledgeGraph()
+    for i in range(300):
+        kg.add_claim(f"claim:{i}", ["org:a", f"person:{i % 7}"], text=f"claim number {i} about topic {i % 11} and more words", created_at=float(i))
+    before_claims, before_total = kg.memory_usage_bytes(claims_only=True), kg.memory_usage_bytes()
+    kg.evict_claims(created_before=kg.age_cutoff_for(150))
+    after_claims = kg.memory_usage_bytes(claims_only=True)
+    assert kg.number_of_claims() == 150
+    assert after_claims < before_claims * 0.75
+    assert before_total - kg.memory_usage_bytes() >= (before_claims - after_claims) * 0.9 # Entity side is not what shrinks
@@ -0,0 +1,27 @@
+from api.kg_dedup import NUM_PERM, band_keys, estimate_similarity, minhash_signature, normalize_claim_text, stable_claim_id
+
+CLAIM = "The central bank raised interest rates by half a point on Tuesday to fight rising inflation across the region"
+
+
+def test_normalization_ignores_case_punctuation_and_spacing():
+    assert normalize_claim_text("  Hello,   WORLD!\n It's  fine. ") == "hello world it s fine"
+    assert normalize_claim_text(None) == ""
+
+
+def test_claim_ids_are_stable_for_equivalent_text():
+    assert stable_claim_id(CLAIM) == stable_claim_id("  " + CLAIM.upper() + "!!")
+    assert stable_claim_id(CLAIM) != stable_claim_id(CLAIM.replace("Tuesday", "Monday"))
+    assert stable_claim_id(CLAIM).startswith("claim:")
+
+
+def test_similarity_separates_near_duplicates_from_unrelated_text():
+    sig = minhash_signature(CLAIM)
+    assert len(sig) == NUM_PERM and estimate_similarity(sig, minhash_signature(CLAIM.lower())) == 1.0
+    near = estimate_similarity(sig, minhash_signature(CLAIM.replace("on Tuesday", "on Wednesday")))
+    unrelated = estimate_similarity(sig, minhash_signature("A local bakery won an award for its sourdough bread recipe this year"))
+    assert near > 0.4 > unrelated
+    assert estimate_similarity(sig, minhash_signature("")) == 0.0
+
+
+def test_identical_signatures_share_every_band():
+    assert band_keys(minhash_signature(CLAIM)) == band_keys(minhash_signature(CLAIM + "."))
@@ -0,0 +1,100 @@
+import asyncio
+import time
+
+import pytest
+
+from api import kg_utils
+from api.kg_compact import CompactKnowledgeGraph
+
+CLAIM = ("The city council approved the new stadium budget in 2021 after a long public debate that lasted for several "
+         "months and involved residents business owners sports clubs and regional officials who argued about costs")
+
+
+@pytest.fixture(autouse=True)
+def fresh_graph(monkeypatch):
+    monkeypatch.setattr(kg_utils, "graph", CompactKnowledgeGraph())
+    monkeypatch.setattr(kg_utils, "_read_view", None)
+    monkeypatch.setattr(kg_utils, "_pending_records", [])
+    monkeypatch.setattr(kg_utils, "_last_seq", 0)
+    monkeypatch.setattr(kg_utils, "gazetteer", None)
+
+
+def add(text=CLAIM, assessment="Likely Misleading", confidence=0.9):
+    return kg_utils.add_claim_to_graph(text, assessment, "user_input", [("City Council", "ORG")], confidence=confidence)
+
+
+def test_exact_repeat_is_reusable():
+    claim_id = add()
+    prior = kg_utils.find_prior_verdict("  the CITY council approved the new stadium budget in 2021, " + CLAIM.split("2021 ", 1)[1].upper())
+    assert prior["claim_id"] == claim_id and prior["exact"] is True
+    assert (prior["assessment"], prior["confidence"]) == ("likely_misleading", 0.9)
+
+
+def test_near_duplicate_is_not_exact(monkeypatch):
+    monkeypatch.setattr(kg_utils, "PRIOR_VERDICT_MIN_SIMILARITY", 0.7)
+    add()
+    prior = kg_utils.find_prior_verdict(CLAIM.replace("2021", "2024"))
+    assert prior["similarity"] >= kg_utils.PRIOR_VERDICT_MIN_SIMILARITY
+    assert prior["exact"] is False # A changed year must never reuse the old verdict as-is
+
+
+def test_old_verdict_is_not_served(monkeypatch):
+    claim_id = add()
+    kg_utils._set_node_attrs(claim_id, assessed_at=time.time() - 31 * 86400)
+    monkeypatch.setattr(kg_utils, "PRIOR_VERDICT_MAX_AGE_DAYS", 30)
+    assert kg_utils.find_prior_verdict(CLAIM) is None
+
+
+def test_reanalysis_replaces_the_verdict_and_confidence():
+    claim_id = add(confidence=0.9)
+    assert add(assessment="Likely Factual", confidence=None) == claim_id
+    attrs = kg_utils.graph.get_attrs(claim_id)
+    assert attrs["assessment"] == "likely_factual" and attrs["confidence"] is None and attrs["seen_count"] == 2
+    assert kg_utils.graph.graph["assessment_counts"] == {"likely_factual": 1}
+
+
+def test_read_view_refresh_scales_with_copy_time(monkeypatch):
+    add()
+    monkeypatch.setattr(kg_utils, "READ_VIEW_REFRESH_SECONDS", 0.01)
+    monkeypatch.setattr(kg_utils, "READ_VIEW_MAX_COPY_SHARE", 0.1)
+    monkeypatch.setattr(kg_utils, "_view_refresh_interval", 0.01)
+    monkeypatch.setattr(kg_utils, "_read_view_seq", -1)
+    live = kg_utils.graph
+
+    def slow_copy():
+        time.sleep(0.05)
+        return CompactKnowledgeGraph.copy(live)
+
+    monkeypatch.setattr(live, "copy", slow_copy)
+    view = asyncio.run(kg_utils._publish_read_view())
+    assert view is not live and view.number_of_claims() == 1
+    assert kg_utils._view_refresh_interval >= 0.05 / 0.1 # Copying stays within 10% of the writer's time
+
+
+def test_memory_budget_sweeps_converge_and_replay(monkeypatch):
+    clock = iter(range(1_000_000, 2_000_000))
+    monkeypatch.setattr(kg_utils.time, "time", lambda: float(next(clock)))
+    for i in range(400):
+        kg_utils.add_claim_to_graph(f"Claim {i} says the harbour project {i % 13} costs {i} million", "Likely Factual", "user_input", [("Harbour Authority", "ORG")])
+    baseline = kg_utils.graph.copy()
+    budget = kg_utils.graph.memory_usage_bytes(claims_only=True) * 0.5
+    monkeypatch.setattr(kg_utils, "RETENTION_MEMORY_BUDGET_MB", budget / 2**20)
+    monkeypatch.setattr(kg_utils, "RETENTION_MAX_EVICT_FRACTION", 0.25)
+    monkeypatch.setattr(kg_utils, "RETENTION_MAX_CLAIM_AGE_DAYS", None)
+    monkeypatch.setattr(kg_utils, "RETENTION_MAX_CLAIMS_PER_ENTITY", None)
+    kg_utils._pending_records.clear()
+
+    counts = []
+    for _ in range(10):
+        asyncio.run(kg_utils._run_retention_sweep())
+        counts.append(kg_utils.graph.number_of_claims())
+    assert counts[0] >= 299 # One sweep evicts at most RETENTION_MAX_EVICT_FRACTION
+    assert counts[-1] == counts[-2] > 0 # Stable once under budget
+    assert kg_utils.graph.memory_usage_bytes(claims_only=True) <= budget
+    assert kg_utils.graph.number_of_entities() == baseline.number_of_entities()
+
+    for record in kg_utils._pending_records:
+        assert record["op"] == "evict_claims"
+        kg_utils._apply_mutation(baseline, record)
+    entity_id = next(kg_utils.graph.iter_entity_ids())
+    assert baseline.entity_claim_ids(entity_id) == kg_utils.graph.entity_claim_ids(entity_id) # Replaying the log evicts the same claims
@@ -0,0 +1,54 @@
+from api import prompt_builder
+from api.prompt_builder import EvidenceChunk, build_context, context_budget, count_tokens
+
+
+def words(n, word="alpha"):
+    return " ".join(f"{word}{i}" for i in range(n)) + "."
+
+
+def test_highest_score_first_and_exact_duplicates_dropped():
+    context, used = build_context([EvidenceChunk("Second fact here.", 0.5), EvidenceChunk("First fact here. Second fact here.", 0.9)], 1000)
+    assert [c.text for c in used] == ["First fact here. Second fact here."]
+    assert context == "First fact here. Second fact here."
+
+
+def test_negative_budget_uses_nothing():
+    assert build_context([EvidenceChunk("Some evidence.", 1.0)], -50) == ("", [])
+
+
+def test_chunk_overhead_is_charged_per_used_chunk():
+    chunks = [EvidenceChunk(words(20, f"w{i}_"), 1.0 - i / 10) for i in range(5)]
+    one = count_tokens(chunks[0].text)
+    budget = 2 * one + 2 * 30 + count_tokens("\n\n---\n\n")
+    _, used = build_context(chunks, budget, chunk_overhead_tokens=30)
+    assert len(used) == 2 # Header cost counts for the two used snippets, not all five
+    _, used = build_context(chunks, budget, chunk_overhead_tokens=0)
+    assert len(used) == 3
+
+
+def test_last_chunk_is_cut_at_a_sentence():
+    long_chunk = " ".join(words(15, f"s{i}_") for i in range(10))
+    _, used = build_context([EvidenceChunk(long_chunk, 1.0)], 100)
+    assert used and used[0].text.endswith(".") and count_tokens(used[0].text) <= 100
+
+
+def test_edge_fragments_dropped_only_for_overlapping_chunks_of_one_document():
+    shared = "the overlapping part of the text is repeated here"
+    first = f"Opening sentence of the document. Middle sentence. Then we see that {shared}"
+    second = f"{shared}. Next new sentence follows."
+    _, used = build_context([EvidenceChunk(first, 0.9, "doc"), EvidenceChunk(second, 0.8, "doc")], 1000, overlapping=True)
+    assert used[1].text == "Next new sentence follows."
+    # Independent web snippets (not overlapping) keep their edge sentences
+    _, used = build_context([EvidenceChunk(first, 0.9, "a"), EvidenceChunk(second, 0.8, "b")], 1000)
+    assert used[1].text.startswith(shared)
+    # Overlapping chunks of different documents do too
+    _, used = build_context([EvidenceChunk(first, 0.9, "a"), EvidenceChunk(second, 0.8, "b")], 1000, overlapping=True)
+    assert used[1].text.startswith(shared)
+
+
+def test_context_budget_is_capped_by_the_window(monkeypatch):
+    monkeypatch.setattr(prompt_builder, "CONTEXT_WINDOWS", {"small": 2000})
+    monkeypatch.setattr(prompt_builder, "CONTEXT_TOKENS", {"default": 3000})
+    monkeypatch.setattr(prompt_builder, "TEMPLATE_RESERVE", 600)
+    assert context_budget("small", 1000) == 400
+    assert context_budget("small", 4000) == 0
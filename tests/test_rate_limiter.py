@@ -0,0 +1,100 @@
+import asyncio
+import time
+
+import pytest
+
+from api.rate_limiter import ModelRateLimiter, TokenBucket, parse_reset_duration
+from api.utils import RateLimitException
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_parse_reset_duration():
+    assert parse_reset_duration("7.66s") == pytest.approx(7.66)
+    assert parse_reset_duration("2m59.56s") == pytest.approx(179.56)
+    assert parse_reset_duration("120ms") == pytest.approx(0.12)
+    assert parse_reset_duration("3") == 3.0
+    assert parse_reset_duration("soon") is None and parse_reset_duration(None) is None
+
+
+def test_token_bucket_refills_and_waits_for_a_full_bucket():
+    bucket = TokenBucket(60) # 1 per second
+    now = bucket.updated
+    bucket.consume(60)
+    assert bucket.time_until(1, now) == pytest.approx(1.0)
+    assert bucket.time_until(1000, now) == pytest.approx(60.0) # Capped at capacity
+    assert bucket.time_until(1, now + 2) == 0
+
+
+def test_reservation_uses_the_typical_completion():
+    limiter = ModelRateLimiter("m", rpm=60, tpm=100000, max_concurrency=2, completion_estimate=300)
+    assert limiter.estimate_call_tokens("x" * 400, max_tokens=2048) == 101 + 300
+    assert limiter.estimate_call_tokens("x" * 400, max_tokens=100) == 101 + 100
+    limiter.reconcile(401, {"total_tokens": 600, "completion_tokens": 500})
+    assert limiter.completion_estimate == pytest.approx(340.0)
+
+
+def test_waiting_call_is_admitted_when_a_slot_frees_before_its_deadline():
+    async def scenario():
+        limiter = ModelRateLimiter("m", rpm=600, tpm=100000, max_concurrency=1)
+        await limiter.acquire(10, time.monotonic() + 1)
+        waiter = asyncio.ensure_future(limiter.acquire(10, time.monotonic() + 1))
+        await asyncio.sleep(0.05)
+        assert not waiter.done()
+        limiter.release(200)
+        started = time.monotonic()
+        await waiter
+        return time.monotonic() - started
+
+    assert run(scenario()) < 0.5 # Woken by the release, not by polling until the deadline
+
+
+def test_refund_admits_a_call_waiting_for_tokens():
+    async def scenario():
+        limiter = ModelRateLimiter("m", rpm=600, tpm=600, max_concurrency=4)
+        await limiter.acquire(590, time.monotonic() + 1)
+        waiter = asyncio.ensure_future(limiter.acquire(300, time.monotonic() + 5))
+        await asyncio.sleep(0.05)
+        limiter.reconcile(590, {"total_tokens": 100}) # Used far less than reserved
+        await asyncio.wait_for(waiter, 0.5)
+
+    run(scenario())
+
+
+def test_calls_fail_only_once_their_deadline_passes():
+    async def scenario():
+        limiter = ModelRateLimiter("m", rpm=600, tpm=100000, max_concurrency=1)
+        await limiter.acquire(10, time.monotonic() + 1)
+        started = time.monotonic()
+        with pytest.raises(RateLimitException):
+            await limiter.acquire(10, time.monotonic() + 0.2)
+        return time.monotonic() - started
+
+    assert 0.15 < run(scenario()) < 1.0
+
+
+def test_429_pauses_and_halves_concurrency_then_grows_back():
+    async def scenario():
+        limiter = ModelRateLimiter("m", rpm=600, tpm=100000, max_concurrency=4)
+        await limiter.acquire(10, time.monotonic() + 1)
+        limiter.release(429, {"retry-after": "30"})
+        assert limiter.concurrency_limit == 2
+        with pytest.raises(RateLimitException): # The pause outlasts the deadline: rejected at once
+            await asyncio.wait_for(limiter.acquire(10, time.monotonic() + 5), 0.5)
+        assert not limiter.can_admit_by(time.monotonic() + 5)
+        limiter.blocked_until = 0.0
+        for _ in range(10):
+            await limiter.acquire(10, time.monotonic() + 1)
+            limiter.release(200)
+        return limiter.concurrency_limit
+
+    assert run(scenario()) == 4
+
+
+def test_headers_shrink_the_token_bucket():
+    limiter = ModelRateLimiter("m", rpm=600, tpm=100000, max_concurrency=4)
+    limiter.release(200, {"x-ratelimit-limit-tokens": "6000", "x-ratelimit-remaining-tokens": "1000"})
+    assert limiter.tokens.capacity == 6000 and limiter.tokens.level <= 1000
+    assert not limiter.has_headroom(2000) and limiter.has_headroom(500)
@@ -0,0 +1,122 @@
+import os
+import sys
+import time
+
+import pytest
+
+import build_reputation_filter
+from api import reputation_filter as rf
+from api import utils
+
+
+@pytest.fixture(autouse=True)
+def reputation_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(rf, "REPUTATION_DIR", str(tmp_path))
+    monkeypatch.setattr(rf, "REPUTATION_ENABLED", True)
+    monkeypatch.setattr(rf, "_filters", {})
+    monkeypatch.setattr(rf, "_recent", {})
+    monkeypatch.setattr(rf, "_last_check", 0.0)
+    monkeypatch.setattr(rf, "RECORD_MIN_SCANNERS", 2)
+    monkeypatch.setattr(rf, "RECORD_MIN_CONFIDENCE", 0.9)
+    return tmp_path
+
+
+def write_bloom(directory, name, items):
+    rf.build_bloom(items, os.path.join(str(directory), f"{name}.bloom"), 1e-6)
+
+
+def test_bloom_roundtrip(tmp_path):
+    path = str(tmp_path / "t.bloom")
+    listed = [f"listed{i}.com" for i in range(1000)]
+    assert rf.build_bloom(listed + ["A.com ", "", "a.com"], path) == 1001
+    bloom = rf.MappedBloomFilter(path)
+    try:
+        assert "a.com" in bloom and all(domain in bloom for domain in listed)
+        assert sum(f"other{i}.com" in bloom for i in range(10000)) == 0 # 1e-6 false positive rate
+    finally:
+        bloom.close()
+
+
+def test_invalid_filter_file_is_rejected(tmp_path):
+    path = tmp_path / "bad.bloom"
+    path.write_bytes(b"NOTBLOOM" + b"\0" * 64)
+    with pytest.raises(ValueError):
+        rf.MappedBloomFilter(str(path))
+
+
+def test_candidates_stop_at_the_registered_domain(monkeypatch):
+    monkeypatch.setattr(utils, "_TLD_EXTRACT", None) # Built-in suffix list, which knows co.uk
+    assert rf._candidate_domains("a.b.evil.co.uk") == ["a.b.evil.co.uk", "b.evil.co.uk", "evil.co.uk"]
+
+
+def test_candidates_stop_before_shared_domains():
+    assert rf._candidate_domains("docs.google.com") == []
+    assert rf._candidate_domains("x.user.github.io") == ["x.user.github.io", "user.github.io"]
+    assert rf._candidate_domains("1.2.3.4") == ["1.2.3.4"]
+
+
+def test_block_filters_match_subdomains_and_allow_is_exact(reputation_dir):
+    write_bloom(reputation_dir, "phishing", ["evil.com"])
+    write_bloom(reputation_dir, "allow", ["good.com"])
+    rf.reload_filters()
+    assert rf.check_url_reputation("https://login.evil.com/x").verdict == "Phishing"
+    assert rf.check_url_reputation("https://www.good.com/").verdict == "Likely Safe"
+    assert rf.check_url_reputation("https://user.good.com/") is None
+
+
+def test_verdicts_need_agreeing_scanners(reputation_dir):
+    rf.record_verdict("https://login.evil.com/x", "Phishing", 0.99, 1)
+    assert rf.check_url_reputation("https://login.evil.com/x") is None
+    rf.record_verdict("https://login.evil.com/x", "Phishing", 0.99, 2)
+    match = rf.check_url_reputation("https://other.evil.com/")
+    assert (match.verdict, match.source, match.domain) == ("Phishing", "recent", "evil.com")
+    assert (reputation_dir / rf.VERDICTS_FILE).read_text() == "Phishing\tevil.com\n"
+
+
+def test_shared_and_allowlisted_domains_are_never_recorded(reputation_dir):
+    write_bloom(reputation_dir, "allow", ["bank.com"])
+    rf.reload_filters()
+    for url in ("https://docs.google.com/forms/x", "https://bit.ly/abc", "https://login.bank.com/"):
+        rf.record_verdict(url, "Phishing", 0.99, 3)
+    assert rf._recent == {} and not (reputation_dir / rf.VERDICTS_FILE).exists()
+
+
+def test_recent_verdicts_expire(monkeypatch):
+    monkeypatch.setattr(rf, "RECENT_TTL", 60)
+    rf.record_verdict("https://evil.com/", "Malicious", 0.99, 2)
+    assert rf.check_url_reputation("https://evil.com/").verdict == "Malicious"
+    now = time.monotonic()
+    monkeypatch.setattr(rf.time, "monotonic", lambda: now + 61)
+    monkeypatch.setattr(rf, "RELOAD_CHECK_SECONDS", float("inf"))
+    assert rf.check_url_reputation("https://evil.com/") is None
+
+
+def test_builder_drops_shared_and_allowlisted_domains(reputation_dir, tmp_path, monkeypatch):
+    feed = tmp_path / "feed.txt"
+    feed.write_text("https://www.google.com/url?q=evil\nsites.google.com\nevil.com\n")
+    allow = tmp_path / "allow.csv"
+    allow.write_text("1,google.com\n")
+    (reputation_dir / rf.VERDICTS_FILE).write_text("Phishing\tbit.ly\nPhishing\tbad.org\n")
+    monkeypatch.setattr(sys, "argv", ["build", "--allow", str(allow), "--phishing", str(feed), "--out-dir", str(reputation_dir)])
+    build_reputation_filter.main()
+
+    phishing = rf.MappedBloomFilter(str(reputation_dir / "phishing.bloom"))
+    try:
+        assert phishing.items == 2 and "evil.com" in phishing and "bad.org" in phishing
+    finally:
+        phishing.close()
+    rf.reload_filters(force=True)
+    assert rf.check_url_reputation("https://www.google.com/url?q=evil").verdict == "Likely Safe"
+
+
+def test_builder_uses_the_existing_allowlist(reputation_dir, tmp_path, monkeypatch):
+    write_bloom(reputation_dir, "allow", ["google.com"])
+    feed = tmp_path / "feed.txt"
+    feed.write_text("www.google.com\nevil.com\n")
+    monkeypatch.setattr(sys, "argv", ["build", "--malware", str(feed), "--out-dir", str(reputation_dir), "--no-verdicts"])
+    build_reputation_filter.main()
+    malware = rf.MappedBloomFilter(str(reputation_dir / "malware.bloom"))
+    try:
+        assert malware.items == 1 and "evil.com" in malware
+    finally:
+        malware.close()
@@ -0,0 +1,139 @@
+import asyncio
+
+import pytest
+
+from api import scan_jobs
+
+
+class FakeRedis:
+    """Dict-backed stand-in; every call yields to the loop like a real round trip."""
+
+    def __init__(self):
+        self.data = {}
+
+    async def set(self, key, value, ex=None):
+        for _ in range(3): # Writes take longer than reads
+            await asyncio.sleep(0)
+        self.data[key] = value
+
+    async def get(self, key):
+        await asyncio.sleep(0)
+        return self.data.get(key)
+
+
+@pytest.fixture(autouse=True)
+def fresh_jobs(monkeypatch):
+    redis = FakeRedis()
+    monkeypatch.setattr(scan_jobs, "get_redis_client", lambda: redis)
+    monkeypatch.setattr(scan_jobs, "_local_records", {})
+    monkeypatch.setattr(scan_jobs, "_queue", None)
+    monkeypatch.setattr(scan_jobs, "JOBS_ENABLED", True)
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def submissions():
+    return [r for k, r in scan_jobs._local_records.items() if k.startswith("scan_submission:")]
+
+
+def test_each_request_gets_its_own_job_over_one_submission():
+    async def scenario():
+        scan_jobs._queue = asyncio.Queue(10)
+        a = await scan_jobs.enqueue_scan_job("text A", "https://x.com/", ["virustotal"])
+        b = await scan_jobs.enqueue_scan_job("text B", "https://x.com/", ["virustotal"])
+        return a, b, await scan_jobs.get_job(a), await scan_jobs.get_job(b), scan_jobs._queue.qsize()
+
+    a, b, job_a, job_b, queued = run(scenario())
+    assert a != b and scan_jobs._submission_id_for("https://x.com/") not in (a, b)
+    assert (job_a["input_text"], job_b["input_text"]) == ("text A", "text B")
+    assert queued == 1 and len(submissions()) == 1
+    assert "input_text" not in submissions()[0] # The shared record never holds a caller's text
+
+
+def test_concurrent_enqueues_submit_once():
+    async def scenario():
+        scan_jobs._queue = asyncio.Queue(10)
+        ids = await asyncio.gather(*(scan_jobs.enqueue_scan_job(f"t{i}", "https://y.com/", ["urlscanio"]) for i in range(5)))
+        return ids, scan_jobs._queue.qsize()
+
+    ids, queued = run(scenario())
+    assert len(set(ids)) == 5 and queued == 1
+
+
+def test_submission_is_saved_before_a_worker_can_take_it(monkeypatch):
+    seen = []
+
+    async def fake_run(submission):
+        seen.append(submission["submission_id"])
+
+    monkeypatch.setattr(scan_jobs, "_run_submission", fake_run)
+
+    async def scenario():
+        scan_jobs._queue = asyncio.Queue(10)
+        worker = asyncio.create_task(scan_jobs._worker_loop())
+        await scan_jobs.enqueue_scan_job("t", "https://z.com/", ["virustotal"])
+        await scan_jobs._queue.join()
+        worker.cancel()
+        await asyncio.gather(worker, return_exceptions=True)
+
+    run(scenario())
+    assert seen == [scan_jobs._submission_id_for("https://z.com/")]
+
+
+def test_full_queue_queues_nothing():
+    async def scenario():
+        scan_jobs._queue = asyncio.Queue(1)
+        first = await scan_jobs.enqueue_scan_job("t", "https://one.com/", ["virustotal"])
+        second = await scan_jobs.enqueue_scan_job("t", "https://two.com/", ["virustotal"])
+        return first, second
+
+    first, second = run(scenario())
+    assert first is not None and second is None
+
+
+def test_unknown_scanners_and_disabled_queue_return_none():
+    async def scenario():
+        without_queue = await scan_jobs.enqueue_scan_job("t", "https://x.com/", ["virustotal"])
+        scan_jobs._queue = asyncio.Queue(10)
+        return without_queue, await scan_jobs.enqueue_scan_job("t", "https://x.com/", ["ipqualityscore"])
+
+    assert run(scenario()) == (None, None)
+
+
+def test_run_submission_tracks_scanners_and_result_is_stored(monkeypatch):
+    async def found(url):
+        return True
+
+    async def broken(url):
+        raise RuntimeError("down")
+
+    monkeypatch.setitem(scan_jobs._SUBMITTERS, "virustotal", found)
+    monkeypatch.setitem(scan_jobs._SUBMITTERS, "urlscanio", broken)
+
+    async def scenario():
+        scan_jobs._queue = asyncio.Queue(10)
+        job_id = await scan_jobs.enqueue_scan_job("t", "https://w.com/", ["virustotal", "urlscanio"])
+        await scan_jobs._run_submission(submissions()[0])
+        job = await scan_jobs.get_job(job_id)
+        await scan_jobs.store_job_result(job_id, {"assessment": "Phishing"})
+        return job, await scan_jobs.get_job(job_id)
+
+    job, polled = run(scenario())
+    assert job["status"] == scan_jobs.COMPLETED and job["result"] is None
+    assert job["scanners"] == {"virustotal": scan_jobs.COMPLETED, "urlscanio": "failed: down"}
+    assert polled["result"] == {"assessment": "Phishing"}
+
+
+def test_finished_submission_is_resubmitted():
+    async def scenario():
+        scan_jobs._queue = asyncio.Queue(10)
+        await scan_jobs.enqueue_scan_job("t", "https://v.com/", ["virustotal"])
+        submission = submissions()[0]
+        submission["status"] = scan_jobs.FAILED
+        await scan_jobs._save_submission(submission)
+        await scan_jobs.enqueue_scan_job("t", "https://v.com/", ["virustotal"])
+        return scan_jobs._queue.qsize()
+
+    assert run(scenario()) == 2
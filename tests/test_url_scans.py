@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+
+try:
+    from api import main
+except (ImportError, SystemExit): # main.py needs the full service stack (spaCy, transformers, LangChain, ...)
+    pytest.skip("api.main dependencies not installed", allow_module_level=True)
+
+
+def scan_stubs(monkeypatch, behaviours):
+    async def cancelled_elsewhere():
+        asyncio.current_task().cancel()
+        await asyncio.sleep(0)
+
+    async def slow():
+        await asyncio.sleep(0.5)
+        return {"data": "late"}
+
+    async def none():
+        return None
+
+    makers = {"cancelled": cancelled_elsewhere, "slow": slow, "none": none}
+
+    def fake_cached_scan(scanner, key, fetch):
+        return makers[behaviours[scanner]]()
+
+    monkeypatch.setattr(main, "cached_scan", fake_cached_scan)
+
+
+def test_cancelled_scan_is_reported_not_raised(monkeypatch):
+    scan_stubs(monkeypatch, {"virustotal": "cancelled", "ipqualityscore": "none", "urlscanio": "none"})
+    outputs = asyncio.run(main._perform_url_scans("req", "https://example.com/x"))
+    assert outputs["virustotal"].status == "skipped"
+    assert outputs["ipqualityscore"].status == "no_data" and outputs["urlscanio"].status == "no_data"
+
+
+def test_scans_past_the_budget_are_detached_and_finish(monkeypatch):
+    monkeypatch.setattr(main, "URL_SCAN_BUDGET", 0.05)
+    scan_stubs(monkeypatch, {"virustotal": "slow", "ipqualityscore": "none", "urlscanio": "none"})
+
+    async def scenario():
+        outputs = await main._perform_url_scans("req", "https://example.com/x")
+        detached = set(main._detached_scans)
+        await asyncio.gather(*detached)
+        return outputs, detached
+
+    outputs, detached = asyncio.run(scenario())
+    assert outputs["virustotal"].status == "skipped"
+    assert len(detached) == 1 and all(t.result() == {"data": "late"} for t in detached)
+    assert not main._detached_scans